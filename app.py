@@ -1,25 +1,21 @@
 import sys
 # Updated for deployment
 import os
+import importlib
+import threading
 import streamlit as st
-import nltk
-
-try:
-    nltk.download('punkt')
-    nltk.download('punkt_tab')
-    nltk.download('averaged_perceptron_tagger')
-except Exception as e:
-    pass
 
 # Add the project root to python path
 root_dir = os.path.dirname(os.path.abspath(__file__))
 if root_dir not in sys.path:
     sys.path.append(root_dir)
 
-try:
-    from src.ui import layout
-    from src.ui.auth_ui import render_login_page
-except ModuleNotFoundError as e:
+# Modules behind the login screen. They pull in plotly, pandas, textblob,
+# langchain, faiss and sentence-transformers, so they are imported in the
+# background while the user is logging in instead of before the first paint.
+PREWARM_MODULES = ["src.ui.layout"]
+
+def show_startup_error(e):
     st.error(f"Startup Error: {e}")
     st.info("Debugging Info:")
     st.write(f"Root Directory: `{root_dir}`")
@@ -31,10 +27,43 @@ except ModuleNotFoundError as e:
         st.write(f"Error reading directories: {dir_err}")
     st.stop()
 
+def _import_quietly(names):
+    for name in names:
+        try:
+            importlib.import_module(name)
+        except Exception:
+            # The foreground import will surface the real error
+            pass
+
+@st.cache_resource(show_spinner=False)
+def start_prewarm():
+    """Import the heavy modules on a background thread, once per process."""
+    thread = threading.Thread(target=_import_quietly, args=(PREWARM_MODULES,), name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+@st.cache_resource(show_spinner=False)
+def start_instrumentation():
+    """Metrics endpoint / trace export, if enabled through the environment (once per process)."""
+    from src.core import tracing
+    tracing.configure_from_env()
+    return True
+
+try:
+    from src.ui.auth_ui import render_login_page
+except ModuleNotFoundError as e:
+    show_startup_error(e)
+
 def main():
+    start_instrumentation()
     if 'user' not in st.session_state:
+        start_prewarm()
         render_login_page()
     else:
+        try:
+            from src.ui import layout
+        except ModuleNotFoundError as e:
+            show_startup_error(e)
         layout.main()
 
 if __name__ == "__main__":
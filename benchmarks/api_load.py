@@ -0,0 +1,128 @@
+"""
+Load-test the HTTP API (src/api.py).
+
+Uploads a PDF (or reuses a document id), waits until it is indexed, then
+fires requests at one endpoint with a fixed number of concurrent clients and
+reports throughput and latency percentiles. Start the server without
+GEMINI_API_KEY so answers come from SimulationProvider and the numbers
+measure the service rather than the LLM:
+
+    env -u GEMINI_API_KEY uvicorn src.api:app --port 8000 --workers 4
+
+Usage:
+    python benchmarks/api_load.py --pdf book.pdf [--url http://localhost:8000]
+        [--endpoint search|answer|stream|summary] [--concurrency 32] [--requests 500]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+import httpx
+
+QUERIES = [
+    "What is the main argument of the book?",
+    "Who are the key people discussed?",
+    "Summarize the conclusion.",
+    "What methods does the author use?",
+    "Which examples support the central claim?",
+]
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+async def ensure_document(client, args, headers):
+    if args.document:
+        return args.document
+    with open(args.pdf, "rb") as f:
+        response = await client.post("/documents", headers=headers,
+                                     files={"file": (os.path.basename(args.pdf), f.read(), "application/pdf")})
+    response.raise_for_status()
+    doc = response.json()
+    doc_id = doc["document_id"]
+    started = time.perf_counter()
+    while doc.get("status") == "processing":
+        await asyncio.sleep(1.0)
+        response = await client.get(f"/documents/{doc_id}", headers=headers)
+        if response.status_code != 200:
+            raise SystemExit(f"Status check failed: HTTP {response.status_code} {response.text[:200]}")
+        doc = response.json()
+    if doc.get("status") != "ready":
+        raise SystemExit(f"Ingestion failed: {doc.get('error')}")
+    print(f"document {doc_id[:16]}... ready after {time.perf_counter() - started:.1f}s")
+    return doc_id
+
+async def one_request(client, args, doc_id, i, headers):
+    query = QUERIES[i % len(QUERIES)]
+    if args.endpoint == "search":
+        response = await client.post(f"/documents/{doc_id}/search", json={"query": query}, headers=headers)
+    elif args.endpoint == "summary":
+        response = await client.post(f"/documents/{doc_id}/summary", json={}, headers=headers)
+    elif args.endpoint == "answer":
+        response = await client.post(f"/documents/{doc_id}/answer", json={"question": query}, headers=headers)
+    else:
+        # Streaming: time to the end of the stream (first-token latency is reported separately)
+        first = None
+        started = time.perf_counter()
+        async with client.stream("POST", f"/documents/{doc_id}/answer", headers=headers,
+                                 json={"question": query, "stream": True}) as response:
+            async for line in response.aiter_lines():
+                if first is None and line.startswith("event: token"):
+                    first = time.perf_counter() - started
+        return response.status_code, first
+    return response.status_code, None
+
+async def run(args):
+    headers = {"Authorization": f"Bearer {args.token}"} if args.token else {}
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.url, timeout=120, limits=limits) as client:
+        doc_id = await ensure_document(client, args, headers)
+        # Warm up: open the document on the server before timing
+        await one_request(client, args, doc_id, 0, headers)
+
+        latencies, first_tokens, errors = [], [], 0
+        counter = iter(range(args.requests))
+
+        async def client_loop():
+            nonlocal errors
+            for i in counter:
+                started = time.perf_counter()
+                try:
+                    status, first = await one_request(client, args, doc_id, i, headers)
+                except httpx.HTTPError:
+                    status, first = None, None
+                latencies.append(time.perf_counter() - started)
+                if status != 200:
+                    errors += 1
+                if first is not None:
+                    first_tokens.append(first)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client_loop() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(seconds * 1000 for seconds in latencies)
+    print(f"{args.endpoint}: {len(latencies)} requests, {args.concurrency} concurrent, {errors} errors")
+    print(f"throughput {len(latencies) / elapsed:.1f} req/s")
+    print(f"latency p50 {percentile(latencies, 0.5):.0f} ms  p95 {percentile(latencies, 0.95):.0f} ms  "
+          f"p99 {percentile(latencies, 0.99):.0f} ms  max {latencies[-1]:.0f} ms")
+    if first_tokens:
+        first_tokens = sorted(seconds * 1000 for seconds in first_tokens)
+        print(f"first token p50 {percentile(first_tokens, 0.5):.0f} ms  p95 {percentile(first_tokens, 0.95):.0f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--pdf", help="PDF to upload")
+    parser.add_argument("--document", help="Existing document id (skips the upload)")
+    parser.add_argument("--endpoint", choices=["search", "answer", "stream", "summary"], default="search")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--token", default=os.environ.get("BOOK_ANALYZER_API_TOKEN"))
+    args = parser.parse_args()
+    if not args.pdf and not args.document:
+        parser.error("--pdf or --document is required")
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Memory held per book: lists of LangChain Documents vs the shared ChunkStore.
+
+The "documents" layout reproduces what the app used to keep alive: the chunk
+list, the analyzer's and analytics' text lists, and the docstore's own
+Document copies inside the LangChain FAISS vector store. The "chunk_store"
+layout is the single ChunkStore that everything now shares.
+
+Usage:
+    python benchmarks/chunk_memory.py [--pages 800] [--chunk-size 1000] [--json out.json]
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_core.documents import Document
+from src.core.chunks import ChunkStore
+from src.core.processor import chunk_documents
+from benchmarks.corpus import synthetic_pages
+
+def measure(build):
+    """Bytes still allocated while the object returned by build() is alive."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    kept = build()
+    gc.collect()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del kept
+    return size
+
+def documents_layout(pages, chunk_size, chunk_overlap):
+    chunks = chunk_documents(pages, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    raw_text_chunks = [d.page_content for d in chunks]
+    raw_texts = [d.page_content for d in chunks]
+    docstore = {str(i): Document(page_content=d.page_content, metadata=dict(d.metadata)) for i, d in enumerate(chunks)}
+    return chunks, raw_text_chunks, raw_texts, docstore
+
+def chunk_store_layout(pages, chunk_size, chunk_overlap):
+    chunks = chunk_documents(pages, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return ChunkStore.from_pages(pages, chunks)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=800)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=150)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.pages)
+    text_bytes = sum(sys.getsizeof(p.page_content) for p in pages)
+
+    results = {
+        "pages": args.pages,
+        "chunk_size": args.chunk_size,
+        "chunk_overlap": args.chunk_overlap,
+        "page_text_bytes": text_bytes,
+        "documents_bytes": measure(lambda: documents_layout(pages, args.chunk_size, args.chunk_overlap)),
+        "chunk_store_bytes": measure(lambda: chunk_store_layout(pages, args.chunk_size, args.chunk_overlap)),
+    }
+    results["reduction"] = round(1 - results["chunk_store_bytes"] / results["documents_bytes"], 3)
+
+    mb = 1024 * 1024
+    print(f"Book text:         {text_bytes / mb:8.2f} MB ({args.pages} pages)")
+    print(f"List of Documents: {results['documents_bytes'] / mb:8.2f} MB")
+    print(f"ChunkStore:        {results['chunk_store_bytes'] / mb:8.2f} MB")
+    print(f"Reduction:         {results['reduction'] * 100:8.1f} %")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Deterministic book corpora for the benchmarks. Everything is generated
+locally; nothing is downloaded.
+"""
+import os
+import random
+from langchain_core.documents import Document
+
+WORDS = ("analysis system model data theory chapter result method student learning memory "
+         "function value process structure network language example concept research").split()
+
+def synthetic_pages(page_count, chars_per_page=2500, seed=7):
+    """Pages of random sentences with occasional paragraph breaks."""
+    rng = random.Random(seed)
+    pages = []
+    for number in range(1, page_count + 1):
+        paragraphs = []
+        size = 0
+        while size < chars_per_page:
+            sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 20))).capitalize() + ". "
+            if rng.random() < 0.15:
+                sentence += "\n\n"
+            paragraphs.append(sentence)
+            size += len(sentence)
+        pages.append(Document(page_content="".join(paragraphs), metadata={"page": number, "source": "synthetic.pdf"}))
+    return pages
+
+# Planted facts for retrieval benchmarks: every fact is stated on exactly one page
+FACT_SUBJECTS = ("observatory library bridge academy harbour museum archive laboratory cathedral "
+                 "railway canal theatre garden hospital university foundry lighthouse mill").split()
+FACT_PLACES = ("Ashford Brindle Calder Dunmore Elstow Farrow Glenmoor Hartwell Ivybridge Kestrel "
+               "Larkhill Marston Northby Oakham Pellow Quarry Redmere Selwick Thornbury Upwell").split()
+FACT_PEOPLE = ("Ada Hartley|Basil Crane|Clara Voss|Dorian Pike|Edith Marlow|Felix Orme|Greta Lind|"
+               "Hugo Tarrant|Iris Fell|Jonas Reeve|Kitty Sable|Leon Ashe|Mabel Quill|Nils Harrow").split("|")
+
+def _fact(rng):
+    subject, place = rng.choice(FACT_SUBJECTS), rng.choice(FACT_PLACES)
+    person, year = rng.choice(FACT_PEOPLE), rng.randint(1600, 1950)
+    statement = f"The {subject} of {place} was founded in {year} by {person}, who also designed its first {rng.choice(WORDS)} wing."
+    question = f"Who founded the {subject} of {place}, and when?"
+    return (subject, place), statement, question
+
+def qa_pages(page_count, chars_per_page=2500, fact_share=0.3, seed=11):
+    """
+    Synthetic pages with planted facts, plus question -> gold page pairs.
+
+    Filler is the same random text as synthetic_pages(); roughly `fact_share`
+    of the pages state one unique fact somewhere in the middle of the page,
+    and every subject/place also shows up on other pages as a distractor.
+
+    Returns:
+        tuple: (List[Document], List[dict] with "question" and "gold_pages")
+    """
+    rng = random.Random(seed)
+    pages = synthetic_pages(page_count, chars_per_page, seed=seed)
+    questions = []
+    seen = set()
+    for page in pages:
+        if rng.random() >= fact_share:
+            # Distractor: mention a subject and place without the fact
+            mention = f"Visitors often mention the {rng.choice(FACT_SUBJECTS)} of {rng.choice(FACT_PLACES)}. "
+            text = page.page_content
+            cut = text.find(". ", len(text) // 3) + 2
+            page.page_content = text[:cut] + mention + text[cut:]
+            continue
+        key, statement, question = _fact(rng)
+        if key in seen:
+            continue
+        seen.add(key)
+        text = page.page_content
+        cut = text.find(". ", len(text) // 2) + 2
+        page.page_content = text[:cut] + statement + " " + text[cut:]
+        questions.append({"question": question, "gold_pages": [page.metadata["page"]]})
+    return pages, questions
+
+def text_file_pages(path, chars_per_page=2500):
+    """
+    Pages from a local plain-text book (e.g. a public-domain edition you
+    already have on disk), split at paragraph breaks near `chars_per_page`.
+    """
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        text = f.read()
+    pages = []
+    start = 0
+    while start < len(text):
+        end = text.find("\n\n", start + chars_per_page)
+        end = len(text) if end < 0 else end + 2
+        pages.append(Document(page_content=text[start:end],
+                              metadata={"page": len(pages) + 1, "source": os.path.basename(path)}))
+        start = end
+    return pages
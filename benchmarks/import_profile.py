@@ -0,0 +1,90 @@
+"""
+Import-time profile of the app's startup paths.
+
+Runs `python -X importtime` in a fresh interpreter for each entry point and
+reports the total plus the slowest top-level packages. The login path should
+stay close to "streamlit + sqlite"; everything heavy belongs to the main page.
+
+Usage:
+    python benchmarks/import_profile.py [--top 15] [--json out.json]
+"""
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry point name -> module imported in a fresh interpreter
+TARGETS = {
+    "login": "src.ui.auth_ui",
+    "main_page": "src.ui.layout",
+    "core_engines": "src.core.analyzer",
+}
+
+LINE_RE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def profile_import(module):
+    """
+    Returns:
+        List[dict]: One entry per imported module with self/cumulative microseconds
+    """
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT_DIR, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        last = proc.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        raise RuntimeError(f"import {module} failed: {last[0]}")
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            entries.append({
+                "module": name,
+                "self_us": int(self_us),
+                "cumulative_us": int(cumulative_us),
+                # importtime indents nested imports by two spaces per level
+                "depth": (len(indent) - 1) // 2,
+            })
+    return entries
+
+def summarize(entries, top):
+    top_level = [e for e in entries if e["depth"] == 0]
+    total_us = sum(e["cumulative_us"] for e in top_level)
+    slowest = sorted(top_level, key=lambda e: e["cumulative_us"], reverse=True)[:top]
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "modules_imported": len(entries),
+        "slowest": [{"module": e["module"], "cumulative_ms": round(e["cumulative_us"] / 1000, 1)} for e in slowest],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest packages to list")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = {}
+    for name, module in TARGETS.items():
+        try:
+            results[name] = summarize(profile_import(module), args.top)
+        except RuntimeError as e:
+            results[name] = {"error": str(e)}
+            print(f"{name:<14} {e}")
+            continue
+        r = results[name]
+        print(f"{name:<14} import {module}: {r['total_ms']} ms, {r['modules_imported']} modules")
+        for item in r["slowest"]:
+            print(f"    {item['cumulative_ms']:>9.1f} ms  {item['module']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Exercise the LLM router against local stub servers.
+
+Starts OpenAI-compatible stub servers on localhost with injected latency and
+failure rates, routes a batch of requests through RouterProvider and reports
+which backend answered, end-to-end latency percentiles, how often requests
+were hedged and the final circuit breaker states. No API keys or network
+access are needed.
+
+Usage:
+    python benchmarks/llm_router_stub.py [--requests 200] [--workers 8]
+        [--slow-rate 0.1] [--fail-rate 0.0]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import llm, llm_metrics
+
+def stub_server(name, latency, slow_rate=0.0, slow_latency=2.0, fail_rate=0.0, seed=0):
+    """
+    Start a chat-completions stub on a free localhost port.
+
+    Args:
+        name (str): Text returned in every answer
+        latency (float): Normal response time in seconds
+        slow_rate (float): Share of requests that take slow_latency instead (tail latency)
+        fail_rate (float): Share of requests answered with HTTP 500
+
+    Returns:
+        tuple: (server, base_url)
+    """
+    rng = random.Random(seed)
+    rng_lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            with rng_lock:
+                slow, fail = rng.random() < slow_rate, rng.random() < fail_rate
+            time.sleep(slow_latency if slow else latency)
+            if fail:
+                self.send_error(500, "injected failure")
+                return
+            prompt = request["messages"][-1]["content"]
+            body = json.dumps({
+                "choices": [{"message": {"role": "assistant", "content": f"{name}: {prompt[:40]}"}}],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 12},
+            }).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--slow-rate", type=float, default=0.1, help="Tail-latency share on the primary")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Failure share on the primary")
+    args = parser.parse_args()
+
+    servers = [
+        stub_server("primary", 0.05, slow_rate=args.slow_rate, fail_rate=args.fail_rate, seed=1),
+        stub_server("secondary", 0.08, seed=2),
+        stub_server("local", 0.2, seed=3),
+    ]
+    names = ["primary", "secondary", "local"]
+    backends = [llm.OpenAICompatibleProvider(url, "stub", name=name) for name, (_, url) in zip(names, servers)]
+    router = llm.RouterProvider(backends, routes={"chat": names, "summary": ["local", "primary"]})
+
+    def one(i):
+        feature = "summary" if i % 10 == 0 else "chat"
+        started = time.perf_counter()
+        text, ok = router.generate(f"request {i}", feature)
+        return text.split(":")[0] if ok else "error", time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(one, range(args.requests)))
+
+    latencies = sorted(seconds * 1000 for _, seconds in results)
+    hedged = sum(c["calls"] for c in llm_metrics.summary().values()) - len(results)
+    print(f"{len(results)} requests: answered by {dict(Counter(name for name, _ in results))}")
+    print(f"latency p50 {statistics.median(latencies):.0f} ms  "
+          f"p95 {latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]:.0f} ms  "
+          f"max {latencies[-1]:.0f} ms")
+    print(f"extra backend calls (hedges and failovers): {hedged}")
+    for name, state in router.health().items():
+        print(f"  {name:<10} {state}")
+
+    for server, _ in servers:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Memory per worker process and query latency for memory-mapped index vectors.
+
+Writes a synthetic library's worth of unit vectors (or uses an existing
+vectors.npy from the document cache), then starts several worker processes
+that each open it and run queries, as Streamlit/API workers serving the same
+books would. "ram" reads the vectors into process memory (what a FAISS flat
+index holds); "mmap" maps the file read-only, so the pages are shared
+through the OS page cache. For each layout it reports resident memory per
+worker (and how much of it is shared file pages), and query latency with a
+cold page cache (evicted with posix_fadvise before the first query) vs warm.
+
+Usage:
+    python benchmarks/mmap_index.py [--vectors 200000] [--dim 384] [--processes 4]
+        [--queries 50] [--dtype float32|float16|int8] [--path .cache/documents/<sha>/index-.../vectors.npy]
+"""
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from src.core import tracing
+from src.core.vectorstore import MappedFlatIndex, codes_path, write_vectors
+
+def drop_page_cache(path):
+    """Ask the kernel to evict the file's pages (Linux; a no-op elsewhere)."""
+    if not hasattr(os, "posix_fadvise"):
+        return False
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return True
+
+def synthetic_vectors(n, dim, seed=0):
+    vectors = np.random.default_rng(seed).standard_normal((n, dim), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+def worker(layout, path, dtype, queries, cold, start_barrier, results):
+    base_rss, base_shared = tracing.rss_bytes(), tracing.shared_rss_bytes()
+    if cold:
+        for file in (path, codes_path(path, dtype)):
+            if os.path.exists(file):
+                drop_page_cache(file)
+    start_barrier.wait()
+    latencies = []
+    started = time.perf_counter()
+    if layout == "mmap":
+        index = MappedFlatIndex(path, dtype)
+        search = lambda q: index.search(q, 5)
+    else:
+        vectors = np.load(path).astype(np.float32)
+        search = lambda q: np.argpartition(-(q @ vectors.T), 4, axis=1)[:, :5]
+    load_seconds = time.perf_counter() - started
+    for q in queries:
+        started = time.perf_counter()
+        search(q[None, :])
+        latencies.append(time.perf_counter() - started)
+    results.put({"layout": layout, "load": load_seconds, "first": latencies[0], "warm": latencies[1:],
+                 "rss": tracing.rss_bytes() - base_rss, "shared": tracing.shared_rss_bytes() - base_shared})
+
+def run(layout, path, dtype, queries, processes, cold):
+    barrier = multiprocessing.Barrier(processes)
+    results = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=worker,
+                                     args=(layout, path, dtype, queries, cold and i == 0, barrier, results))
+             for i in range(processes)]
+    for p in procs:
+        p.start()
+    reports = [results.get() for _ in procs]
+    for p in procs:
+        p.join()
+    return reports
+
+def report(name, reports):
+    mb = 2 ** 20
+    warm = sorted(seconds * 1000 for r in reports for seconds in r["warm"])
+    first = max(r["first"] for r in reports) * 1000
+    print(f"{name}: added RSS per worker {statistics.mean(r['rss'] for r in reports) / mb:.1f} MB "
+          f"(shared file pages {statistics.mean(r['shared'] for r in reports) / mb:.1f} MB), "
+          f"open {statistics.mean(r['load'] for r in reports) * 1000:.0f} ms")
+    print(f"  first query {first:.1f} ms, warm p50 {statistics.median(warm):.2f} ms  "
+          f"p95 {warm[min(len(warm) - 1, int(len(warm) * 0.95))]:.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--dtype", choices=["float32", "float16", "int8"], default="float32")
+    parser.add_argument("--path", help="Existing vectors.npy to use instead of synthetic vectors")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = args.path
+        if path is None:
+            path = os.path.join(tmp, "vectors.npy")
+            write_vectors(path, synthetic_vectors(args.vectors, args.dim), dtype=args.dtype)
+        index = MappedFlatIndex(path, args.dtype)
+        print(f"{index.ntotal} vectors x {index.d} dims, {index.scan_bytes / 2**20:.0f} MB scanned per query "
+              f"({index.dtype}), {args.processes} worker processes")
+        queries = synthetic_vectors(args.queries, index.d, seed=1)
+        for layout in ("ram", "mmap"):
+            report(f"{layout} (cold cache)", run(layout, path, args.dtype, queries, args.processes, cold=True))
+            report(f"{layout} (warm cache)", run(layout, path, args.dtype, queries, args.processes, cold=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Retrieval quality and latency across chunk sizes, index types and reranking.
+
+For every chunk size the corpus is split with chunk_documents() and embedded
+once with SemanticSearchEngine; the stored vectors are then loaded into each
+index type. Every question is searched and scored against its gold pages.
+
+Reported per configuration: recall@k, MRR, p50/p95 query latency (embedding
+included, query cache cleared), index build time and index memory.
+
+Corpora:
+    synthetic   random filler with planted facts (benchmarks/corpus.py:qa_pages)
+    text        a local plain-text book (--text-file) with a question file
+                (--questions: JSON list of {"question", "gold_pages"})
+
+Usage:
+    python benchmarks/retrieval_bench.py [--pages 300] [--chunk-sizes 500,1000,2000]
+        [--indexes flat,hnsw,ivf,int8,float16] [--rerank none,keyword] [--k 4] [--json out.json]
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import faiss
+from src.core.chunks import ChunkStore
+from src.core.nlp import SemanticSearchEngine
+from src.core.processor import chunk_documents
+from src.core.vectorstore import QUANTIZED_DTYPES, VECTORS_FILE, MappedFlatIndex, write_vectors
+from benchmarks.corpus import qa_pages, text_file_pages
+
+# Candidates fetched before reranking, as a multiple of k
+RERANK_DEPTH = 5
+HNSW_NEIGHBOURS = 32
+WORD_RE = re.compile(r"[a-z0-9]+")
+
+def build_index(kind, vectors, workdir):
+    """FAISS index of `kind` over unit vectors (inner product = cosine)."""
+    d = vectors.shape[1]
+    if kind in QUANTIZED_DTYPES:
+        # Memory-mapped quantised vectors with float32 re-scoring, as saved indices are served
+        path = os.path.join(tempfile.mkdtemp(dir=workdir), VECTORS_FILE)
+        write_vectors(path, vectors, dtype=kind)
+        return MappedFlatIndex(path, kind)
+    if kind == "flat":
+        index = faiss.IndexFlatIP(d)
+    elif kind == "hnsw":
+        index = faiss.IndexHNSWFlat(d, HNSW_NEIGHBOURS, faiss.METRIC_INNER_PRODUCT)
+    elif kind == "ivf":
+        nlist = max(1, int(np.sqrt(len(vectors))))
+        index = faiss.IndexIVFFlat(faiss.IndexFlatIP(d), d, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.nprobe = max(1, nlist // 8)
+    else:
+        raise ValueError(f"Unknown index type: {kind}")
+    index.add(vectors)
+    return index
+
+def keyword_rerank(question, chunks, ids, scores):
+    """Re-order candidates by cosine plus the share of question words they contain."""
+    words = set(WORD_RE.findall(question.lower()))
+    combined = []
+    for i, score in zip(ids, scores):
+        text_words = set(WORD_RE.findall(chunks.get_text(int(i)).lower()))
+        combined.append(float(score) + len(words & text_words) / (len(words) or 1))
+    order = np.argsort(-np.array(combined))
+    return ids[order]
+
+def evaluate(engine, index, questions, k, rerank):
+    engine._query_cache.clear()
+    hits, reciprocal_ranks, latencies = 0, [], []
+    depth = k * RERANK_DEPTH if rerank == "keyword" else k
+    for item in questions:
+        started = time.perf_counter()
+        query = engine.embed_queries([item["question"]])
+        scores, ids = index.search(query, min(depth, index.ntotal))
+        keep = ids[0] >= 0
+        ids, scores = ids[0][keep], scores[0][keep]
+        if rerank == "keyword":
+            ids = keyword_rerank(item["question"], engine.chunks, ids, scores)
+        ids = ids[:k]
+        latencies.append(time.perf_counter() - started)
+
+        pages = [int(engine.chunks.pages[i]) for i in ids]
+        rank = next((r for r, page in enumerate(pages, 1) if page in item["gold_pages"]), None)
+        hits += rank is not None
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    latencies_ms = sorted(t * 1000 for t in latencies)
+    return {
+        f"recall@{k}": round(hits / len(questions), 4),
+        "mrr": round(statistics.mean(reciprocal_ranks), 4),
+        "p50_ms": round(latencies_ms[len(latencies_ms) // 2], 2),
+        "p95_ms": round(latencies_ms[min(len(latencies_ms) - 1, int(len(latencies_ms) * 0.95))], 2),
+    }
+
+def load_corpus(args):
+    if args.text_file:
+        if not args.questions:
+            raise SystemExit("--text-file needs --questions")
+        with open(args.questions, "r", encoding="utf-8") as f:
+            return "text", text_file_pages(args.text_file), json.load(f)
+    pages, questions = qa_pages(args.pages)
+    return "synthetic", pages, questions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--chunk-sizes", default="500,1000,2000")
+    parser.add_argument("--indexes", default="flat,hnsw,ivf")
+    parser.add_argument("--rerank", default="none,keyword")
+    parser.add_argument("--k", type=int, default=4)
+    parser.add_argument("--text-file", help="Plain-text book to use instead of the synthetic corpus")
+    parser.add_argument("--questions", help="JSON question set for --text-file")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    corpus, pages, questions = load_corpus(args)
+    print(f"{corpus} corpus: {len(pages)} pages, {len(questions)} questions, k={args.k}")
+
+    engine = SemanticSearchEngine()
+    if engine.embeddings is None:
+        raise SystemExit("Embedding model unavailable")
+
+    results = []
+    workdir = tempfile.TemporaryDirectory()
+    for chunk_size in [int(s) for s in args.chunk_sizes.split(",")]:
+        chunks = chunk_documents(pages, chunk_size=chunk_size, chunk_overlap=chunk_size // 7)
+        store = ChunkStore.from_pages(pages, chunks)
+        started = time.perf_counter()
+        engine.build_index(store)
+        embed_seconds = time.perf_counter() - started
+        vectors = engine.vectors()
+
+        for kind in args.indexes.split(","):
+            started = time.perf_counter()
+            index = build_index(kind, vectors, workdir.name)
+            index_seconds = time.perf_counter() - started
+            # Mapped indices: the bytes a query scans (the float32 copy is only read for re-scoring)
+            if isinstance(index, MappedFlatIndex):
+                index_bytes = index.scan_bytes
+            else:
+                index_bytes = len(faiss.serialize_index(index))
+
+            for rerank in args.rerank.split(","):
+                row = {
+                    "corpus": corpus, "chunk_size": chunk_size, "chunks": len(store), "index": kind,
+                    "rerank": rerank, "embed_seconds": round(embed_seconds, 3),
+                    "index_build_seconds": round(index_seconds, 4), "index_bytes": index_bytes,
+                    "chunk_store_bytes": store.nbytes(),
+                }
+                row.update(evaluate(engine, index, questions, args.k, rerank))
+                results.append(row)
+                print(f"chunk {chunk_size:>5}  {kind:<5} rerank={rerank:<8} "
+                      f"recall@{args.k} {row[f'recall@{args.k}']:.3f}  MRR {row['mrr']:.3f}  "
+                      f"p50 {row['p50_ms']:>6.2f} ms  p95 {row['p95_ms']:>6.2f} ms  "
+                      f"build {row['index_build_seconds']:.3f}s  index {index_bytes / 1024 / 1024:.1f} MB")
+
+    workdir.cleanup()
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"k": args.k, "pages": len(pages), "questions": len(questions), "results": results}, f,
+                      indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Native TextSplitter vs LangChain's RecursiveCharacterTextSplitter.
+
+Splits the same synthetic book with both and reports wall time, chunk count
+and chunk length statistics. Token mode is included to show the cost of
+tiktoken counting.
+
+Usage:
+    python benchmarks/splitter_bench.py [--pages 1000] [--repeat 3] [--json out.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from src.core.splitter import TextSplitter
+from benchmarks.corpus import synthetic_pages
+
+def run(name, split, pages, repeat):
+    timings = []
+    chunks = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        chunks = split(pages)
+        timings.append(time.perf_counter() - started)
+    lengths = [len(c.page_content) for c in chunks]
+    result = {
+        "splitter": name,
+        "seconds_best": round(min(timings), 4),
+        "seconds_median": round(statistics.median(timings), 4),
+        "chunks": len(chunks),
+        "mean_chars": round(statistics.mean(lengths), 1) if lengths else 0,
+        "max_chars": max(lengths) if lengths else 0,
+    }
+    print(f"{name:<28} {result['seconds_best']:>8.3f}s  {result['chunks']:>6} chunks  "
+          f"mean {result['mean_chars']:>7.1f} chars  max {result['max_chars']}")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=150)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    pages = synthetic_pages(args.pages)
+    langchain = RecursiveCharacterTextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap,
+                                               length_function=len, add_start_index=True)
+    native = TextSplitter(chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap)
+    # Roughly the same chunk size in tokens (about 4 chars per token in English)
+    native_tokens = TextSplitter(chunk_size=args.chunk_size // 4, chunk_overlap=args.chunk_overlap // 4,
+                                 length_unit="tokens")
+
+    print(f"{args.pages} pages, chunk_size={args.chunk_size}, overlap={args.chunk_overlap}, best of {args.repeat}")
+    results = [
+        run("langchain_recursive", langchain.split_documents, pages, args.repeat),
+        run("native_chars", native.split_documents, pages, args.repeat),
+        run("native_tokens", native_tokens.split_documents, pages, args.repeat),
+    ]
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Memory, build time and recall of quantised index vectors vs flat float32.
+
+Vectors are synthetic clustered unit vectors shaped like sentence embeddings
+(or an existing vectors.npy from the document cache via --path); queries are
+stored vectors plus noise. The exact float32 top-k is the ground truth.
+
+Reported per storage mode: bytes a query scans (what has to stay in the page
+cache for fast queries, i.e. how many books fit per node), disk bytes, build
+time (quantise + write), recall@k against float32, and single-query latency.
+"+rescore" modes re-score the best RESCORE_FACTOR * k candidates from the
+float32 vectors. With faiss installed, FAISS SQ8 + IndexRefineFlat is
+measured as well for reference.
+
+Usage:
+    python benchmarks/vector_quantization.py [--vectors 100000] [--dim 384] [--k 10]
+        [--queries 200] [--path .cache/documents/<sha>/index-.../vectors.npy]
+"""
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from src.core.vectorstore import RESCORE_FACTOR, MappedFlatIndex, write_vectors
+
+MODES = [("float32", True), ("float16", False), ("float16", True), ("int8", False), ("int8", True)]
+
+def normalize(vectors):
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+def clustered_vectors(n, dim, clusters, seed=0):
+    """Unit vectors around `clusters` topic directions, like embeddings of a library's chunks."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim), dtype=np.float32)
+    noise = rng.standard_normal((n, dim), dtype=np.float32)
+    return normalize(centers[rng.integers(0, clusters, n)] + 0.8 * noise)
+
+def recall(found, truth):
+    return np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)])
+
+def timed_search(search, queries, k):
+    latencies, found = [], []
+    for q in queries:
+        started = time.perf_counter()
+        _, ids = search(q[None, :], k)
+        latencies.append((time.perf_counter() - started) * 1000)
+        found.append(ids[0])
+    latencies.sort()
+    return found, latencies[len(latencies) // 2], latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+def faiss_sq8(vectors, queries, k):
+    try:
+        import faiss
+    except ImportError:
+        return None
+    started = time.perf_counter()
+    base = faiss.IndexScalarQuantizer(vectors.shape[1], faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_INNER_PRODUCT)
+    index = faiss.IndexRefineFlat(base)
+    index.k_factor = RESCORE_FACTOR
+    index.train(vectors)
+    index.add(vectors)
+    build = time.perf_counter() - started
+    return build, base.sa_code_size() * len(vectors), timed_search(index.search, queries, k)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--path", help="Existing vectors.npy to use instead of synthetic vectors")
+    args = parser.parse_args()
+
+    vectors = np.load(args.path).astype(np.float32) if args.path else \
+        clustered_vectors(args.vectors, args.dim, args.clusters)
+    rng = np.random.default_rng(1)
+    queries = normalize(vectors[rng.integers(0, len(vectors), args.queries)]
+                        + 0.05 * rng.standard_normal((args.queries, vectors.shape[1]), dtype=np.float32))
+    truth = np.argsort(-(queries @ vectors.T), axis=1)[:, :args.k]
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {args.queries} queries, k={args.k}")
+
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype, rescore in MODES:
+            path = os.path.join(tmp, dtype, "vectors.npy")
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path))
+                started = time.perf_counter()
+                write_vectors(path, vectors, dtype=dtype)
+                build = time.perf_counter() - started
+            index = MappedFlatIndex(path, dtype)
+            disk = sum(os.path.getsize(f) for f in glob.glob(os.path.join(os.path.dirname(path), "*.npy")))
+            baseline = baseline or index.scan_bytes
+            found, p50, p95 = timed_search(lambda q, k: index.search(q, k, rescore=rescore), queries, args.k)
+            name = dtype + ("+rescore" if rescore and dtype != "float32" else "")
+            print(f"{name:<16} scan {index.scan_bytes / 2**20:7.1f} MB "
+                  f"({baseline / index.scan_bytes:.1f}x books/node)  disk {disk / 2**20:7.1f} MB  "
+                  f"build {build:.2f}s  recall@{args.k} {recall(found, truth):.4f}  "
+                  f"p50 {p50:.2f} ms  p95 {p95:.2f} ms")
+
+    sq8 = faiss_sq8(vectors, queries, args.k)
+    if sq8 is not None:
+        build, code_bytes, (found, p50, p95) = sq8
+        print(f"{'faiss SQ8+refine':<16} scan {code_bytes / 2**20:7.1f} MB  (float32 refine copy held in RAM)  "
+              f"build {build:.2f}s  recall@{args.k} {recall(found, truth):.4f}  p50 {p50:.2f} ms  p95 {p95:.2f} ms")
+
+if __name__ == "__main__":
+    main()
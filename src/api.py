@@ -0,0 +1,269 @@
+"""
+HTTP API for programmatic clients (e.g. an LMS integration).
+
+Usage:
+    uvicorn src.api:app --host 0.0.0.0 --port 8000 [--workers N]
+
+Endpoints:
+    POST /documents                       upload a PDF (multipart "file"); returns a document id
+    GET  /documents/{id}                  ingestion status
+    POST /documents/{id}/search           {"query", "k", "section"}
+    POST /documents/{id}/answer           {"question", "section", "stream"}; stream=true answers as SSE
+    POST /documents/{id}/summary          {"user_goal", "section"}
+    POST /documents/{id}/questions        {"local"}
+    POST /documents/{id}/faqs             {"local"}
+    GET  /documents/{id}/export/{format}  txt, json or html report
+    GET  /health, GET /metrics
+
+A document id is the file's SHA-256 plus its chunking, so uploading the same
+file again (from any client, or after a restart) reuses the cached index.
+Ingestion runs in a thread of the API process, or on the ingestion workers
+when BOOK_ANALYZER_INGEST=worker. Without GEMINI_API_KEY the engine answers
+through SimulationProvider.
+
+Set BOOK_ANALYZER_API_TOKEN to require "Authorization: Bearer <token>".
+"""
+import io
+import os
+import json
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from fastapi import Depends, FastAPI, File, Form, Header, HTTPException, UploadFile
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from pydantic import BaseModel
+
+from src.config import DEFAULT_CHUNK_SIZE, DEFAULT_CHUNK_OVERLAP, DEFAULT_CHUNK_TOKEN_OVERLAP, INGEST_MODE
+from src.core import tracing
+from src.core.cache import DocumentCache, sha256_bytes
+from src.core.jobs import JobQueue, DONE, FAILED
+from src.core.singleflight import flights
+
+logger = logging.getLogger(__name__)
+
+API_TOKEN = os.environ.get("BOOK_ANALYZER_API_TOKEN", "")
+# Analysis engines kept open (index + chunk store in memory), least recently used evicted
+MAX_OPEN_DOCUMENTS = 8
+
+READY = "ready"
+PROCESSING = "processing"
+
+app = FastAPI(title="AI Book Analyzer API")
+
+_cache = DocumentCache()
+_queue = JobQueue(cache=_cache) if INGEST_MODE == "worker" else None
+# Inline ingestion state: document id -> {"status", "error"}
+_ingesting = {}
+_open = OrderedDict()
+_lock = threading.Lock()
+
+class SearchRequest(BaseModel):
+    query: str
+    k: int = 4
+    section: Optional[int] = None
+
+class AnswerRequest(BaseModel):
+    question: str
+    section: Optional[int] = None
+    stream: bool = False
+
+class SummaryRequest(BaseModel):
+    user_goal: str = "General Reading"
+    section: Optional[int] = None
+
+class GenerateRequest(BaseModel):
+    local: bool = False
+
+def require_token(authorization: Optional[str] = Header(None)):
+    if API_TOKEN and authorization != f"Bearer {API_TOKEN}":
+        raise HTTPException(status_code=401, detail="Invalid or missing API token")
+
+def document_id(digest, chunk_size, chunk_overlap, length_unit):
+    return f"{digest}-{length_unit}-{chunk_size}-{chunk_overlap}"
+
+def parse_document_id(doc_id):
+    """(digest, chunk_size, chunk_overlap, length_unit) from a document id."""
+    try:
+        digest, length_unit, chunk_size, chunk_overlap = doc_id.rsplit("-", 3)
+        if len(digest) != 64 or length_unit not in ("chars", "tokens"):
+            raise ValueError
+        return digest, int(chunk_size), int(chunk_overlap), length_unit
+    except ValueError:
+        raise HTTPException(status_code=404, detail="Unknown document id")
+
+def _ingest_inline(doc_id, data, name, params):
+    from src.worker import ingest_pdf
+    buffer = io.BytesIO(data)
+    buffer.name = name
+    try:
+        ingest_pdf(buffer, *params, cache=_cache)
+        _ingesting.pop(doc_id, None)
+    except Exception as e:
+        logger.error(f"Ingestion of {name} failed: {e}")
+        _ingesting[doc_id] = {"status": FAILED, "error": str(e)}
+
+def status(doc_id):
+    digest, *params = parse_document_id(doc_id)
+    if _cache.has_index(digest, *params):
+        return {"document_id": doc_id, "status": READY}
+    if _queue is not None:
+        job = _queue.find(digest, *params, include_failed=True)
+        if job is not None and job["status"] == FAILED:
+            return {"document_id": doc_id, "status": FAILED, "error": job["error"]}
+        if job is not None and job["status"] != DONE:
+            return {"document_id": doc_id, "status": PROCESSING, "progress": job["progress"],
+                    "message": job["message"], "queue_position": job.get("position")}
+    state = _ingesting.get(doc_id)
+    if state is None:
+        raise HTTPException(status_code=404, detail="Unknown document id; upload it first")
+    if state["status"] == FAILED:
+        return {"document_id": doc_id, "status": FAILED, "error": state["error"]}
+    return {"document_id": doc_id, "status": PROCESSING}
+
+def _load_analyzer(doc_id):
+    from src.core.analyzer import AnalysisEngine
+    from src.core.context import ContextManager
+    from src.core.nlp import SemanticSearchEngine
+
+    digest, *params = parse_document_id(doc_id)
+    engine = SemanticSearchEngine.load(_cache.index_dir(digest, *params))
+    return AnalysisEngine(engine.chunks, api_key=os.environ.get("GEMINI_API_KEY"), semantic_engine=engine,
+                          context_manager=ContextManager(persist=False), precompute_sections=False)
+
+async def open_document(doc_id):
+    """AnalysisEngine for a ready document, from the LRU of open documents."""
+    with _lock:
+        analyzer = _open.get(doc_id)
+        if analyzer is not None:
+            _open.move_to_end(doc_id)
+            return analyzer
+    if status(doc_id)["status"] != READY:
+        raise HTTPException(status_code=409, detail="Document is still being processed")
+    analyzer = await asyncio.to_thread(flights.do, ("open_document", doc_id), _load_analyzer, doc_id)
+    with _lock:
+        _open[doc_id] = analyzer
+        _open.move_to_end(doc_id)
+        while len(_open) > MAX_OPEN_DOCUMENTS:
+            _open.popitem(last=False)
+    return analyzer
+
+def _check_section(analyzer, section):
+    if section is not None and not 0 <= section < len(analyzer.chunks.sections):
+        raise HTTPException(status_code=404, detail="Unknown section")
+
+@app.on_event("shutdown")
+async def close_clients():
+    from src.core.llm import aclose_async_client
+    await aclose_async_client()
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "open_documents": len(_open), "ingest_mode": INGEST_MODE}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return tracing.prometheus_text()
+
+@app.post("/documents", status_code=202, dependencies=[Depends(require_token)])
+async def upload_document(file: UploadFile = File(...), chunk_size: int = Form(DEFAULT_CHUNK_SIZE),
+                          chunk_overlap: Optional[int] = Form(None), length_unit: str = Form("chars")):
+    if length_unit not in ("chars", "tokens"):
+        raise HTTPException(status_code=422, detail="length_unit must be 'chars' or 'tokens'")
+    if chunk_overlap is None:
+        chunk_overlap = DEFAULT_CHUNK_TOKEN_OVERLAP if length_unit == "tokens" else DEFAULT_CHUNK_OVERLAP
+    data = await file.read()
+    digest = await asyncio.to_thread(sha256_bytes, data)
+    params = (chunk_size, chunk_overlap, length_unit)
+    doc_id = document_id(digest, *params)
+
+    if not _cache.has_index(digest, *params):
+        if _queue is not None:
+            await asyncio.to_thread(_queue.submit, data, file.filename, digest, *params)
+        elif _ingesting.get(doc_id, {}).get("status") != PROCESSING:
+            _ingesting[doc_id] = {"status": PROCESSING, "error": None}
+            asyncio.get_running_loop().run_in_executor(None, _ingest_inline, doc_id, data, file.filename, params)
+    return status(doc_id)
+
+@app.get("/documents/{doc_id}", dependencies=[Depends(require_token)])
+async def get_document(doc_id: str):
+    result = status(doc_id)
+    if result["status"] == READY:
+        analyzer = await open_document(doc_id)
+        chunks = analyzer.chunks
+        result.update(chunks=len(chunks), source=chunks.source,
+                      sections=[{"index": i, "title": s.title, "page": s.page, "end_page": s.end_page}
+                                for i, s in enumerate(chunks.sections)])
+    return result
+
+@app.post("/documents/{doc_id}/search", dependencies=[Depends(require_token)])
+async def search(doc_id: str, request: SearchRequest):
+    analyzer = await open_document(doc_id)
+    _check_section(analyzer, request.section)
+    chunks = analyzer.chunks
+    chunk_range = chunks.section_range(request.section) if request.section is not None else None
+    ids, scores = await asyncio.to_thread(analyzer.semantic_engine.search_ids, request.query, request.k,
+                                          chunk_range)
+    results = []
+    for i, score in zip(ids, scores):
+        doc = chunks.document(int(i))
+        results.append({"chunk_id": int(i), "score": round(float(score), 4), "page": doc.metadata.get("page"),
+                        "section": doc.metadata.get("section"), "text": doc.page_content})
+    return {"results": results}
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/documents/{doc_id}/answer", dependencies=[Depends(require_token)])
+async def answer(doc_id: str, request: AnswerRequest):
+    analyzer = await open_document(doc_id)
+    _check_section(analyzer, request.section)
+    if not request.stream:
+        return {"answer": await analyzer.aanswer_question(request.question, section=request.section)}
+
+    async def events():
+        try:
+            async for piece in analyzer.astream_answer(request.question, section=request.section):
+                yield _sse("token", piece)
+            yield _sse("done", {})
+        except Exception as e:
+            logger.error(f"Streaming answer failed: {e}")
+            yield _sse("error", str(e))
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/documents/{doc_id}/summary", dependencies=[Depends(require_token)])
+async def summary(doc_id: str, request: SummaryRequest):
+    analyzer = await open_document(doc_id)
+    _check_section(analyzer, request.section)
+    if request.section is not None:
+        text = await analyzer.agenerate_section_summary(request.section, user_goal=request.user_goal)
+    else:
+        text = await analyzer.agenerate_summary(user_goal=request.user_goal)
+    return {"summary": text}
+
+@app.post("/documents/{doc_id}/questions", dependencies=[Depends(require_token)])
+async def questions(doc_id: str, request: GenerateRequest):
+    analyzer = await open_document(doc_id)
+    return {"questions": await analyzer.agenerate_questions(local=request.local)}
+
+@app.post("/documents/{doc_id}/faqs", dependencies=[Depends(require_token)])
+async def faqs(doc_id: str, request: GenerateRequest):
+    analyzer = await open_document(doc_id)
+    return {"faqs": [{"question": q, "answer": a} for q, a in await analyzer.agenerate_faqs(local=request.local)]}
+
+@app.get("/documents/{doc_id}/export/{fmt}", dependencies=[Depends(require_token)])
+async def export(doc_id: str, fmt: str, user_goal: str = "General Reading"):
+    from src.utils.exporters import REPORT_FORMATS, build_report
+    if fmt not in REPORT_FORMATS:
+        raise HTTPException(status_code=404, detail=f"Unknown format; use one of {', '.join(REPORT_FORMATS)}")
+    analyzer = await open_document(doc_id)
+    summary_text, question_list, faq_list = await asyncio.gather(
+        analyzer.agenerate_summary(user_goal=user_goal), analyzer.agenerate_questions(), analyzer.agenerate_faqs())
+    data = await asyncio.to_thread(build_report, fmt, summary_text, question_list, faq_list, analyzer.chunks, [])
+    _, mime, extension = REPORT_FORMATS[fmt]
+    return Response(content=data, media_type=mime,
+                    headers={"Content-Disposition": f'attachment; filename="analysis.{extension}"'})
@@ -0,0 +1,228 @@
+"""
+Headless batch analysis.
+
+Usage:
+    python -m src.cli analyze DIR [--output OUT] [--workers N]
+
+Every PDF in DIR is extracted, chunked, indexed and analysed in a process
+pool. Each worker loads the embedding model once and reuses it for all the
+documents it handles. Results are written to OUT/<name>-<hash>/ and a document
+whose manifest already matches the file hash and chunking options is skipped,
+so an interrupted run can simply be restarted.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.config import DEFAULT_CHUNK_SIZE, DEFAULT_CHUNK_OVERLAP
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+REPORT_FILE = "report.json"
+INDEX_DIR = "index"
+TRACE_FILE = "trace.json"
+
+# Per-process state, set up once by _init_worker
+_worker_embeddings = None
+_worker_api_key = None
+
+def file_sha256(path, block_size=1 << 20):
+    """SHA-256 of a file, read in blocks."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+def output_dir_for(output_root, pdf_path, digest):
+    stem = os.path.splitext(os.path.basename(pdf_path))[0]
+    return os.path.join(output_root, f"{stem}-{digest[:12]}")
+
+def is_done(out_dir, digest, chunk_size, chunk_overlap, length_unit):
+    """A document is complete once its manifest exists with the same hash and chunking options."""
+    manifest_path = os.path.join(out_dir, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return False
+    try:
+        with open(manifest_path, "r") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    # Manifests from before token-based chunking have no length_unit
+    return (manifest.get("sha256") == digest
+            and manifest.get("chunk_size") == chunk_size
+            and manifest.get("chunk_overlap") == chunk_overlap
+            and manifest.get("length_unit", "chars") == length_unit)
+
+def _write_json_atomic(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+def _init_worker(api_key):
+    """Process pool initializer: load one embedding model per worker."""
+    global _worker_embeddings, _worker_api_key
+    from src.core.nlp import shared_embeddings
+    _worker_embeddings = shared_embeddings()
+    _worker_api_key = api_key
+
+def analyze_document(pdf_path, output_root, chunk_size, chunk_overlap, length_unit, digest, trace=False):
+    """
+    Run the full pipeline for one PDF inside a worker.
+
+    Returns:
+        dict: Manifest with timings and throughput
+    """
+    from src.core.processor import load_document
+    from src.core.nlp import SemanticSearchEngine
+    from src.core.analyzer import AnalysisEngine
+    from src.core.context import ContextManager
+    from src.utils.exporters import write_report
+    from src.core import tracing
+
+    out_dir = output_dir_for(output_root, pdf_path, digest)
+    os.makedirs(out_dir, exist_ok=True)
+    # Spans are per process; start clean so the stage timings cover this document only
+    tracing.reset()
+    started = time.perf_counter()
+
+    with open(pdf_path, "rb") as f:
+        chunks, page_count, _ = load_document(f, chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                                              length_unit=length_unit)
+    if not chunks:
+        raise ValueError("No text could be extracted")
+    extracted = time.perf_counter()
+
+    engine = SemanticSearchEngine(embeddings=_worker_embeddings)
+    analyzer = AnalysisEngine(
+        chunks,
+        api_key=_worker_api_key,
+        semantic_engine=engine,
+        context_manager=ContextManager(persist=False),
+    )
+    if not analyzer.index_ready:
+        raise RuntimeError("Failed to build semantic index")
+    engine.save(os.path.join(out_dir, INDEX_DIR))
+    indexed = time.perf_counter()
+
+    summary = analyzer.generate_summary()
+    questions = analyzer.generate_questions()
+    faqs = analyzer.generate_faqs()
+    # Let the section digests land in the on-disk cache before the worker moves on
+    analyzer.section_summaries.wait()
+    with open(os.path.join(out_dir, REPORT_FILE), "wb") as f:
+        write_report("json", f, summary, questions, faqs, chunks, [])
+    finished = time.perf_counter()
+
+    elapsed = finished - started
+    manifest = {
+        "source": os.path.abspath(pdf_path),
+        "sha256": digest,
+        "pages": page_count,
+        "chunks": len(chunks),
+        "chunk_size": chunk_size,
+        "chunk_overlap": chunk_overlap,
+        "length_unit": length_unit,
+        "timings": {
+            "extract_and_chunk": round(extracted - started, 3),
+            "index": round(indexed - extracted, 3),
+            "analysis": round(finished - indexed, 3),
+            "total": round(elapsed, 3),
+        },
+        "stages": {name: round(stats["seconds"], 3) for name, stats in tracing.summary().items()},
+        "pages_per_second": round(page_count / elapsed, 2) if elapsed else None,
+        "chunks_per_second": round(len(chunks) / elapsed, 2) if elapsed else None,
+        "completed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    if trace:
+        tracing.export_json(os.path.join(out_dir, TRACE_FILE))
+    # Written last: its presence marks the document as done
+    _write_json_atomic(os.path.join(out_dir, MANIFEST_FILE), manifest)
+    return manifest
+
+def find_pdfs(directory, recursive=False):
+    pdfs = []
+    if recursive:
+        for root, _, files in os.walk(directory):
+            pdfs.extend(os.path.join(root, name) for name in files if name.lower().endswith(".pdf"))
+    else:
+        pdfs = [os.path.join(directory, name) for name in os.listdir(directory) if name.lower().endswith(".pdf")]
+    return sorted(pdfs)
+
+def run_analyze(args):
+    if not os.path.isdir(args.directory):
+        print(f"Not a directory: {args.directory}", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.output, exist_ok=True)
+    pending = []
+    skipped = 0
+    for path in find_pdfs(args.directory, recursive=args.recursive):
+        digest = file_sha256(path)
+        if not args.force and is_done(output_dir_for(args.output, path, digest), digest,
+                                      args.chunk_size, args.chunk_overlap, args.length_unit):
+            skipped += 1
+            continue
+        pending.append((path, digest))
+
+    print(f"{len(pending)} document(s) to process, {skipped} already done.")
+    if not pending:
+        return 0
+
+    failures = 0
+    batch_started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker, initargs=(args.api_key,)) as pool:
+        futures = {
+            pool.submit(analyze_document, path, args.output, args.chunk_size, args.chunk_overlap,
+                        args.length_unit, digest, args.trace): path
+            for path, digest in pending
+        }
+        for future in as_completed(futures):
+            name = os.path.basename(futures[future])
+            try:
+                m = future.result()
+                print(f"[ok]   {name}: {m['pages']} pages, {m['chunks']} chunks in {m['timings']['total']:.1f}s "
+                      f"({m['pages_per_second']} pages/s, {m['chunks_per_second']} chunks/s)")
+            except Exception as e:
+                failures += 1
+                print(f"[fail] {name}: {e}", file=sys.stderr)
+
+    total = time.perf_counter() - batch_started
+    print(f"Finished {len(pending) - failures}/{len(pending)} in {total:.1f}s ({failures} failed).")
+    return 1 if failures else 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="AI Book Analyzer batch tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    analyze = sub.add_parser("analyze", help="Index and analyse every PDF in a directory")
+    analyze.add_argument("directory", help="Folder containing PDF files")
+    analyze.add_argument("-o", "--output", default="analysis_output", help="Output directory (default: analysis_output)")
+    analyze.add_argument("-w", "--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                         help="Number of worker processes")
+    analyze.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    analyze.add_argument("--chunk-overlap", type=int, default=DEFAULT_CHUNK_OVERLAP)
+    analyze.add_argument("--length-unit", choices=["chars", "tokens"], default="chars",
+                         help="Unit for --chunk-size/--chunk-overlap")
+    analyze.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"),
+                         help="Gemini API key (default: $GEMINI_API_KEY, otherwise simulation mode)")
+    analyze.add_argument("-r", "--recursive", action="store_true", help="Also scan sub-directories")
+    analyze.add_argument("--force", action="store_true", help="Re-process documents that are already done")
+    analyze.add_argument("--trace", action="store_true", help="Write a per-document trace.json of stage timings")
+    analyze.set_defaults(func=run_analyze)
+    return parser
+
+def main(argv=None):
+    logging.basicConfig(level=logging.WARNING)
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,6 @@
+import os
+import json
+import logging
 
 # App Configuration
 APP_NAME = "AI Book Analyzer Pro"
@@ -7,8 +10,77 @@ LAYOUT_MODE = "wide"
 # Analysis Config
 DEFAULT_CHUNK_SIZE = 1000
 DEFAULT_CHUNK_OVERLAP = 150
+DEFAULT_CHUNK_TOKENS = 256
+DEFAULT_CHUNK_TOKEN_OVERLAP = 40
 MIN_SENTENCE_LENGTH = 20
 
+# "inline" processes uploads in the Streamlit process; "worker" queues them for
+# ingestion workers (python -m src.worker) and polls until the index is ready
+INGEST_MODE = os.environ.get("BOOK_ANALYZER_INGEST", "inline")
+INGEST_POLL_SECONDS = 1.0
+
+# Saved search indices are opened as read-only memory maps of their vectors,
+# so every process serving the same book shares the OS page cache
+VECTOR_MMAP = os.environ.get("BOOK_ANALYZER_VECTOR_MMAP", "1") != "0"
+# Vectors scanned by search: "float32", or a quantised copy ("int8": 4x, "float16":
+# 2x smaller) whose top candidates are re-scored from the float32 vectors
+VECTOR_DTYPE = os.environ.get("BOOK_ANALYZER_VECTOR_DTYPE", "float32")
+if VECTOR_DTYPE not in ("float32", "float16", "int8"):
+    logging.getLogger(__name__).warning(f"Ignoring invalid BOOK_ANALYZER_VECTOR_DTYPE {VECTOR_DTYPE!r}; using float32")
+    VECTOR_DTYPE = "float32"
+
+# LLM pricing in USD per million tokens, for cost estimates in the usage view.
+# Keys are backend names; "kind:model" names fall back to their "kind" entry.
+LLM_PRICING = {
+    "gemini": {"input": 0.30, "output": 2.50},  # gemini-2.5-flash
+    "openai": {"input": 0.15, "output": 0.60},  # gpt-4o-mini
+    "local": {"input": 0.0, "output": 0.0},
+}
+LLM_REQUEST_TIMEOUT = 60
+# Pool limits of the shared async HTTP client (pending async calls beyond this wait for a connection)
+LLM_MAX_CONNECTIONS = 200
+LLM_MAX_KEEPALIVE = 50
+
+# LLM rate limits (requests and tokens per minute). "global" applies per backend
+# credential (e.g. the shared Gemini key); the rest are per user, by role. All
+# guests share the "guest_user" id, so "Guest" is effectively one pooled quota.
+# None = no per-user limit.
+LLM_RATE_LIMITS = {
+    "global": {"rpm": int(os.environ.get("BOOK_ANALYZER_LLM_RPM", 60)),
+               "tpm": int(os.environ.get("BOOK_ANALYZER_LLM_TPM", 1_000_000))},
+    "Guest": {"rpm": 6, "tpm": 60_000},
+    "Registered": {"rpm": 20, "tpm": 250_000},
+    "Admin": None,
+    "default": {"rpm": 20, "tpm": 250_000},
+}
+# Seconds a call waits for rate limit capacity before giving up
+LLM_QUEUE_TIMEOUT = 120
+# Response tokens reserved per call until the real count is known
+LLM_RESPONSE_TOKEN_RESERVE = 1000
+
+# Extra LLM backends; with more than one configured, calls go through the router
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")
+OPENAI_MODEL = os.environ.get("OPENAI_MODEL", "gpt-4o-mini")
+LOCAL_LLM_URL = os.environ.get("BOOK_ANALYZER_LOCAL_LLM_URL", "")  # e.g. http://localhost:8080/v1
+LOCAL_LLM_MODEL = os.environ.get("BOOK_ANALYZER_LOCAL_LLM_MODEL", "local")
+def _load_routes(value):
+    """Parse BOOK_ANALYZER_LLM_ROUTES; a malformed value is ignored rather than breaking startup."""
+    try:
+        routes = json.loads(value)
+        if not isinstance(routes, dict) or not all(isinstance(v, list) for v in routes.values()):
+            raise ValueError("expected an object of feature -> list of backend names")
+        return routes
+    except ValueError as e:
+        logging.getLogger(__name__).warning(
+            f"Ignoring invalid BOOK_ANALYZER_LLM_ROUTES ({e}); using the default backend order")
+        return {}
+
+# Feature -> backend names in preference order ("default" covers the rest), as JSON
+LLM_ROUTES = _load_routes(os.environ.get("BOOK_ANALYZER_LLM_ROUTES", "{}"))
+# Accounts that can see the LLM usage view (besides the "Admin" role)
+ADMIN_EMAILS = {e.strip().lower() for e in os.environ.get("BOOK_ANALYZER_ADMINS", "").split(",") if e.strip()}
+
 # UI Colors (Professional Palette)
 PRIMARY_COLOR = "#2c3e50"
 SECONDARY_COLOR = "#3498db"
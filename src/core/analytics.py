@@ -4,6 +4,8 @@ import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
 import numpy as np
+from src.utils.nltk_data import missing_nltk_data
+from src.core.chunks import ChunkStore
 
 class AnalyticsEngine:
     """
@@ -11,8 +13,8 @@ class AnalyticsEngine:
     """
     
     def __init__(self, chunks):
-        self.chunks = chunks
-        self.raw_texts = [d.page_content for d in chunks]
+        self.chunks = ChunkStore.from_chunks(chunks)
+        self.missing_nltk_data = missing_nltk_data()
         
     def calculate_reading_complexity(self):
         """Calculates Flesch Reading Ease score via TextBlob/heuristic."""
@@ -20,7 +22,7 @@ class AnalyticsEngine:
         # Approx: 206.835 - 1.015(words/sentences) - 84.6(syllables/words)
         
         scores = []
-        for text in self.raw_texts[:20]: # Sample
+        for text in self.chunks.texts(range(min(20, len(self.chunks)))): # Sample
             blob = textblob.TextBlob(text)
             sent_count = len(blob.sentences) or 1
             word_count = len(blob.words) or 1
@@ -49,7 +51,7 @@ class AnalyticsEngine:
     def generate_sentiment_arc(self):
         """Generates sentiment over narrative time (chart)."""
         sentiments = []
-        for i, text in enumerate(self.raw_texts):
+        for i, text in enumerate(self.chunks.texts()):
             blob = textblob.TextBlob(text)
             sentiments.append({
                 "Chunk": i + 1,
@@ -68,7 +70,7 @@ class AnalyticsEngine:
 
     def generate_word_distribution(self):
         """Generates a bar chart of top non-stop keywords."""
-        all_text = " ".join(self.raw_texts[:50])
+        all_text = " ".join(self.chunks.texts(range(min(50, len(self.chunks)))))
         blob = textblob.TextBlob(all_text)
         
         # Stopwords (very basic set for speed, ideally use nltk)
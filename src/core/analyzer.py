@@ -1,6 +1,7 @@
 
+import asyncio
 import collections
-import streamlit as st
+import numpy as np
 import logging
 from src.core.nlp import SemanticSearchEngine
 from collections import Counter
@@ -9,49 +10,168 @@ import re
 logger = logging.getLogger(__name__)
 
 
-from src.core.llm import get_llm_provider
+from src.core.llm import get_llm_provider, SimulationProvider
 
 
 from src.core.context import ContextManager
+from src.core.chunks import ChunkStore
+from src.core.sections import SectionSummaries, keywords
+from src.core.summarizer import ExtractiveSummarizer
+from src.core.topics import TopicModel
+from src.core.concepts import ConceptGraph
 
 class AnalysisEngine:
-    def __init__(self, chunks, api_key=None):
+    def __init__(self, chunks, api_key=None, semantic_engine=None, context_manager=None, precompute_sections=True,
+                 user=None):
         """
         Args:
-            chunks (List[Document]): LangChain documents with metadata
+            chunks (ChunkStore): Shared chunk store (a list of Documents is converted)
             api_key (str): Optional API Key for Generative AI
+            semantic_engine (SemanticSearchEngine): Optional engine to reuse (shares its embedding model;
+                an engine already indexing these exact chunks is used as is)
+            context_manager (ContextManager): Optional context manager (defaults to the local user profile)
+            precompute_sections (bool): Summarize every detected section in the background
+            user (dict): Session user ("id", "role") whose LLM rate limits apply
         """
-        self.chunks = chunks
-        self.raw_text_chunks = [doc.page_content for doc in chunks]
+        self.chunks = ChunkStore.from_chunks(chunks)
         
         # Initialize Context Manager
-        self.context_manager = ContextManager()
+        self.context_manager = context_manager or ContextManager()
         
         # Initialize Semantic Engine
-        self.semantic_engine = SemanticSearchEngine()
-        self.index_ready = self.semantic_engine.build_index(chunks)
+        self.semantic_engine = semantic_engine or SemanticSearchEngine()
+        if self.semantic_engine.index is not None and self.semantic_engine.chunks is self.chunks:
+            # Loaded from disk (e.g. built by an ingestion worker)
+            self.index_ready = True
+        else:
+            self.index_ready = self.semantic_engine.build_index(self.chunks)
         
         # Initialize LLM
-        self.llm_provider = get_llm_provider(api_key)
+        self.llm_provider = get_llm_provider(api_key, user=user)
+
+        # Offline summaries from the index vectors (no-key mode and LLM fallback)
+        self.summarizer = ExtractiveSummarizer(self.chunks, self.semantic_engine)
+        # k-means topics over the same vectors: offline questions/FAQs and compact prompt context
+        self.topics = TopicModel(self.chunks, self.semantic_engine)
+        # Key-term graph for the concept map (built on first use, cached per document)
+        self.concepts = ConceptGraph(self.chunks, self.semantic_engine)
+
+        # Per-section summaries/keywords, used as first-stage context for chat
+        self.section_summaries = SectionSummaries(self.chunks, self.llm_provider, summarizer=self.summarizer)
+        if precompute_sections:
+            self.section_summaries.start()
         
         # Fallback Stats
-        self.total_docs = len(chunks)
+        self.total_docs = len(self.chunks)
+
+    def _offline(self):
+        """True when there is no real LLM and the local (index-based) pipelines can stand in."""
+        return isinstance(self.llm_provider, SimulationProvider) and self.summarizer.available
+
+    def _sample_context(self, indices):
+        """Join the texts of the given chunk positions (negative = from the end)."""
+        n = len(self.chunks)
+        return "\n\n".join(self.chunks.get_text(i % n) for i in indices if i < n)
+
+    def _section_context(self, section, budget=6000):
+        """Evenly spaced chunk texts from one section, up to `budget` characters."""
+        start, stop = self.chunks.section_range(section)
+        if stop <= start:
+            return ""
+        lengths = self.chunks.lengths[start:stop]
+        # Take every n-th chunk so the sample spans the whole section
+        step = max(1, int(np.ceil(lengths.sum() / budget)))
+        text = "\n\n".join(self.chunks.texts(range(start, stop, step)))
+        return text[:budget]
+
+    def generate_section_summary(self, section, user_goal="General Reading"):
+        """
+        Summarizes one chapter/section using only that section's chunks.
+
+        Args:
+            section (int): Index into self.chunks.sections
+        """
+        answer, prompt = self._section_summary_prompt(section, user_goal)
+        if prompt is None:
+            return answer
+        return self.llm_provider.generate_text(prompt, feature="section_summary")
+
+    async def agenerate_section_summary(self, section, user_goal="General Reading"):
+        """Async generate_section_summary."""
+        answer, prompt = await asyncio.to_thread(self._section_summary_prompt, section, user_goal)
+        if prompt is None:
+            return answer
+        return await self.llm_provider.agenerate_text(prompt, feature="section_summary")
+
+    def _section_summary_prompt(self, section, user_goal):
+        """(answer, None) when no LLM call is needed, else (None, prompt)."""
+        if not self.chunks.sections:
+            return "No chapter structure was detected in this document.", None
+
+        info = self.chunks.sections[section]
+        self.context_manager.log_interaction("section_summary_generated",
+                                             details={"goal": user_goal, "section": info.title})
+
+        if self._offline():
+            sentences = self.summarizer.summarize(6, self.chunks.section_range(section))
+            if sentences:
+                return "\n".join(f"- {s} *(p. {int(self.chunks.pages[c])})*" for s, c in sentences), None
+        adaptive_note = self.context_manager.get_adaptive_prompt_instruction()
+
+        prompt = f"""
+        {adaptive_note}
+        You are an expert AI Book Summarizer helping a user with the goal: '{user_goal}'.
+        Write a concise summary of the section "{info.title}" (pages {info.page}-{info.end_page}).
+        Use bullet points for the key ideas and end with 3 quick revision notes.
+        Constraint: Do NOT hallucinate. Use only the provided text.
+
+        Context:
+        {self._section_context(section)}
+
+        Summary:
+        """
+        return None, prompt
 
     def generate_summary(self, user_goal="General Reading"):
         """
         Generates a summary using LLM if available, otherwise heuristic.
         Adapts to user_goal (e.g., Exam Prep, Research) and User Context.
         """
+        answer, prompt = self._summary_prompt(user_goal)
+        if prompt is None:
+            return answer
+        return self.llm_provider.generate_text(prompt, feature="summary")
+
+    async def agenerate_summary(self, user_goal="General Reading"):
+        """Async generate_summary."""
+        answer, prompt = await asyncio.to_thread(self._summary_prompt, user_goal)
+        if prompt is None:
+            return answer
+        return await self.llm_provider.agenerate_text(prompt, feature="summary")
+
+    def _summary_prompt(self, user_goal):
+        """(answer, None) when no LLM call is needed, else (None, prompt)."""
         if not self.chunks:
-            return "No content available."
+            return "No content available.", None
 
         # Log Interaction
         self.context_manager.log_interaction("summary_generated", details={"goal": user_goal})
 
-        # Context for Summary
-        indices = [0, 1, len(self.chunks)//2, len(self.chunks)//2 + 1, -2, -1]
-        context_docs = [self.chunks[i] for i in indices if i < len(self.chunks)]
-        context_text = "\n\n".join([d.page_content for d in context_docs])
+        if self._offline():
+            summary = self.summarizer.book_summary(key_terms=keywords(self.chunks.text, 6))
+            if summary:
+                return summary, None
+
+        # Context for Summary: the opening of every chapter if the structure is known
+        chapters = self.chunks.chapters()
+        if len(chapters) >= 2:
+            budget = max(300, 6000 // len(chapters))
+            context_text = "\n\n".join(
+                f"[{self.chunks.sections[c].title}]: {self._section_context(c, budget)}" for c in chapters
+            )
+        else:
+            indices = [0, 1, len(self.chunks)//2, len(self.chunks)//2 + 1, -2, -1]
+            context_text = self._sample_context(indices)
         
         # Adaptive Instruction
         adaptive_note = self.context_manager.get_adaptive_prompt_instruction()
@@ -93,30 +213,78 @@ class AnalysisEngine:
         
         Summary:
         """
-        
-        return self.llm_provider.generate_text(prompt)
+        return None, prompt
 
-    def answer_question(self, question):
+    def answer_question(self, question, section=None):
         """
         Answers a question using Semantic Search + LLM Synthesis + Context.
+
+        Args:
+            question (str): User question
+            section (int): Optional section index to restrict retrieval to
+        """
+        answer, prompt = self._answer_prompt(question, section)
+        if prompt is None:
+            return answer
+        return self.llm_provider.generate_text(prompt, feature="chat")
+
+    async def aanswer_question(self, question, section=None):
+        """Async answer_question; retrieval runs in a worker thread, the LLM call on the event loop."""
+        answer, prompt = await asyncio.to_thread(self._answer_prompt, question, section)
+        if prompt is None:
+            return answer
+        return await self.llm_provider.agenerate_text(prompt, feature="chat")
+
+    async def astream_answer(self, question, section=None):
         """
+        Streaming answer_question.
+
+        Yields:
+            str: Answer text pieces as the model produces them
+        """
+        answer, prompt = await asyncio.to_thread(self._answer_prompt, question, section)
+        if prompt is None:
+            yield answer
+            return
+        async for piece in self.llm_provider.astream_text(prompt, feature="chat"):
+            yield piece
+
+    def _answer_prompt(self, question, section):
+        """(answer, None) when no LLM call is needed, else (None, prompt)."""
         if not self.index_ready:
-            return "Search index is not ready."
+            return "Search index is not ready.", None
 
         # Log Interaction
         self.context_manager.log_interaction("question_asked", query=question)
 
+        # 0. Precomputed section digests: "summarize chapter 5" needs no retrieval at all
+        digest = None
+        referenced = self.section_summaries.find_referenced_section(question)
+        if section is None and referenced is not None:
+            section = referenced
+        if section is not None:
+            digest = self.section_summaries.get(section)
+            if digest and referenced == section and re.search(r"\bsummar|\boverview\b", question, re.IGNORECASE):
+                info = self.chunks.sections[section]
+                return f"**{info.title}** (pp. {info.page}–{info.end_page})\n\n{digest['summary']}", None
+        else:
+            match = self.section_summaries.best_matching_section(question)
+            digest = self.section_summaries.get(match) if match is not None else None
+
         # 1. Retrieve relevant chunks (Semantic Search)
-        results = self.semantic_engine.search(question, k=4)
+        results = self.semantic_engine.search(question, k=4, section=section)
         
         if not results:
-            return "I couldn't find relevant information in the uploaded text."
+            return "I couldn't find relevant information in the uploaded text.", None
             
         # 2. Prepare Context
         context_text = ""
+        if digest:
+            context_text += f"[Section overview: {digest['title']}]: {digest['summary']}\n\n"
         for i, doc in enumerate(results):
             page = doc.metadata.get('page', '?')
-            context_text += f"[Page {page}]: {doc.page_content}\n\n"
+            where = f"Page {page}, {doc.metadata['section']}" if 'section' in doc.metadata else f"Page {page}"
+            context_text += f"[{where}]: {doc.page_content}\n\n"
 
         # Adaptive Instruction
         adaptive_note = self.context_manager.get_adaptive_prompt_instruction()
@@ -134,18 +302,42 @@ class AnalysisEngine:
         
         Answer (Academic & Citations):
         """
-        
-        return self.llm_provider.generate_text(prompt)
+        return None, prompt
+
+    def generate_questions(self, local=False):
+        """
+        Generates questions based on content analysis using LLM.
+
+        Args:
+            local (bool): Build them from topic clusters without an LLM call
+        """
+        answer, prompt = self._questions_prompt(local)
+        if prompt is None:
+            return answer
+        return self._parse_questions(self.llm_provider.generate_text(prompt, feature="questions"))
+
+    async def agenerate_questions(self, local=False):
+        """Async generate_questions."""
+        answer, prompt = await asyncio.to_thread(self._questions_prompt, local)
+        if prompt is None:
+            return answer
+        return self._parse_questions(await self.llm_provider.agenerate_text(prompt, feature="questions"))
 
-    def generate_questions(self):
-        """Generates questions based on content analysis using LLM."""
+    def _questions_prompt(self, local):
+        """(questions, None) when no LLM call is needed, else (None, prompt)."""
         if not self.chunks:
-            return []
+            return [], None
 
-        # Context (Random sample of chunks to catch different topics)
-        indices = [0, len(self.chunks)//3, 2*len(self.chunks)//3, -1]
-        context_docs = [self.chunks[i] for i in indices if i < len(self.chunks)]
-        context_text = "\n\n".join([d.page_content for d in context_docs])
+        if local or self._offline():
+            questions = [q for q, _ in self.topics.questions(5)]
+            if questions:
+                return questions, None
+
+        # Context: the central passage of every topic (falls back to a spread of chunks)
+        context_text = self.topics.context(3000)
+        if not context_text:
+            indices = [0, len(self.chunks)//3, 2*len(self.chunks)//3, -1]
+            context_text = self._sample_context(indices)
 
         prompt = f"""
         Based on the following text context, generate 5 thought-provoking discussion questions that test understanding of the key concepts.
@@ -156,22 +348,48 @@ class AnalysisEngine:
         
         Questions:
         """
-        
-        response = self.llm_provider.generate_text(prompt)
-        
+        return None, prompt
+
+    @staticmethod
+    def _parse_questions(response):
         # Parse response into list
         questions = [line.strip().lstrip('- ').lstrip('1234567890. ') for line in response.split('\n') if line.strip()]
         return questions[:10]  # Limit to reasonable number
 
-    def generate_faqs(self):
-        """Generates FAQs based on content using LLM."""
+    def generate_faqs(self, local=False):
+        """
+        Generates FAQs based on content using LLM.
+
+        Args:
+            local (bool): Answer with representative sentences of topic clusters, without an LLM call
+        """
+        answer, prompt = self._faqs_prompt(local)
+        if prompt is None:
+            return answer
+        return self._parse_faqs(self.llm_provider.generate_text(prompt, feature="faq"))
+
+    async def agenerate_faqs(self, local=False):
+        """Async generate_faqs."""
+        answer, prompt = await asyncio.to_thread(self._faqs_prompt, local)
+        if prompt is None:
+            return answer
+        return self._parse_faqs(await self.llm_provider.agenerate_text(prompt, feature="faq"))
+
+    def _faqs_prompt(self, local):
+        """(faqs, None) when no LLM call is needed, else (None, prompt)."""
         if not self.chunks:
-            return []
+            return [], None
+
+        if local or self._offline():
+            faqs = self.topics.faqs(5)
+            if faqs:
+                return faqs, None
 
-        # Context
-        indices = [0, len(self.chunks)//2, -1]
-        context_docs = [self.chunks[i] for i in indices if i < len(self.chunks)]
-        context_text = "\n\n".join([d.page_content for d in context_docs])
+        # Context: the central passage of every topic (falls back to a spread of chunks)
+        context_text = self.topics.context(3000)
+        if not context_text:
+            indices = [0, len(self.chunks)//2, -1]
+            context_text = self._sample_context(indices)
 
         prompt = f"""
         Based on the text provided, generate 5 "Frequently Asked Questions" (FAQs) that a reader would likely ask.
@@ -186,9 +404,10 @@ class AnalysisEngine:
         
         FAQs:
         """
-        
-        response = self.llm_provider.generate_text(prompt)
-        
+        return None, prompt
+
+    @staticmethod
+    def _parse_faqs(response):
         # Parse Response
         faqs = []
         pairs = response.split("Q:")
@@ -4,7 +4,6 @@ import hashlib
 import os
 import uuid
 from datetime import datetime
-import streamlit as st
 
 DB_FILE = "user_data/users.db"
 
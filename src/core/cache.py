@@ -0,0 +1,175 @@
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+from langchain_core.documents import Document
+from src.core.chunks import ChunkStore
+from src.core.structure import Section
+
+logger = logging.getLogger(__name__)
+
+# Extracted documents, one directory per PDF SHA-256
+DOCUMENT_CACHE_DIR = "./.cache/documents"
+
+TEXT_FILE = "text.txt"
+PAGES_FILE = "pages.npz"
+META_FILE = "meta.json"
+SECTIONS_FILE = "sections.json"
+# Bump when chunk boundaries change for the same parameters
+SPLITTER_VERSION = 4
+# Bump when extracted page text changes (e.g. header/footer stripping)
+PAGES_VERSION = 2
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+class DocumentCache:
+    """
+    On-disk cache of extracted page text and chunk boundaries, keyed by PDF hash.
+
+    Layout of <cache_dir>/<sha256>/:
+        text.txt                         all page texts concatenated
+        pages.npz                        page numbers and their offsets into text.txt
+        chunks-v<n>-<unit>-<size>-<overlap>.npz   chunk offsets/lengths/pages/start indices
+        index-v<n>-<unit>-<size>-<overlap>/       saved search index, memory-mapped by readers
+        sections.json                    detected chapter/section hierarchy
+        meta.json                        source name and page count
+        <name>.json                      derived artifacts (see load_json/save_json)
+    """
+
+    def __init__(self, cache_dir=DOCUMENT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def _doc_dir(self, digest):
+        return os.path.join(self.cache_dir, digest)
+
+    def _chunks_file(self, digest, chunk_size, chunk_overlap, length_unit):
+        name = f"chunks-v{SPLITTER_VERSION}-{length_unit}-{chunk_size}-{chunk_overlap}.npz"
+        return os.path.join(self._doc_dir(digest), name)
+
+    def index_dir(self, digest, chunk_size, chunk_overlap, length_unit="chars"):
+        """
+        Directory for a saved SemanticSearchEngine (index + chunk store) of this
+        document and chunking. Writers build it elsewhere and rename it into
+        place, so it only exists once complete.
+        """
+        name = f"index-v{SPLITTER_VERSION}-{length_unit}-{chunk_size}-{chunk_overlap}"
+        return os.path.join(self._doc_dir(digest), name)
+
+    def has_index(self, digest, chunk_size, chunk_overlap, length_unit="chars"):
+        return os.path.isdir(self.index_dir(digest, chunk_size, chunk_overlap, length_unit))
+
+    def _load_text(self, digest):
+        with open(os.path.join(self._doc_dir(digest), TEXT_FILE), "r", encoding="utf-8", newline="") as f:
+            return f.read()
+
+    def _load_sections(self, digest):
+        path = os.path.join(self._doc_dir(digest), SECTIONS_FILE)
+        if not os.path.exists(path):
+            return []
+        with open(path, "r", encoding="utf-8") as f:
+            return [Section.from_dict(d) for d in json.load(f)]
+
+    def _load_meta(self, digest):
+        with open(os.path.join(self._doc_dir(digest), META_FILE), "r") as f:
+            return json.load(f)
+
+    def has_pages(self, digest):
+        doc_dir = self._doc_dir(digest)
+        # Entries from before structure detection have no sections file; treat them as misses
+        if not all(os.path.exists(os.path.join(doc_dir, name)) for name in (META_FILE, SECTIONS_FILE)):
+            return False
+        try:
+            return self._load_meta(digest).get("version", 1) == PAGES_VERSION
+        except (OSError, ValueError):
+            return False
+
+    def load_pages(self, digest):
+        """
+        Returns:
+            tuple: (List[Document], page_count, List[Section]) or None on a miss
+        """
+        if not self.has_pages(digest):
+            return None
+        try:
+            meta = self._load_meta(digest)
+            text = self._load_text(digest)
+            sections = self._load_sections(digest)
+            with np.load(os.path.join(self._doc_dir(digest), PAGES_FILE)) as data:
+                numbers, offsets = data["numbers"], data["offsets"]
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable document cache {digest[:12]}: {e}")
+            return None
+        documents = [
+            Document(page_content=text[offsets[i]:offsets[i + 1]],
+                     metadata={"page": int(numbers[i]), "source": meta["source"]})
+            for i in range(len(numbers))
+        ]
+        return documents, meta["page_count"], sections
+
+    def save_pages(self, digest, documents, page_count, sections=None):
+        doc_dir = self._doc_dir(digest)
+        os.makedirs(doc_dir, exist_ok=True)
+        texts = [d.page_content for d in documents]
+        offsets = np.zeros(len(texts) + 1, dtype=np.int64)
+        np.cumsum([len(t) for t in texts], out=offsets[1:])
+        numbers = np.array([d.metadata["page"] for d in documents], dtype=np.int32)
+        source = documents[0].metadata.get("source", "") if documents else ""
+
+        with open(os.path.join(doc_dir, TEXT_FILE), "w", encoding="utf-8", newline="") as f:
+            for t in texts:
+                f.write(t)
+        np.savez(os.path.join(doc_dir, PAGES_FILE), numbers=numbers, offsets=offsets)
+        with open(os.path.join(doc_dir, SECTIONS_FILE), "w", encoding="utf-8") as f:
+            json.dump([s.to_dict() for s in sections or []], f, ensure_ascii=False)
+        # Meta is written last: it marks the page cache as complete
+        with open(os.path.join(doc_dir, META_FILE), "w") as f:
+            json.dump({"source": source, "page_count": page_count, "version": PAGES_VERSION}, f)
+
+    def load_chunks(self, digest, chunk_size, chunk_overlap, length_unit="chars"):
+        """
+        Returns:
+            ChunkStore or None on a miss
+        """
+        path = self._chunks_file(digest, chunk_size, chunk_overlap, length_unit)
+        if not self.has_pages(digest) or not os.path.exists(path):
+            return None
+        try:
+            meta = self._load_meta(digest)
+            text = self._load_text(digest)
+            sections = self._load_sections(digest)
+            with np.load(path) as data:
+                columns = {name: data[name] for name in ("offsets", "lengths", "pages", "start_indices", "section_ids")}
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable chunk cache {digest[:12]}: {e}")
+            return None
+        return ChunkStore(text, source=meta["source"], doc_id=digest, sections=sections, **columns)
+
+    def save_chunks(self, digest, store, chunk_size, chunk_overlap, length_unit="chars"):
+        """
+        Store chunk boundaries of a ChunkStore built over this document's pages
+        (see ChunkStore.from_pages).
+        """
+        np.savez(self._chunks_file(digest, chunk_size, chunk_overlap, length_unit), offsets=store.offsets,
+                 lengths=store.lengths, pages=store.pages, start_indices=store.start_indices,
+                 section_ids=store.section_ids)
+
+    def load_json(self, digest, name):
+        """Derived artifact written by save_json(), or None on a miss."""
+        path = os.path.join(self._doc_dir(digest), f"{name}.json")
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {name} for {digest[:12]}: {e}")
+            return None
+
+    def save_json(self, digest, name, data):
+        """Store a derived artifact (e.g. the concept graph) next to the document."""
+        doc_dir = self._doc_dir(digest)
+        os.makedirs(doc_dir, exist_ok=True)
+        with open(os.path.join(doc_dir, f"{name}.json"), "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False)
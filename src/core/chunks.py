@@ -0,0 +1,237 @@
+import os
+import sys
+import json
+import hashlib
+import numpy as np
+from langchain_core.documents import Document
+from src.core.structure import Section, chapter_of
+
+TEXT_FILE = "text.txt"
+ARRAYS_FILE = "chunks.npz"
+META_FILE = "chunks.json"
+
+class ChunkStore:
+    """
+    Compact, array-backed storage for a book's chunks.
+
+    All chunk texts are slices of one text buffer (the concatenated pages), so
+    overlapping chunks don't duplicate text. Per-chunk data lives in NumPy
+    arrays instead of one `Document` + metadata dict per chunk. The analyzer,
+    analytics, search index and exporters all share the same instance.
+    """
+    __slots__ = ("text", "offsets", "lengths", "pages", "start_indices", "source", "doc_id",
+                 "section_ids", "sections")
+
+    def __init__(self, text, offsets, lengths, pages, start_indices, source="", doc_id=None,
+                 section_ids=None, sections=None):
+        """
+        Args:
+            text (str): Text buffer that all chunks point into
+            offsets (np.ndarray): Start of each chunk in `text`
+            lengths (np.ndarray): Length of each chunk
+            pages (np.ndarray): Page number of each chunk
+            start_indices (np.ndarray): Start of each chunk within its page
+            source (str): Source file name
+            doc_id (str): Document identifier (file SHA-256)
+            section_ids (np.ndarray): Innermost section of each chunk (-1 = none)
+            sections (List[Section]): Heading hierarchy in document order
+        """
+        self.text = text
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.lengths = np.asarray(lengths, dtype=np.int32)
+        self.pages = np.asarray(pages, dtype=np.int32)
+        self.start_indices = np.asarray(start_indices, dtype=np.int32)
+        self.source = source
+        self.doc_id = doc_id
+        if section_ids is None:
+            section_ids = np.full(len(self.offsets), -1)
+        self.section_ids = np.asarray(section_ids, dtype=np.int32)
+        self.sections = list(sections or [])
+
+    @classmethod
+    def from_pages(cls, pages, chunks, doc_id=None):
+        """
+        Build a store whose buffer is the concatenated page text.
+
+        Args:
+            pages (List[Document]): Page documents the chunks were split from
+            chunks (List[Document]): Chunks with 'page' and 'start_index' metadata
+
+        Returns:
+            ChunkStore, or None if a chunk is not an exact slice of its page
+        """
+        page_offsets = {}
+        page_texts = {}
+        position = 0
+        for d in pages:
+            page_offsets[d.metadata["page"]] = position
+            page_texts[d.metadata["page"]] = d.page_content
+            position += len(d.page_content)
+
+        count = len(chunks)
+        offsets = np.empty(count, dtype=np.int64)
+        lengths = np.empty(count, dtype=np.int32)
+        page_numbers = np.empty(count, dtype=np.int32)
+        start_indices = np.empty(count, dtype=np.int32)
+        for i, chunk in enumerate(chunks):
+            page = chunk.metadata["page"]
+            start_index = chunk.metadata.get("start_index", -1)
+            content = chunk.page_content
+            if start_index < 0 or page_texts[page][start_index:start_index + len(content)] != content:
+                return None
+            offsets[i] = page_offsets[page] + start_index
+            lengths[i] = len(content)
+            page_numbers[i] = page
+            start_indices[i] = start_index
+
+        source = pages[0].metadata.get("source", "") if pages else ""
+        text = "".join(d.page_content for d in pages)
+        return cls(text, offsets, lengths, page_numbers, start_indices, source=source, doc_id=doc_id)
+
+    @classmethod
+    def from_spans(cls, pages, spans, doc_id=None, section_ids=None, sections=None):
+        """
+        Build a store directly from splitter output, without chunk Documents.
+
+        Args:
+            pages (List[Document]): Page documents
+            spans (List[List[tuple]]): (start, end) spans per page, as TextSplitter.split_spans returns
+            section_ids (List[int]): Section index per chunk
+            sections (List[Section]): Heading hierarchy
+        """
+        page_starts = np.zeros(len(pages), dtype=np.int64)
+        if len(pages) > 1:
+            np.cumsum([len(d.page_content) for d in pages[:-1]], out=page_starts[1:])
+        counts = [len(page_spans) for page_spans in spans]
+        flat = np.array([span for page_spans in spans for span in page_spans], dtype=np.int64).reshape(-1, 2)
+        page_index = np.repeat(np.arange(len(pages)), counts)
+        page_numbers = np.array([d.metadata["page"] for d in pages], dtype=np.int32)
+
+        source = pages[0].metadata.get("source", "") if pages else ""
+        text = "".join(d.page_content for d in pages)
+        return cls(text, page_starts[page_index] + flat[:, 0], flat[:, 1] - flat[:, 0],
+                   page_numbers[page_index], flat[:, 0], source=source, doc_id=doc_id,
+                   section_ids=section_ids, sections=sections)
+
+    @classmethod
+    def from_chunks(cls, chunks, doc_id=None):
+        """Build a store from standalone chunk Documents (buffer = chunk texts back to back)."""
+        if isinstance(chunks, ChunkStore):
+            return chunks
+        chunks = list(chunks)
+        lengths = np.array([len(c.page_content) for c in chunks], dtype=np.int32)
+        offsets = np.zeros(len(chunks), dtype=np.int64)
+        if len(chunks) > 1:
+            np.cumsum(lengths[:-1], out=offsets[1:])
+        pages = [c.metadata.get("page", 0) for c in chunks]
+        start_indices = [c.metadata.get("start_index", 0) for c in chunks]
+        source = chunks[0].metadata.get("source", "") if chunks else ""
+        text = "".join(c.page_content for c in chunks)
+        return cls(text, offsets, lengths, pages, start_indices, source=source, doc_id=doc_id)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def select(self, indices):
+        """New store with only the given chunks (same text buffer and sections)."""
+        indices = np.asarray(indices, dtype=np.int64)
+        return ChunkStore(self.text, self.offsets[indices], self.lengths[indices], self.pages[indices],
+                          self.start_indices[indices], source=self.source, doc_id=self.doc_id,
+                          section_ids=self.section_ids[indices], sections=self.sections)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def get_text(self, i):
+        """Text of chunk i (a slice of the shared buffer)."""
+        start = int(self.offsets[i])
+        return self.text[start:start + int(self.lengths[i])]
+
+    def texts(self, indices=None):
+        """Iterate over chunk texts, optionally only the given indices."""
+        if indices is None:
+            indices = range(len(self))
+        for i in indices:
+            yield self.get_text(i)
+
+    def metadata(self, i):
+        metadata = {"page": int(self.pages[i]), "source": self.source, "start_index": int(self.start_indices[i])}
+        section = int(self.section_ids[i])
+        if section >= 0:
+            metadata["section"] = self.sections[section].title
+            metadata["chapter"] = self.sections[chapter_of(self.sections, section)].title
+        return metadata
+
+    def chapters(self):
+        """Indices of top-level sections."""
+        return [i for i, s in enumerate(self.sections) if s.parent < 0]
+
+    def section_range(self, section):
+        """
+        Chunk ids covered by a section and its sub-sections.
+        Chunks never cross section boundaries, so this is a contiguous range.
+
+        Returns:
+            tuple: (first chunk id, last chunk id + 1)
+        """
+        s = self.sections[section]
+        return (int(np.searchsorted(self.offsets, s.offset, side="left")),
+                int(np.searchsorted(self.offsets, s.end, side="left")))
+
+    def document(self, i):
+        """Chunk i as a LangChain Document, built on demand."""
+        return Document(page_content=self.get_text(i), metadata=self.metadata(i))
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.document(j) for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("chunk index out of range")
+        return self.document(i)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.document(i)
+
+    def nbytes(self):
+        """Approximate memory held by the store (text buffer + arrays)."""
+        arrays = self.offsets.nbytes + self.lengths.nbytes + self.pages.nbytes + self.start_indices.nbytes
+        return sys.getsizeof(self.text) + arrays
+
+    def fingerprint(self):
+        """Hash identifying this exact set of chunks (document + chunk boundaries)."""
+        h = hashlib.sha256()
+        h.update((self.doc_id or self.text).encode("utf-8"))
+        for array in (self.offsets, self.lengths):
+            h.update(np.ascontiguousarray(array).tobytes())
+        return h.hexdigest()
+
+    def save(self, directory):
+        """Write the store to a directory (text buffer, arrays, metadata)."""
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, TEXT_FILE), "w", encoding="utf-8", newline="") as f:
+            f.write(self.text)
+        np.savez(os.path.join(directory, ARRAYS_FILE), offsets=self.offsets, lengths=self.lengths,
+                 pages=self.pages, start_indices=self.start_indices, section_ids=self.section_ids)
+        with open(os.path.join(directory, META_FILE), "w") as f:
+            json.dump({"source": self.source, "doc_id": self.doc_id,
+                       "sections": [s.to_dict() for s in self.sections]}, f)
+
+    @classmethod
+    def load(cls, directory):
+        with open(os.path.join(directory, TEXT_FILE), "r", encoding="utf-8", newline="") as f:
+            text = f.read()
+        with open(os.path.join(directory, META_FILE), "r") as f:
+            meta = json.load(f)
+        sections = [Section.from_dict(d) for d in meta.get("sections", [])]
+        with np.load(os.path.join(directory, ARRAYS_FILE)) as data:
+            section_ids = data["section_ids"] if "section_ids" in data.files else None
+            return cls(text, data["offsets"], data["lengths"], data["pages"], data["start_indices"],
+                       source=meta.get("source", ""), doc_id=meta.get("doc_id"),
+                       section_ids=section_ids, sections=sections)
@@ -0,0 +1,173 @@
+import hashlib
+import logging
+import numpy as np
+import faiss
+from src.core.cache import DocumentCache
+
+logger = logging.getLogger(__name__)
+
+# Bump when the graph construction changes
+CONCEPTS_VERSION = 1
+MAX_TERMS = 60
+# Terms in more than this share of chunks are too generic to be concepts
+MAX_TERM_DF = 0.5
+MIN_TERM_DF = 3
+# Edges: co-occurrence Jaccard or embedding cosine above these thresholds
+MIN_JACCARD = 0.08
+MIN_SIMILARITY = 0.55
+MAX_EDGES_PER_TERM = 5
+
+class ConceptGraph:
+    """
+    Concept map of a book: key terms linked by co-occurrence and meaning.
+
+    Terms come from a sparse binary chunk-term matrix; co-occurrence counts are
+    one sparse product (X^T X), and term-term similarity is a single batched
+    FAISS range_search over the term embeddings. The result is cached next to
+    the document, so it is only built once per book and chunking.
+    """
+
+    def __init__(self, chunks, semantic_engine, cache=None):
+        """
+        Args:
+            chunks (ChunkStore): Shared chunk store
+            semantic_engine (SemanticSearchEngine): Engine used to embed terms and find passages
+            cache (DocumentCache): Cache to use (default: on-disk cache)
+        """
+        self.chunks = chunks
+        self.semantic_engine = semantic_engine
+        self.cache = cache or DocumentCache()
+        self._graph = None
+
+    def _cache_name(self):
+        h = hashlib.sha256(self.chunks.offsets.tobytes())
+        h.update(self.chunks.lengths.tobytes())
+        return f"concepts-v{CONCEPTS_VERSION}-{h.hexdigest()[:16]}"
+
+    def graph(self):
+        """
+        Returns:
+            dict: {"terms": [{"term", "df"}], "edges": [[i, j, jaccard, similarity]]},
+            empty lists if the graph could not be built
+        """
+        if self._graph is not None:
+            return self._graph
+        doc_id = self.chunks.doc_id
+        if doc_id:
+            self._graph = self.cache.load_json(doc_id, self._cache_name())
+            if self._graph is not None:
+                return self._graph
+        try:
+            self._graph = self._build()
+        except Exception as e:
+            logger.error(f"Concept graph failed: {e}")
+            return {"terms": [], "edges": []}
+        if doc_id:
+            self.cache.save_json(doc_id, self._cache_name(), self._graph)
+        return self._graph
+
+    def _build(self):
+        from sklearn.feature_extraction.text import CountVectorizer
+
+        n = len(self.chunks)
+        # Document-frequency limits only make sense once there are enough chunks
+        small = n < 4 * MIN_TERM_DF
+        vectorizer = CountVectorizer(
+            stop_words="english", ngram_range=(1, 2), binary=True, lowercase=True,
+            token_pattern=r"(?u)\b[a-zA-Z][a-zA-Z\-]{3,}\b",
+            min_df=1 if small else MIN_TERM_DF, max_df=1.0 if small else MAX_TERM_DF,
+        )
+        matrix = vectorizer.fit_transform(self.chunks.texts()).tocsc()
+        vocabulary = vectorizer.get_feature_names_out()
+        df = np.asarray(matrix.sum(axis=0)).ravel()
+
+        # Most frequent terms, skipping any that share a word with one already chosen
+        chosen, used_words = [], set()
+        for column in np.argsort(-df):
+            words = set(vocabulary[column].split())
+            if words & used_words:
+                continue
+            chosen.append(column)
+            used_words |= words
+            if len(chosen) == MAX_TERMS:
+                break
+        if len(chosen) < 2:
+            return {"terms": [], "edges": []}
+        terms = [str(vocabulary[c]) for c in chosen]
+        counts = df[chosen]
+        x = matrix[:, chosen]
+
+        # Co-occurrence: chunks containing both terms, as Jaccard overlap
+        together = (x.T @ x).toarray().astype(np.float32)
+        jaccard = together / (counts[:, None] + counts[None, :] - together)
+        np.fill_diagonal(jaccard, 0)
+
+        # Meaning: every term against every other term in one range search
+        similarity = np.zeros_like(jaccard)
+        if self.semantic_engine is not None and self.semantic_engine.embeddings is not None:
+            vectors = self.semantic_engine.embed_texts(terms)
+            index = faiss.IndexFlatIP(vectors.shape[1])
+            index.add(vectors)
+            limits, distances, labels = index.range_search(vectors, MIN_SIMILARITY)
+            for i in range(len(terms)):
+                neighbours = slice(limits[i], limits[i + 1])
+                similarity[i, labels[neighbours]] = distances[neighbours]
+            np.fill_diagonal(similarity, 0)
+
+        # Keep the strongest links of every term
+        strength = np.where(jaccard >= MIN_JACCARD, jaccard, 0) + np.where(similarity >= MIN_SIMILARITY, similarity, 0)
+        edges = set()
+        for i in range(len(terms)):
+            for j in np.argsort(-strength[i])[:MAX_EDGES_PER_TERM]:
+                if strength[i, j] > 0:
+                    edges.add((min(i, int(j)), max(i, int(j))))
+        logger.info(f"Concept graph: {len(terms)} terms, {len(edges)} links")
+        return {
+            "terms": [{"term": t, "df": int(c)} for t, c in zip(terms, counts)],
+            "edges": [[i, j, round(float(jaccard[i, j]), 3), round(float(similarity[i, j]), 3)]
+                      for i, j in sorted(edges)],
+        }
+
+    def terms(self):
+        return [t["term"] for t in self.graph()["terms"]]
+
+    def related_passages(self, term, k=3):
+        """Passages about a concept (semantic search), as Documents."""
+        return self.semantic_engine.get_related_concepts(term, k=k)
+
+    def figure(self):
+        """Plotly network figure of the concept graph (None if there is nothing to draw)."""
+        import networkx as nx
+        import plotly.graph_objects as go
+
+        data = self.graph()
+        if not data["edges"]:
+            return None
+        g = nx.Graph()
+        for i, t in enumerate(data["terms"]):
+            g.add_node(i, term=t["term"], df=t["df"])
+        for i, j, jaccard, similarity in data["edges"]:
+            g.add_edge(i, j, weight=jaccard + similarity)
+        g.remove_nodes_from([node for node in list(g.nodes) if g.degree(node) == 0])
+        positions = nx.spring_layout(g, weight="weight", seed=42)
+
+        edge_x, edge_y = [], []
+        for i, j in g.edges:
+            edge_x += [positions[i][0], positions[j][0], None]
+            edge_y += [positions[i][1], positions[j][1], None]
+        nodes = list(g.nodes)
+        max_df = max(g.nodes[node]["df"] for node in nodes)
+        fig = go.Figure([
+            go.Scatter(x=edge_x, y=edge_y, mode="lines", line=dict(width=0.6, color="#bdc3c7"), hoverinfo="none"),
+            go.Scatter(
+                x=[positions[node][0] for node in nodes], y=[positions[node][1] for node in nodes],
+                mode="markers+text", text=[g.nodes[node]["term"] for node in nodes], textposition="top center",
+                hovertext=[f"{g.nodes[node]['term']}: {g.nodes[node]['df']} passages" for node in nodes],
+                hoverinfo="text",
+                marker=dict(size=[10 + 20 * g.nodes[node]["df"] / max_df for node in nodes],
+                            color=[g.degree(node) for node in nodes], colorscale="Teal", line=dict(width=1)),
+            ),
+        ])
+        fig.update_layout(title="Concept Map", showlegend=False, template="plotly_white", height=500,
+                          xaxis=dict(visible=False), yaxis=dict(visible=False), margin=dict(l=10, r=10, t=40, b=10))
+        return fig
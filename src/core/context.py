@@ -3,13 +3,22 @@ import json
 import os
 import uuid
 import time
+import threading
 from collections import Counter
 from datetime import datetime
 
 CONTEXT_FILE = "user_data/user_context.json"
 
 class ContextManager:
-    def __init__(self):
+    def __init__(self, persist=True):
+        """
+        Args:
+            persist (bool): Write the context to CONTEXT_FILE. Batch jobs pass False
+                so parallel workers don't race on the same file.
+        """
+        self.persist = persist
+        # Async callers log from worker threads; keep appends and file writes whole
+        self._lock = threading.Lock()
         self.user_id = self._get_or_create_user_id()
         self.context = self._load_context()
         
@@ -46,6 +55,8 @@ class ContextManager:
         }
 
     def _save_context(self):
+        if not self.persist:
+            return
         os.makedirs(os.path.dirname(CONTEXT_FILE), exist_ok=True)
         with open(CONTEXT_FILE, 'w') as f:
             json.dump(self.context, f, indent=4)
@@ -58,14 +69,15 @@ class ContextManager:
             "query": query,
             "details": details
         }
-        self.context['session_history'].append(interaction)
-        
-        # Simple Inference Logic
-        if action_type == "summary_generated":
-            # If user generated summary, maybe update topics?
-            pass
-            
-        self._save_context()
+        with self._lock:
+            self.context['session_history'].append(interaction)
+
+            # Simple Inference Logic
+            if action_type == "summary_generated":
+                # If user generated summary, maybe update topics?
+                pass
+
+            self._save_context()
 
     def get_adaptive_prompt_instruction(self):
         """Returns a string to prepend to LLM prompts based on history."""
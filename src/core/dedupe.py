@@ -0,0 +1,144 @@
+import re
+import zlib
+import logging
+from collections import Counter, defaultdict
+import numpy as np
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Running headers/footers: lines near the top/bottom of a page that repeat on many pages
+EDGE_LINES = 3
+MIN_REPEATED_PAGES = 3
+REPEATED_LINE_SHARE = 0.2
+MAX_BOILERPLATE_CHARS = 120
+
+# MinHash over word shingles, LSH with NUM_BANDS bands of NUM_PERM / NUM_BANDS rows
+SHINGLE_WORDS = 5
+NUM_PERM = 64
+NUM_BANDS = 16
+DUPLICATE_THRESHOLD = 0.8
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+MINHASH_SEED = 1
+
+DIGITS = re.compile(r"\d+")
+WORD = re.compile(r"\w+")
+
+def _normalize_line(line):
+    """Line key that ignores page numbers and spacing ("Page 12" == "Page 13")."""
+    return " ".join(DIGITS.sub("#", line.lower()).split())
+
+def _edge_lines(text):
+    """(start, end, key) of the first and last EDGE_LINES non-empty lines of a page."""
+    lines = []
+    position = 0
+    for line in text.splitlines(keepends=True):
+        if line.strip():
+            lines.append((position, position + len(line), _normalize_line(line)))
+        position += len(line)
+    if len(lines) <= 2 * EDGE_LINES:
+        return lines
+    return lines[:EDGE_LINES] + lines[-EDGE_LINES:]
+
+def strip_repeated_lines(pages):
+    """
+    Remove running headers and footers.
+
+    A line at the top or bottom of a page counts as boilerplate when the same
+    line (ignoring digits, so page numbers match) appears there on at least
+    REPEATED_LINE_SHARE of the pages.
+
+    Args:
+        pages (List[Document]): Extracted pages
+
+    Returns:
+        tuple: (List[Document] with the lines removed, number of lines removed)
+    """
+    if len(pages) < MIN_REPEATED_PAGES:
+        return pages, 0
+    edges = [_edge_lines(d.page_content) for d in pages]
+    counts = Counter(key for page_edges in edges for key in {k for _, _, k in page_edges})
+    min_pages = max(MIN_REPEATED_PAGES, int(len(pages) * REPEATED_LINE_SHARE))
+    boilerplate = {key for key, n in counts.items() if n >= min_pages and 0 < len(key) <= MAX_BOILERPLATE_CHARS}
+    if not boilerplate:
+        return pages, 0
+
+    stripped = []
+    removed = 0
+    for doc, page_edges in zip(pages, edges):
+        text = doc.page_content
+        cuts = [(start, end) for start, end, key in page_edges if key in boilerplate]
+        for start, end in reversed(cuts):
+            text = text[:start] + text[end:]
+        removed += len(cuts)
+        if text.strip():
+            stripped.append(Document(page_content=text, metadata=dict(doc.metadata)))
+    logger.info(f"Stripped {removed} header/footer lines ({len(boilerplate)} distinct)")
+    return stripped, removed
+
+def _shingles(text):
+    words = WORD.findall(text.lower())
+    if len(words) < SHINGLE_WORDS:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + SHINGLE_WORDS]).encode("utf-8"))
+            for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+def minhash_signatures(texts, num_perm=NUM_PERM, seed=MINHASH_SEED):
+    """
+    MinHash signature of every text over its word shingles.
+
+    Returns:
+        np.ndarray: (len(texts), num_perm) uint64; rows of empty texts are all MAX_HASH
+    """
+    rng = np.random.RandomState(seed)
+    a = rng.randint(1, MAX_HASH, size=(num_perm, 1), dtype=np.uint64)
+    b = rng.randint(0, MAX_HASH, size=(num_perm, 1), dtype=np.uint64)
+    # NumPy scalars keep the arithmetic in uint64 (plain ints can promote to float64)
+    prime, mask = np.uint64(MERSENNE_PRIME), np.uint64(MAX_HASH)
+    signatures = np.full((len(texts), num_perm), MAX_HASH, dtype=np.uint64)
+    for i, text in enumerate(texts):
+        shingles = _shingles(text)
+        if shingles:
+            h = np.fromiter(shingles, dtype=np.uint64, count=len(shingles))[None, :]
+            # Universal hashing (a*h + b) mod p, truncated to 32 bits; a, h < 2^32 so a*h fits in 64 bits
+            signatures[i] = (((a * h + b) % prime) & mask).min(axis=1)
+    return signatures
+
+def near_duplicates(texts, threshold=DUPLICATE_THRESHOLD, num_perm=NUM_PERM, bands=NUM_BANDS):
+    """
+    Find chunks that nearly repeat an earlier chunk.
+
+    Candidate pairs come from LSH banding (texts sharing any band of their
+    signature); each candidate is confirmed by the estimated Jaccard
+    similarity of the full signatures.
+
+    Args:
+        texts (List[str]): Chunk texts in document order
+        threshold (float): Estimated Jaccard similarity at which a chunk counts as a duplicate
+
+    Returns:
+        np.ndarray: Boolean mask, True for chunks to keep (the first of each group)
+    """
+    keep = np.ones(len(texts), dtype=bool)
+    if len(texts) < 2:
+        return keep
+    signatures = minhash_signatures(texts, num_perm)
+    rows = num_perm // bands
+    empty = (signatures == np.uint64(MAX_HASH)).all(axis=1)
+
+    buckets = defaultdict(list)
+    for i in range(len(texts)):
+        if empty[i]:
+            continue
+        candidates = set()
+        for band in range(bands):
+            key = (band, signatures[i, band * rows:(band + 1) * rows].tobytes())
+            candidates.update(buckets[key])
+            buckets[key].append(i)
+        # Only compare against chunks that were kept, so groups collapse onto their first member
+        for j in candidates:
+            if keep[j] and (signatures[i] == signatures[j]).mean() >= threshold:
+                keep[i] = False
+                break
+    return keep
@@ -0,0 +1,92 @@
+"""
+Progress and status events emitted by the core engines.
+
+Core modules never talk to a UI directly. They call `emit()` / `stage()` and
+whoever is listening decides what to do with it: the Streamlit layer shows
+spinners and error boxes, the CLI and worker processes just log.
+
+Subscribers are either global (`subscribe`) or scoped to the current thread /
+context (`subscribed`), so concurrent Streamlit sessions only see their own
+events.
+"""
+import contextvars
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# Event kinds
+START = "start"
+END = "end"
+PROGRESS = "progress"
+INFO = "info"
+WARNING = "warning"
+ERROR = "error"
+
+_global_subscribers = []
+_lock = threading.Lock()
+_scoped_subscribers = contextvars.ContextVar("event_subscribers", default=())
+
+class Event:
+    """A single progress/status notification."""
+    __slots__ = ("kind", "message", "stage", "data")
+
+    def __init__(self, kind, message="", stage=None, data=None):
+        self.kind = kind
+        self.message = message
+        self.stage = stage
+        self.data = data or {}
+
+    def __repr__(self):
+        return f"Event({self.kind!r}, {self.message!r}, stage={self.stage!r})"
+
+def subscribe(callback):
+    """Register a callback for every event in the process."""
+    with _lock:
+        if callback not in _global_subscribers:
+            _global_subscribers.append(callback)
+
+def unsubscribe(callback):
+    with _lock:
+        if callback in _global_subscribers:
+            _global_subscribers.remove(callback)
+
+@contextmanager
+def subscribed(callback):
+    """Register a callback for events emitted inside this block (current context only)."""
+    token = _scoped_subscribers.set(_scoped_subscribers.get() + (callback,))
+    try:
+        yield callback
+    finally:
+        _scoped_subscribers.reset(token)
+
+def emit(kind, message="", stage=None, **data):
+    """
+    Send an event to all subscribers.
+
+    Args:
+        kind (str): One of START, END, PROGRESS, INFO, WARNING, ERROR
+        message (str): Human readable text
+        stage (str): Pipeline stage name (e.g. "extract", "index")
+        **data: Extra payload, e.g. fraction=0.5 for PROGRESS
+    """
+    event = Event(kind, message, stage, data)
+    with _lock:
+        callbacks = list(_global_subscribers)
+    callbacks.extend(_scoped_subscribers.get())
+    for callback in callbacks:
+        try:
+            callback(event)
+        except Exception as e:
+            # A broken subscriber must never break the pipeline
+            logger.warning(f"Event subscriber failed on {event}: {e}")
+
+@contextmanager
+def stage(name, message=""):
+    """Emit START/END around a block of work."""
+    emit(START, message, stage=name)
+    try:
+        yield
+    finally:
+        emit(END, message, stage=name)
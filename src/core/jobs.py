@@ -0,0 +1,209 @@
+"""
+SQLite-backed queue of ingestion jobs.
+
+The web app submits uploads here and polls their status; ingestion workers
+(src/worker.py) claim jobs, extract, chunk and index the PDF, and save the
+index into the document cache. The queue lives on disk, so jobs outlive UI
+restarts and any number of worker processes on the same machine can share
+it: claiming a job is a single SQLite write transaction.
+"""
+import os
+import time
+import uuid
+import sqlite3
+import logging
+from contextlib import closing
+from src.core.cache import DocumentCache
+
+logger = logging.getLogger(__name__)
+
+JOBS_DB = "./.cache/jobs.db"
+UPLOAD_DIR = "./.cache/uploads"
+# A running job whose worker hasn't checked in for this long is handed to another worker
+STALE_SECONDS = 120
+MAX_ATTEMPTS = 3
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    name TEXT,
+    pdf_path TEXT,
+    chunk_size INTEGER,
+    chunk_overlap INTEGER,
+    length_unit TEXT,
+    status TEXT NOT NULL,
+    progress REAL DEFAULT 0,
+    message TEXT,
+    error TEXT,
+    worker TEXT,
+    attempts INTEGER DEFAULT 0,
+    pages INTEGER,
+    chunks INTEGER,
+    created_at REAL,
+    started_at REAL,
+    heartbeat_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE INDEX IF NOT EXISTS jobs_document ON jobs (digest, chunk_size, chunk_overlap, length_unit);
+"""
+
+class JobQueue:
+    def __init__(self, db_path=JOBS_DB, upload_dir=UPLOAD_DIR, cache=None):
+        """
+        Args:
+            db_path (str): SQLite database file
+            upload_dir (str): Where submitted PDFs wait for a worker
+            cache (DocumentCache): Cache the finished indices are written to
+        """
+        self.db_path = db_path
+        self.upload_dir = upload_dir
+        self.cache = cache or DocumentCache()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        # Autocommit; multi-statement updates use explicit BEGIN IMMEDIATE
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def submit(self, data, name, digest, chunk_size, chunk_overlap, length_unit="chars"):
+        """
+        Queue a PDF for ingestion. A document already queued, running or done
+        with the same chunking returns that job instead of a new one.
+
+        Args:
+            data (bytes): PDF file contents
+            name (str): Original file name
+            digest (str): SHA-256 of data
+
+        Returns:
+            str: Job id
+        """
+        params = (digest, chunk_size, chunk_overlap, length_unit)
+        existing = self.find(*params)
+        if existing and (existing["status"] != DONE or self.cache.has_index(*params)):
+            return existing["id"]
+        with closing(self._connect()) as conn:
+            os.makedirs(self.upload_dir, exist_ok=True)
+            pdf_path = os.path.join(self.upload_dir, f"{digest}.pdf")
+            if not os.path.exists(pdf_path):
+                tmp_path = f"{pdf_path}.{uuid.uuid4().hex}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, pdf_path)
+
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, digest, name, pdf_path, chunk_size, chunk_overlap, length_unit, status, "
+                "message, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, digest, name, pdf_path, chunk_size, chunk_overlap, length_unit, QUEUED,
+                 "Waiting for a worker...", time.time()))
+        logger.info(f"Queued ingestion job {job_id} for {name} ({digest[:12]})")
+        return job_id
+
+    def find(self, digest, chunk_size, chunk_overlap, length_unit="chars", include_failed=False):
+        """
+        Latest job for a document and chunking, as a dict; None if there is none.
+
+        Args:
+            include_failed (bool): Also return a failed job (submit() skips them so a
+                failed document can be resubmitted; status views need the error)
+        """
+        query = "SELECT id FROM jobs WHERE digest=? AND chunk_size=? AND chunk_overlap=? AND length_unit=?"
+        args = [digest, chunk_size, chunk_overlap, length_unit]
+        if not include_failed:
+            query += " AND status != ?"
+            args.append(FAILED)
+        with closing(self._connect()) as conn:
+            row = conn.execute(query + " ORDER BY created_at DESC LIMIT 1", args).fetchone()
+        return self.get(row["id"]) if row else None
+
+    def get(self, job_id):
+        """Job row as a dict, with "position" (queued jobs ahead) for queued jobs; None if unknown."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            job = dict(row)
+            if job["status"] == QUEUED:
+                job["position"] = conn.execute("SELECT COUNT(*) FROM jobs WHERE status=? AND created_at < ?",
+                                               (QUEUED, job["created_at"])).fetchone()[0]
+        return job
+
+    def claim(self, worker):
+        """
+        Take the oldest queued job (or one whose worker stopped checking in).
+
+        Returns:
+            dict: The job, now RUNNING for this worker; None if there is nothing to do
+        """
+        now = time.time()
+        with closing(self._connect()) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                stale = conn.execute("SELECT id, attempts FROM jobs WHERE status=? AND heartbeat_at < ?",
+                                     (RUNNING, now - STALE_SECONDS)).fetchall()
+                for row in stale:
+                    status = FAILED if row["attempts"] >= MAX_ATTEMPTS else QUEUED
+                    conn.execute("UPDATE jobs SET status=?, worker=NULL, error=? WHERE id=?",
+                                 (status, "Worker stopped responding", row["id"]))
+                row = conn.execute("SELECT * FROM jobs WHERE status=? ORDER BY created_at LIMIT 1",
+                                   (QUEUED,)).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status=?, worker=?, attempts=attempts+1, started_at=?, heartbeat_at=?, "
+                    "progress=0, message=? WHERE id=?",
+                    (RUNNING, worker, now, now, "Starting...", row["id"]))
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        job = dict(row)
+        job.update(status=RUNNING, worker=worker, attempts=job["attempts"] + 1)
+        return job
+
+    def update(self, job_id, progress=None, message=None):
+        """Report progress; doubles as the worker's heartbeat."""
+        with closing(self._connect()) as conn:
+            conn.execute("UPDATE jobs SET progress=COALESCE(?, progress), message=COALESCE(?, message), "
+                         "heartbeat_at=? WHERE id=? AND status=?", (progress, message, time.time(), job_id, RUNNING))
+
+    def complete(self, job_id, pages, chunks):
+        with closing(self._connect()) as conn:
+            pdf_path = conn.execute("SELECT pdf_path FROM jobs WHERE id=?", (job_id,)).fetchone()["pdf_path"]
+            conn.execute("UPDATE jobs SET status=?, progress=1, message=?, pages=?, chunks=?, finished_at=? "
+                         "WHERE id=?", (DONE, "Ready", pages, chunks, time.time(), job_id))
+            # The page/chunk caches and the index now hold everything the upload was needed for
+            still_needed = conn.execute("SELECT COUNT(*) FROM jobs WHERE pdf_path=? AND status IN (?, ?)",
+                                        (pdf_path, QUEUED, RUNNING)).fetchone()[0]
+        if not still_needed and pdf_path and os.path.exists(pdf_path):
+            os.remove(pdf_path)
+
+    def fail(self, job_id, error):
+        """Record a failure; the job is queued again until it has used MAX_ATTEMPTS."""
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT attempts FROM jobs WHERE id=?", (job_id,)).fetchone()
+            status = FAILED if row is None or row["attempts"] >= MAX_ATTEMPTS else QUEUED
+            conn.execute("UPDATE jobs SET status=?, error=?, message=?, worker=NULL, finished_at=? WHERE id=?",
+                         (status, str(error), f"Failed: {error}", time.time() if status == FAILED else None,
+                          job_id))
+        logger.warning(f"Ingestion job {job_id} failed ({'giving up' if status == FAILED else 'will retry'}): "
+                       f"{error}")
+
+    def counts(self):
+        """Number of jobs per status."""
+        with closing(self._connect()) as conn:
+            return {row["status"]: row["n"] for row in
+                    conn.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
@@ -1,62 +1,465 @@
 
+import time
+import asyncio
+import weakref
 import requests
 import json
-import streamlit as st
+import threading
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 import logging
+from src.config import LLM_REQUEST_TIMEOUT, LLM_RESPONSE_TOKEN_RESERVE, LLM_MAX_CONNECTIONS, LLM_MAX_KEEPALIVE, LLM_ROUTES, OPENAI_API_KEY, \
+    OPENAI_BASE_URL, OPENAI_MODEL, LOCAL_LLM_URL, LOCAL_LLM_MODEL
+from src.core import tracing, llm_metrics
+from src.core.singleflight import flights, key_digest
+from src.core.ratelimit import limiter
 
 logger = logging.getLogger(__name__)
 
+# Circuit breaker: open after this many consecutive failures, retry after the cooldown
+BREAKER_FAILURES = 3
+BREAKER_COOLDOWN_SECONDS = 30.0
+# Hedging: duplicate a request once it runs longer than the backend's p95 latency
+HEDGE_MIN_SAMPLES = 20
+HEDGE_DEFAULT_SECONDS = 10.0
+LATENCY_WINDOW = 200
+# Threads of the router pool shared by every session (sync calls and hedges in flight)
+ROUTER_MAX_WORKERS = 32
+ALL_BACKENDS_DOWN = "⚠️ All language model backends are temporarily unavailable. Please try again shortly."
+RATE_LIMITED = "⚠️ The language model is busy right now (rate limit reached). Please try again in a minute."
+
+# One pooled async HTTP client per event loop (httpx clients are bound to the loop they were used on)
+_async_clients = weakref.WeakKeyDictionary()
+_httpx_missing_logged = False
+
+def async_client():
+    """
+    Shared httpx.AsyncClient for the running event loop, with connection limits
+    from config (LLM_MAX_CONNECTIONS / LLM_MAX_KEEPALIVE).
+
+    Returns:
+        httpx.AsyncClient or None if httpx is not installed
+    """
+    global _httpx_missing_logged
+    try:
+        import httpx
+    except ImportError:
+        if not _httpx_missing_logged:
+            logger.warning("httpx is not installed; async LLM calls fall back to worker threads")
+            _httpx_missing_logged = True
+        return None
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            timeout=LLM_REQUEST_TIMEOUT,
+            limits=httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_KEEPALIVE),
+        )
+        _async_clients[loop] = client
+    return client
+
+async def aclose_async_client():
+    """Close the running loop's shared client (call on server shutdown)."""
+    client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+def _sse_data(line):
+    """Payload of a server-sent-events "data:" line, or None."""
+    if not line.startswith("data:"):
+        return None
+    return line[len("data:"):].strip()
+
 class LLMProvider(ABC):
+    """
+    Base class for text generation backends.
+
+    Subclasses implement `_generate`; `generate_text` times every call and
+    records it in llm_metrics under the calling feature. Calls wait for
+    capacity in the shared rate limiter first (per backend credential and,
+    once set_user() was called, per user). A call that could not get
+    capacity in time returns ok=None: the backend is fine, just busy.
+    """
+    name = "llm"
+    # Local/simulated backends and wrappers of other providers skip the limiter
+    rate_limited = True
+    user_id = None
+    role = None
+
+    def set_user(self, user):
+        """
+        Attribute calls to a user for the per-user rate limits.
+
+        Args:
+            user (dict): Session user with "id" and "role" (None = global limits only)
+        """
+        self.user_id = user.get("id") if user else None
+        self.role = user.get("role") if user else None
+
+    def generate_text(self, prompt, feature="general"):
+        """
+        Args:
+            prompt (str): Full prompt text
+            feature (str): What the call is for ("summary", "chat", "faq", ...), for telemetry
+
+        Returns:
+            str: Generated text (or a user-facing error message)
+        """
+        return self.generate(prompt, feature)[0]
+
+    @property
+    def identity(self):
+        """Backend plus credentials: calls with equal identity and prompt give interchangeable answers."""
+        api_key = getattr(self, "api_key", None)
+        return f"{self.name}:{key_digest(api_key)[:12]}" if api_key else self.name
+
+    def _flight_key(self, prompt, feature):
+        return ("llm", self.identity, feature, key_digest(prompt))
+
+    @staticmethod
+    def _shareable(result):
+        # A call the leader's own (per-user) quota turned away says nothing about the waiting callers' quota
+        return result[1] is not None
+
+    def generate(self, prompt, feature="general"):
+        """
+        Like generate_text, but also says whether the call succeeded.
+        An identical call (same backend, feature and prompt) already in flight
+        is waited for instead of being sent again, unless the rate limiter
+        turned it away; then each waiting caller tries with its own quota.
+
+        Returns:
+            tuple: (text, ok); ok is None if the call was not admitted by the rate limiter
+        """
+        return flights.do(self._flight_key(prompt, feature), self._timed_generate, prompt, feature,
+                          share=self._shareable)
+
+    def _reserve(self, prompt):
+        return llm_metrics.estimate_tokens(prompt) + LLM_RESPONSE_TOKEN_RESERVE
+
+    def _admit(self, prompt):
+        """(ticket, admitted): wait for rate limit capacity."""
+        if not self.rate_limited:
+            return None, True
+        ticket = limiter.acquire(self.identity, self.user_id, self.role, self._reserve(prompt))
+        return ticket, ticket is not None
+
+    async def _aadmit(self, prompt):
+        if not self.rate_limited:
+            return None, True
+        ticket = await limiter.aacquire(self.identity, self.user_id, self.role, self._reserve(prompt))
+        return ticket, ticket is not None
+
+    def _timed_generate(self, prompt, feature):
+        ticket, admitted = self._admit(prompt)
+        if not admitted:
+            return RATE_LIMITED, None
+        started = time.perf_counter()
+        with tracing.span("llm.generate_text", provider=self.name, feature=feature):
+            text, ok, usage = self._generate(prompt)
+        limiter.settle(ticket, self._record(feature, prompt, text, ok, usage, time.perf_counter() - started))
+        return text, ok
+
+    async def agenerate_text(self, prompt, feature="general"):
+        """Async generate_text: waits on the network without holding a thread."""
+        return (await self.agenerate(prompt, feature))[0]
+
+    async def agenerate(self, prompt, feature="general"):
+        """
+        Async generate (coalesced with identical in-flight calls, sync or async).
+
+        Returns:
+            tuple: (text, ok); ok is None if the call was not admitted by the rate limiter
+        """
+        return await flights.ado(self._flight_key(prompt, feature), self._timed_agenerate, prompt, feature,
+                                 share=self._shareable)
+
+    async def _timed_agenerate(self, prompt, feature):
+        ticket, admitted = await self._aadmit(prompt)
+        if not admitted:
+            return RATE_LIMITED, None
+        started = time.perf_counter()
+        with tracing.span("llm.agenerate_text", provider=self.name, feature=feature):
+            text, ok, usage = await self._agenerate(prompt)
+        limiter.settle(ticket, self._record(feature, prompt, text, ok, usage, time.perf_counter() - started))
+        return text, ok
+
+    async def astream_text(self, prompt, feature="general"):
+        """
+        Stream the answer as it is generated.
+
+        Yields:
+            str: Text pieces; on failure the last piece is the error message
+        """
+        ticket, admitted = await self._aadmit(prompt)
+        if not admitted:
+            yield RATE_LIMITED
+            return
+        started = time.perf_counter()
+        result = {}
+        pieces = []
+        stream = self._astream(prompt, result)
+        try:
+            async for piece in stream:
+                pieces.append(piece)
+                yield piece
+        finally:
+            # Also when the consumer stops early (e.g. an SSE client disconnects): the reservation
+            # would otherwise stay charged against the user and global buckets
+            await stream.aclose()
+            limiter.settle(ticket, self._record(feature, prompt, "".join(pieces), result.get("ok", True),
+                                                result.get("usage"), time.perf_counter() - started))
+
+    def _record(self, feature, prompt, text, ok, usage, seconds):
+        """Record the call in llm_metrics; returns the tokens it used."""
+        if usage:
+            prompt_tokens, response_tokens, source = usage.get("prompt", 0), usage.get("response", 0), "usage"
+        else:
+            prompt_tokens = llm_metrics.estimate_tokens(prompt)
+            response_tokens = llm_metrics.estimate_tokens(text) if ok else 0
+            source = "estimate"
+        llm_metrics.record(feature, self.name, seconds, "ok" if ok else "error",
+                           prompt_tokens, response_tokens, token_source=source)
+        return prompt_tokens + response_tokens
+
     @abstractmethod
-    def generate_text(self, prompt):
-        pass
+    def _generate(self, prompt):
+        """
+        Returns:
+            tuple: (text, ok, usage) where usage is {"prompt": n, "response": n}
+            when the backend reports token counts, else None
+        """
+
+    async def _agenerate(self, prompt):
+        """Async _generate; backends without a native async path run the sync one in a worker thread."""
+        return await asyncio.to_thread(self._generate, prompt)
+
+    async def _astream(self, prompt, result):
+        """
+        Yield text pieces, setting result["ok"] (before yielding an error
+        message) and result["usage"]. Defaults to one piece from _agenerate.
+        """
+        text, ok, usage = await self._agenerate(prompt)
+        result.update(ok=ok, usage=usage)
+        yield text
 
 class GoogleGeminiProvider(LLMProvider):
-    def __init__(self, api_key):
+    name = "gemini"
+
+    def __init__(self, api_key, model="gemini-2.5-flash"):
         self.api_key = api_key
+        if model != "gemini-2.5-flash":
+            self.name = f"gemini:{model}"
         # Updated to gemini-2.5-flash based on available models for this key
-        self.url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key={api_key}"
-        
-    def generate_text(self, prompt):
+        base = f"https://generativelanguage.googleapis.com/v1beta/models/{model}"
+        self.url = f"{base}:generateContent?key={api_key}"
+        self.stream_url = f"{base}:streamGenerateContent?alt=sse&key={api_key}"
+
+    @staticmethod
+    def _request(prompt):
         headers = {'Content-Type': 'application/json'}
         data = {
             "contents": [{
                 "parts": [{"text": prompt}]
             }]
         }
-        
+        return headers, data
+
+    @staticmethod
+    def _error(status_code, body):
+        """User-facing message for a non-200 response."""
+        logger.error(f"Gemini API Error: {status_code} - {body}")
+
+        # Try to parse friendly error
         try:
-            response = requests.post(self.url, headers=headers, json=data)
-            
-            # Check for errors
-            if response.status_code != 200:
-                logger.error(f"Gemini API Error: {response.status_code} - {response.text}")
-                
-                # Try to parse friendly error
-                try:
-                    error_json = response.json()
-                    error_msg = error_json.get('error', {}).get('message', str(response.text))
-                    if response.status_code == 400 and "API key not valid" in error_msg:
-                        return "⚠️ **Invalid API Key.** Please check that you copied the key correctly without extra spaces."
-                    return f"⚠️ API Error ({response.status_code}): {error_msg}"
-                except:
-                    return f"⚠️ API Error ({response.status_code})"
-                
-            result = response.json()
-            # Extract text from response structure
-            if 'candidates' in result and result['candidates']:
-                return result['candidates'][0]['content']['parts'][0]['text']
-            else:
-                return "No content generated."
-                
+            error_json = json.loads(body)
+            error_msg = error_json.get('error', {}).get('message', str(body))
+            if status_code == 400 and "API key not valid" in error_msg:
+                return "⚠️ **Invalid API Key.** Please check that you copied the key correctly without extra spaces."
+            return f"⚠️ API Error ({status_code}): {error_msg}"
+        except:
+            return f"⚠️ API Error ({status_code})"
+
+    @staticmethod
+    def _usage(result):
+        metadata = result.get('usageMetadata') or {}
+        if 'promptTokenCount' in metadata:
+            return {"prompt": metadata.get('promptTokenCount', 0),
+                    "response": metadata.get('candidatesTokenCount', 0)}
+        return None
+
+    @staticmethod
+    def _text(result):
+        candidates = result.get('candidates') or []
+        if candidates:
+            return "".join(part.get('text', '') for part in candidates[0].get('content', {}).get('parts', []))
+        return None
+
+    def _parse(self, status_code, body):
+        # Check for errors
+        if status_code != 200:
+            return self._error(status_code, body), False, None
+        result = json.loads(body)
+        # Extract text from response structure
+        text = self._text(result)
+        return (text if text is not None else "No content generated."), True, self._usage(result)
+
+    def _generate(self, prompt):
+        headers, data = self._request(prompt)
+        try:
+            response = requests.post(self.url, headers=headers, json=data, timeout=LLM_REQUEST_TIMEOUT)
+            return self._parse(response.status_code, response.text)
+        except Exception as e:
+            logger.error(f"Gemini API error: {e}")
+            return f"Error connecting to Gemini API: {str(e)}", False, None
+
+    async def _agenerate(self, prompt):
+        client = async_client()
+        if client is None:
+            return await super()._agenerate(prompt)
+        headers, data = self._request(prompt)
+        try:
+            response = await client.post(self.url, headers=headers, json=data)
+            return self._parse(response.status_code, response.text)
+        except Exception as e:
+            logger.error(f"Gemini API error: {e}")
+            return f"Error connecting to Gemini API: {str(e)}", False, None
+
+    async def _astream(self, prompt, result):
+        client = async_client()
+        if client is None:
+            async for piece in super()._astream(prompt, result):
+                yield piece
+            return
+        headers, data = self._request(prompt)
+        try:
+            async with client.stream("POST", self.stream_url, headers=headers, json=data) as response:
+                if response.status_code != 200:
+                    body = (await response.aread()).decode("utf-8", "replace")
+                    result["ok"] = False
+                    yield self._error(response.status_code, body)
+                    return
+                async for line in response.aiter_lines():
+                    payload = _sse_data(line)
+                    if not payload:
+                        continue
+                    event = json.loads(payload)
+                    result["usage"] = self._usage(event) or result.get("usage")
+                    text = self._text(event)
+                    if text:
+                        yield text
+            result["ok"] = True
         except Exception as e:
             logger.error(f"Gemini API error: {e}")
-            return f"Error connecting to Gemini API: {str(e)}"
+            result["ok"] = False
+            yield f"Error connecting to Gemini API: {str(e)}"
+
+class OpenAICompatibleProvider(LLMProvider):
+    """
+    Any server speaking the OpenAI chat-completions protocol: OpenAI itself,
+    hosted compatible APIs, or a local server (llama.cpp, Ollama, vLLM, ...).
+    """
+
+    def __init__(self, base_url, model, api_key=None, name="openai"):
+        """
+        Args:
+            base_url (str): API root, e.g. "https://api.openai.com/v1" or "http://localhost:8080/v1"
+            model (str): Model name sent with each request
+            api_key (str): Bearer token (local servers usually need none)
+            name (str): Backend name for routing, telemetry and pricing
+        """
+        self.url = base_url.rstrip("/") + "/chat/completions"
+        self.model = model
+        self.api_key = api_key
+        self.name = name
+
+    def _request(self, prompt, stream=False):
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f"Bearer {self.api_key}"
+        data = {"model": self.model, "messages": [{"role": "user", "content": prompt}]}
+        if stream:
+            data["stream"] = True
+        return headers, data
+
+    def _parse(self, status_code, body):
+        if status_code != 200:
+            logger.error(f"{self.name} API Error: {status_code} - {body[:500]}")
+            return f"⚠️ API Error ({status_code}) from {self.name}", False, None
+        result = json.loads(body)
+        usage = None
+        if result.get('usage'):
+            usage = {"prompt": result['usage'].get('prompt_tokens', 0),
+                     "response": result['usage'].get('completion_tokens', 0)}
+        choices = result.get('choices') or []
+        if choices:
+            return choices[0]['message']['content'], True, usage
+        return "No content generated.", True, usage
+
+    def _generate(self, prompt):
+        headers, data = self._request(prompt)
+        try:
+            response = requests.post(self.url, headers=headers, json=data, timeout=LLM_REQUEST_TIMEOUT)
+            return self._parse(response.status_code, response.text)
+        except Exception as e:
+            logger.error(f"{self.name} API error: {e}")
+            return f"Error connecting to {self.name}: {str(e)}", False, None
+
+    async def _agenerate(self, prompt):
+        client = async_client()
+        if client is None:
+            return await super()._agenerate(prompt)
+        headers, data = self._request(prompt)
+        try:
+            response = await client.post(self.url, headers=headers, json=data)
+            return self._parse(response.status_code, response.text)
+        except Exception as e:
+            logger.error(f"{self.name} API error: {e}")
+            return f"Error connecting to {self.name}: {str(e)}", False, None
+
+    async def _astream(self, prompt, result):
+        client = async_client()
+        if client is None:
+            async for piece in super()._astream(prompt, result):
+                yield piece
+            return
+        headers, data = self._request(prompt, stream=True)
+        try:
+            async with client.stream("POST", self.url, headers=headers, json=data) as response:
+                if response.status_code != 200:
+                    body = (await response.aread()).decode("utf-8", "replace")
+                    logger.error(f"{self.name} API Error: {response.status_code} - {body[:500]}")
+                    result["ok"] = False
+                    yield f"⚠️ API Error ({response.status_code}) from {self.name}"
+                    return
+                async for line in response.aiter_lines():
+                    payload = _sse_data(line)
+                    if not payload or payload == "[DONE]":
+                        continue
+                    event = json.loads(payload)
+                    for choice in event.get('choices') or []:
+                        text = (choice.get('delta') or {}).get('content')
+                        if text:
+                            yield text
+            result["ok"] = True
+        except Exception as e:
+            logger.error(f"{self.name} API error: {e}")
+            result["ok"] = False
+            yield f"Error connecting to {self.name}: {str(e)}"
 
 class SimulationProvider(LLMProvider):
     """Provides simulated responses so the app works without an API Key."""
-    def generate_text(self, prompt):
+    name = "simulation"
+    rate_limited = False
+
+    def _generate(self, prompt):
+        return self._simulated_text(prompt), True, None
+
+    async def _agenerate(self, prompt):
+        return self._generate(prompt)
+
+    def _simulated_text(self, prompt):
         # Detect what the user is asking for based on the prompt content
         if "summary" in prompt.lower() or "overview" in prompt.lower():
             return """
@@ -80,8 +483,392 @@ class SimulationProvider(LLMProvider):
         else:
             return "Simulation Mode: Content generated successfully."
 
-def get_llm_provider(api_key=None, provider_type="gemini"):
+class CircuitBreaker:
+    """Per-backend breaker: closed -> open after repeated failures -> half-open after a cooldown."""
+
+    def __init__(self, failures=BREAKER_FAILURES, cooldown=BREAKER_COOLDOWN_SECONDS):
+        self.max_failures = failures
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        # When the half-open trial call was let through (None = no trial running)
+        self._trial_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def _available(self, now):
+        state = self.state
+        if state != "half-open":
+            return state == "closed"
+        # A trial left unsettled for a whole cooldown (e.g. its caller went away) no longer blocks
+        return self._trial_at is None or now - self._trial_at >= self.cooldown
+
+    def available(self):
+        """Whether a call could go through now (without claiming the half-open trial)."""
+        with self._lock:
+            return self._available(time.monotonic())
+
+    def allow(self):
+        """Claim a call: always when closed; when half-open, only one trial call until record() settles it."""
+        with self._lock:
+            now = time.monotonic()
+            if not self._available(now):
+                return False
+            if self.state == "half-open":
+                self._trial_at = now
+            return True
+
+    def release(self):
+        """Give back a claimed trial without a verdict (the call never reached the backend)."""
+        with self._lock:
+            self._trial_at = None
+
+    def record(self, ok):
+        with self._lock:
+            self._trial_at = None
+            if ok:
+                self.failures = 0
+                self.opened_at = None
+            else:
+                self.failures += 1
+                # A failed trial in half-open state re-opens immediately
+                if self.failures >= self.max_failures or self.opened_at is not None:
+                    self.opened_at = time.monotonic()
+
+# Breaker and latency window per backend identity, shared by every session's router,
+# so an outage seen by one session is routed around by all of them
+_backend_health = {}
+_router_pool = None
+_router_lock = threading.Lock()
+
+def backend_health(identity):
+    """(CircuitBreaker, latency deque) shared by all routers for a backend identity."""
+    with _router_lock:
+        if identity not in _backend_health:
+            _backend_health[identity] = (CircuitBreaker(), deque(maxlen=LATENCY_WINDOW))
+        return _backend_health[identity]
+
+def router_pool():
+    """Process-wide thread pool for routed sync calls."""
+    global _router_pool
+    with _router_lock:
+        if _router_pool is None:
+            _router_pool = ThreadPoolExecutor(max_workers=ROUTER_MAX_WORKERS, thread_name_prefix="llm-router")
+        return _router_pool
+
+class RouterProvider(LLMProvider):
+    """
+    Routes each call across several backends.
+
+    Backends are tried in the order configured for the call's feature, skipping
+    those whose circuit breaker is open and preferring healthy ones. A request
+    still running after the backend's p95 latency is hedged: the next backend
+    gets a duplicate and the first successful answer wins. A failed answer
+    fails over to the next backend straight away.
+
+    Routers are cheap per-session wrappers: breakers, latency windows and the
+    thread pool are shared process-wide per backend identity.
+    """
+    name = "router"
+    # Admission is handled in _admit (user quota) and by each backend (global quota)
+    rate_limited = False
+
+    def __init__(self, backends, routes=None, hedge=True):
+        """
+        Args:
+            backends (List[LLMProvider]): Backends, in default preference order
+            routes (dict): Optional feature -> list of backend names ("default" applies to other features)
+            hedge (bool): Send hedged duplicates after the p95 latency threshold
+        """
+        if not backends:
+            raise ValueError("RouterProvider needs at least one backend")
+        self.backends = {b.name: b for b in backends}
+        self.order = [b.name for b in backends]
+        self.routes = routes or {}
+        self.hedge = hedge
+        health = {b.name: backend_health(b.identity) for b in backends}
+        self.breakers = {name: breaker for name, (breaker, _) in health.items()}
+        self.latencies = {name: latencies for name, (_, latencies) in health.items()}
+        self._pool = router_pool()
+
+    def _admit(self, prompt):
+        """Reserve the user's quota once per routed call; backend attempts only take the global limits."""
+        if self.user_id is None:
+            return None, True
+        ticket = limiter.acquire(None, self.user_id, self.role, self._reserve(prompt))
+        return ticket, ticket is not None
+
+    async def _aadmit(self, prompt):
+        if self.user_id is None:
+            return None, True
+        ticket = await limiter.aacquire(None, self.user_id, self.role, self._reserve(prompt))
+        return ticket, ticket is not None
+
+    def _settle(self, ticket, prompt, text, ok):
+        limiter.settle(ticket, llm_metrics.estimate_tokens(prompt) + (llm_metrics.estimate_tokens(text) if ok else 0))
+
+    def candidates(self, feature):
+        """Backend names to try for a feature, healthiest first."""
+        route = self.routes.get(feature) or self.routes.get("default") or self.order
+        names = [n for n in route if n in self.backends] or self.order
+        allowed = [n for n in names if self.breakers[n].available()]
+        # Closed breakers before half-open ones, keeping the configured order otherwise
+        return sorted(allowed, key=lambda n: self.breakers[n].state != "closed")
+
+    def hedge_delay(self, name):
+        """Seconds to wait on a backend before hedging: its recent p95 latency."""
+        # deque.copy() is atomic, so other sessions appending meanwhile is fine
+        samples = sorted(self.latencies[name].copy())
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_SECONDS
+        return samples[int(len(samples) * 0.95) - 1]
+
+    def health(self):
+        """Breaker state and latency per backend, for the admin view."""
+        return {name: {"state": self.breakers[name].state, "failures": self.breakers[name].failures,
+                       "hedge_after": round(self.hedge_delay(name), 2), "samples": len(self.latencies[name])}
+                for name in self.order}
+
+    def _call(self, name, prompt, feature):
+        breaker = self.breakers[name]
+        if not breaker.allow():
+            # Half-open, and another call is already the trial
+            return name, ALL_BACKENDS_DOWN, False
+        started = time.perf_counter()
+        text, ok = self.backends[name].generate(prompt, feature)
+        # Not admitted (ok is None) says nothing about the backend's health
+        if ok is None:
+            breaker.release()
+        else:
+            breaker.record(ok)
+        if ok:
+            self.latencies[name].append(time.perf_counter() - started)
+        return name, text, ok
+
+    def generate(self, prompt, feature="general"):
+        names = self.candidates(feature)
+        if not names:
+            return ALL_BACKENDS_DOWN, False
+        ticket, admitted = self._admit(prompt)
+        if not admitted:
+            return RATE_LIMITED, None
+        text, ok = self._route(prompt, feature, names)
+        self._settle(ticket, prompt, text, ok)
+        return text, ok
+
+    def _route(self, prompt, feature, names):
+        pending = set()
+        last_error = None
+        rate_limited = False
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            name = names[next_index]
+            next_index += 1
+            pending.add(self._pool.submit(self._call, name, prompt, feature))
+            return name
+
+        primary = launch()
+        timeout = self.hedge_delay(primary) if self.hedge else None
+        while pending:
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                # Slow: hedge with the next backend (if any) and keep waiting on both
+                if next_index < len(names) and not rate_limited:
+                    hedged = launch()
+                    logger.info(f"Hedging {feature} request: {primary} slower than {timeout:.1f}s, also asking {hedged}")
+                timeout = None
+                continue
+            for future in done:
+                pending.discard(future)
+                name, text, ok = future.result()
+                if ok:
+                    # Losers keep running in the pool; their results are dropped
+                    return text, True
+                last_error = text
+                if ok is None:
+                    # Out of quota: more backends would only spend more of it
+                    rate_limited = True
+                else:
+                    logger.warning(f"LLM backend {name} failed for {feature}; failing over")
+            if not pending and next_index < len(names) and not rate_limited:
+                primary = launch()
+                timeout = self.hedge_delay(primary) if self.hedge else None
+        return last_error, None if rate_limited else False
+
+    def _generate(self, prompt):
+        text, ok = self.generate(prompt)
+        return text, ok, None
+
+    async def _acall(self, name, prompt, feature):
+        breaker = self.breakers[name]
+        if not breaker.allow():
+            return name, ALL_BACKENDS_DOWN, False
+        started = time.perf_counter()
+        try:
+            text, ok = await self.backends[name].agenerate(prompt, feature)
+        except asyncio.CancelledError:
+            # Losing hedge: no verdict on the backend
+            breaker.release()
+            raise
+        if ok is None:
+            breaker.release()
+        else:
+            breaker.record(ok)
+        if ok:
+            self.latencies[name].append(time.perf_counter() - started)
+        return name, text, ok
+
+    async def agenerate(self, prompt, feature="general"):
+        """Async generate with the same routing, failover and hedging; losing hedges are cancelled."""
+        names = self.candidates(feature)
+        if not names:
+            return ALL_BACKENDS_DOWN, False
+        ticket, admitted = await self._aadmit(prompt)
+        if not admitted:
+            return RATE_LIMITED, None
+        text, ok = await self._aroute(prompt, feature, names)
+        self._settle(ticket, prompt, text, ok)
+        return text, ok
+
+    async def _aroute(self, prompt, feature, names):
+        pending = set()
+        last_error = None
+        rate_limited = False
+        next_index = 0
+
+        def launch():
+            nonlocal next_index
+            name = names[next_index]
+            next_index += 1
+            pending.add(asyncio.ensure_future(self._acall(name, prompt, feature)))
+            return name
+
+        primary = launch()
+        timeout = self.hedge_delay(primary) if self.hedge else None
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if next_index < len(names) and not rate_limited:
+                        hedged = launch()
+                        logger.info(f"Hedging {feature} request: {primary} slower than {timeout:.1f}s, "
+                                    f"also asking {hedged}")
+                    timeout = None
+                    continue
+                for task in done:
+                    pending.discard(task)
+                    name, text, ok = task.result()
+                    if ok:
+                        return text, True
+                    last_error = text
+                    if ok is None:
+                        rate_limited = True
+                    else:
+                        logger.warning(f"LLM backend {name} failed for {feature}; failing over")
+                if not pending and next_index < len(names) and not rate_limited:
+                    primary = launch()
+                    timeout = self.hedge_delay(primary) if self.hedge else None
+            return last_error, None if rate_limited else False
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _agenerate(self, prompt):
+        text, ok = await self.agenerate(prompt)
+        return text, ok, None
+
+    async def astream_text(self, prompt, feature="general"):
+        """
+        Stream from the first healthy backend. A backend that fails before
+        sending any text is skipped for the next one; streams are not hedged.
+        """
+        names = self.candidates(feature)
+        if not names:
+            yield ALL_BACKENDS_DOWN
+            return
+        user_ticket, admitted = await self._aadmit(prompt)
+        if not admitted:
+            yield RATE_LIMITED
+            return
+        last_error = ALL_BACKENDS_DOWN
+        pieces = []
+        try:
+            for name in names:
+                backend = self.backends[name]
+                if not self.breakers[name].allow():
+                    continue
+                ticket, admitted = await backend._aadmit(prompt)
+                if not admitted:
+                    # Out of quota, not unhealthy: no breaker record and no failover
+                    self.breakers[name].release()
+                    last_error = RATE_LIMITED
+                    break
+                started = time.perf_counter()
+                result = {}
+                stream = backend._astream(prompt, result)
+                finished = False
+                try:
+                    async for piece in stream:
+                        if result.get("ok") is False and not pieces:
+                            last_error = piece
+                            break
+                        pieces.append(piece)
+                        yield piece
+                    finished = True
+                finally:
+                    # Release the backend's pooled connection now, not when the generator is collected
+                    await stream.aclose()
+                    ok = result.get("ok", True) and bool(pieces)
+                    seconds = time.perf_counter() - started
+                    limiter.settle(ticket, backend._record(feature, prompt, "".join(pieces) if pieces else last_error,
+                                                           ok, result.get("usage"), seconds))
+                    if finished or pieces:
+                        self.breakers[name].record(ok)
+                    else:
+                        # The consumer left before the backend answered: says nothing about its health
+                        self.breakers[name].release()
+                if ok:
+                    self.latencies[name].append(seconds)
+                if pieces:
+                    return
+                logger.warning(f"LLM backend {name} failed for {feature}; failing over")
+            yield last_error
+        finally:
+            self._settle(user_ticket, prompt, "".join(pieces), bool(pieces))
+
+def get_llm_provider(api_key=None, provider_type="gemini", user=None):
+    """
+    Build the provider for this session.
+
+    Gemini (with a key), an OpenAI-compatible API (OPENAI_API_KEY) and a
+    local OpenAI-compatible server (BOOK_ANALYZER_LOCAL_LLM_URL) are used when
+    configured; with more than one, they are wrapped in a RouterProvider.
+    Without any, SimulationProvider keeps the app usable.
+
+    Args:
+        user (dict): Session user the calls count against for rate limiting
+    """
+    backends = []
     if api_key and len(api_key) > 10: # Simple validation
         if provider_type == "gemini":
-            return GoogleGeminiProvider(api_key)
-    return SimulationProvider()
+            backends.append(GoogleGeminiProvider(api_key))
+    if OPENAI_API_KEY:
+        backends.append(OpenAICompatibleProvider(OPENAI_BASE_URL, OPENAI_MODEL, api_key=OPENAI_API_KEY,
+                                                 name=f"openai:{OPENAI_MODEL}"))
+    if LOCAL_LLM_URL:
+        backends.append(OpenAICompatibleProvider(LOCAL_LLM_URL, LOCAL_LLM_MODEL, name="local"))
+    if len(backends) > 1:
+        provider = RouterProvider(backends, routes=LLM_ROUTES)
+    elif backends:
+        provider = backends[0]
+    else:
+        return SimulationProvider()
+    provider.set_user(user)
+    return provider
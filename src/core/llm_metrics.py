@@ -0,0 +1,149 @@
+"""
+Per-call telemetry for the LLM provider layer.
+
+Every provider call is recorded with the feature that made it (summary, chat,
+faq, ...), prompt/response token counts, wall time and status. Records are
+kept in a bounded buffer (for the admin view and CSV dump) and aggregated
+per feature into latency histograms, token totals and estimated cost. The
+aggregates are also exported on the tracing /metrics endpoint.
+"""
+import io
+import csv
+import time
+import logging
+import threading
+from collections import deque
+from src.config import LLM_PRICING
+from src.core import tracing
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is open
+LATENCY_BUCKETS = (0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0, 32.0)
+MAX_RECORDS = 2000
+TIKTOKEN_ENCODING = "cl100k_base"
+CHARS_PER_TOKEN = 4
+
+CSV_FIELDS = ["timestamp", "feature", "provider", "status", "seconds", "prompt_tokens", "response_tokens",
+              "token_source", "cost_usd"]
+
+_records = deque(maxlen=MAX_RECORDS)
+_features = {}
+_lock = threading.Lock()
+_encoding = None
+
+def estimate_tokens(text):
+    """Token count with tiktoken (cl100k_base), or a chars/4 estimate without it."""
+    global _encoding
+    if _encoding is None:
+        try:
+            import tiktoken
+            _encoding = tiktoken.get_encoding(TIKTOKEN_ENCODING)
+        except Exception:
+            _encoding = False
+    if _encoding is False:
+        return max(1, len(text) // CHARS_PER_TOKEN) if text else 0
+    return len(_encoding.encode(text, disallowed_special=()))
+
+def call_cost(provider, prompt_tokens, response_tokens):
+    """Estimated USD cost from LLM_PRICING (per million tokens); 0 for unknown providers."""
+    prices = LLM_PRICING.get(provider) or LLM_PRICING.get(provider.split(":")[0])
+    if not prices:
+        return 0.0
+    return (prompt_tokens * prices["input"] + response_tokens * prices["output"]) / 1_000_000
+
+def record(feature, provider, seconds, status, prompt_tokens, response_tokens, token_source="estimate"):
+    """
+    Add one provider call.
+
+    Args:
+        feature (str): What the call was for, e.g. "summary", "chat", "faq"
+        provider (str): Provider name, e.g. "gemini", "simulation"
+        seconds (float): Wall time of the call
+        status (str): "ok" or "error"
+        prompt_tokens (int): Input tokens
+        response_tokens (int): Output tokens
+        token_source (str): "usage" (reported by the API) or "estimate"
+    """
+    cost = call_cost(provider, prompt_tokens, response_tokens)
+    entry = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "feature": feature, "provider": provider,
+        "status": status, "seconds": round(seconds, 4), "prompt_tokens": prompt_tokens,
+        "response_tokens": response_tokens, "token_source": token_source, "cost_usd": round(cost, 6),
+    }
+    bucket = next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound), len(LATENCY_BUCKETS))
+    with _lock:
+        _records.append(entry)
+        stats = _features.setdefault(feature, {
+            "calls": 0, "errors": 0, "seconds": 0.0, "prompt_tokens": 0, "response_tokens": 0, "cost_usd": 0.0,
+            "latency_buckets": [0] * (len(LATENCY_BUCKETS) + 1),
+        })
+        stats["calls"] += 1
+        stats["errors"] += status != "ok"
+        stats["seconds"] += seconds
+        stats["prompt_tokens"] += prompt_tokens
+        stats["response_tokens"] += response_tokens
+        stats["cost_usd"] += cost
+        stats["latency_buckets"][bucket] += 1
+    logger.debug(f"LLM call {feature}/{provider}: {status} in {seconds:.2f}s, "
+                 f"{prompt_tokens}+{response_tokens} tokens ({token_source})")
+
+def records():
+    """Recent calls, oldest first."""
+    with _lock:
+        return list(_records)
+
+def summary():
+    """
+    Returns:
+        dict: feature -> totals, error rate, mean and p50/p95 latency (from the recent calls)
+    """
+    with _lock:
+        features = {name: dict(stats, latency_buckets=list(stats["latency_buckets"]))
+                    for name, stats in _features.items()}
+        recent = list(_records)
+    for name, stats in features.items():
+        latencies = sorted(r["seconds"] for r in recent if r["feature"] == name)
+        stats["error_rate"] = round(stats["errors"] / stats["calls"], 4) if stats["calls"] else 0.0
+        stats["mean_seconds"] = round(stats["seconds"] / stats["calls"], 3) if stats["calls"] else 0.0
+        stats["p50_seconds"] = latencies[len(latencies) // 2] if latencies else None
+        stats["p95_seconds"] = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else None
+    return features
+
+def to_csv():
+    """Recent calls as CSV text."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    writer.writerows(records())
+    return buffer.getvalue()
+
+def reset():
+    with _lock:
+        _records.clear()
+        _features.clear()
+
+def prometheus_lines():
+    """LLM histograms and totals for the tracing /metrics endpoint."""
+    features = summary()
+    lines = ["# HELP book_analyzer_llm_seconds LLM call latency per feature.",
+             "# TYPE book_analyzer_llm_seconds histogram"]
+    for name, stats in sorted(features.items()):
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, stats["latency_buckets"]):
+            cumulative += count
+            lines.append(f'book_analyzer_llm_seconds_bucket{{feature="{name}",le="{bound}"}} {cumulative}')
+        lines.append(f'book_analyzer_llm_seconds_bucket{{feature="{name}",le="+Inf"}} {stats["calls"]}')
+        lines.append(f'book_analyzer_llm_seconds_sum{{feature="{name}"}} {stats["seconds"]:.6f}')
+        lines.append(f'book_analyzer_llm_seconds_count{{feature="{name}"}} {stats["calls"]}')
+    for metric, key, help_text in (
+        ("book_analyzer_llm_errors_total", "errors", "Failed LLM calls per feature."),
+        ("book_analyzer_llm_prompt_tokens_total", "prompt_tokens", "Prompt tokens per feature."),
+        ("book_analyzer_llm_response_tokens_total", "response_tokens", "Response tokens per feature."),
+        ("book_analyzer_llm_cost_usd_total", "cost_usd", "Estimated LLM cost per feature."),
+    ):
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} counter"]
+        lines += [f'{metric}{{feature="{name}"}} {stats[key]}' for name, stats in sorted(features.items())]
+    return lines
+
+tracing.register_collector(prometheus_lines)
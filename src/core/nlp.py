@@ -1,12 +1,18 @@
 
 import os
-import pickle
 import numpy as np
-import streamlit as st
+import faiss
 from langchain_community.embeddings import HuggingFaceEmbeddings
-from langchain_community.vectorstores import FAISS
-from langchain_core.documents import Document
+import shutil
+import uuid
 import logging
+import threading
+from collections import OrderedDict
+from src.config import VECTOR_MMAP
+from src.core import events, tracing
+from src.core.chunks import ChunkStore
+from src.core.singleflight import flights
+from src.core.vectorstore import MappedFlatIndex, VECTORS_FILE, write_vectors
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -15,71 +21,305 @@ logger = logging.getLogger(__name__)
 # Constants
 EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
 CACHE_DIR = "./.cache/models"
+INDEX_FILE = "index.faiss"
+EMBED_BATCH_SIZE = 256
+# Most recent query embeddings kept per engine
+QUERY_CACHE_SIZE = 512
+
+# One embedding model per process, shared by every engine in it
+_shared_embeddings = None
+_shared_lock = threading.Lock()
+
+@tracing.traced("load_embeddings", profile=True)
+def load_embeddings():
+    """
+    Load the sentence-transformer embedding model.
+
+    Returns:
+        HuggingFaceEmbeddings or None if the model could not be loaded
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    try:
+        # Initialize embeddings - cached to avoid re-downloading
+        embeddings = HuggingFaceEmbeddings(
+            model_name=EMBEDDING_MODEL_NAME,
+            cache_folder=CACHE_DIR
+        )
+        logger.info(f"Loaded embedding model: {EMBEDDING_MODEL_NAME}")
+        return embeddings
+    except Exception as e:
+        logger.error(f"Failed to load embedding model: {e}")
+        return None
+
+def shared_embeddings():
+    """Process-wide embedding model, loaded on first use."""
+    global _shared_embeddings
+    with _shared_lock:
+        if _shared_embeddings is None:
+            _shared_embeddings = load_embeddings()
+        return _shared_embeddings
 
 class SemanticSearchEngine:
     """
     Handles semantic embeddings and vector retrieval for the book content.
     Uses 'all-MiniLM-L6-v2' (Sentencetransformers) and FAISS.
+
+    The index only stores vectors; chunk ids map back into the shared
+    ChunkStore, so the text is not copied into a separate docstore.
     """
     
-    def __init__(self):
-        self._check_cache()
-        try:
-            # Initialize embeddings - cached to avoid re-downloading
-            self.embeddings = HuggingFaceEmbeddings(
-                model_name=EMBEDDING_MODEL_NAME,
-                cache_folder=CACHE_DIR
-            )
-            logger.info(f"Loaded embedding model: {EMBEDDING_MODEL_NAME}")
-        except Exception as e:
-            logger.error(f"Failed to load embedding model: {e}")
-            self.embeddings = None
-            
-        self.vector_store = None
+    @tracing.traced("semantic_engine.init")
+    def __init__(self, embeddings=None):
+        """
+        Args:
+            embeddings: Optional preloaded embedding model to share between
+                engines (e.g. one per batch worker process)
+        """
+        self.embeddings = embeddings if embeddings is not None else shared_embeddings()
+        self.index = None
+        self.chunks = None
+        self._query_cache = OrderedDict()
+        self._query_lock = threading.Lock()
+        self.query_cache_hits = 0
+        self.query_cache_misses = 0
+
+    def __getstate__(self):
+        # The model is reloaded per process; an in-memory index travels as bytes, a mapped one as its path
+        state = self.__dict__.copy()
+        state["embeddings"] = None
+        if self.index is not None and not isinstance(self.index, MappedFlatIndex):
+            state["index"] = faiss.serialize_index(self.index)
+        state["_query_lock"] = None
+        return state
+
+    def __setstate__(self, state):
+        index = state.pop("index")
+        self.__dict__.update(state)
+        self.embeddings = shared_embeddings()
+        self.index = faiss.deserialize_index(index) if isinstance(index, np.ndarray) else index
+        self._query_lock = threading.Lock()
 
-    def _check_cache(self):
-        if not os.path.exists(CACHE_DIR):
-            os.makedirs(CACHE_DIR, exist_ok=True)
+    def embed_texts(self, texts):
+        """Embed texts into a normalised float32 matrix (rows are unit vectors)."""
+        vectors = np.asarray(self.embeddings.embed_documents(list(texts)), dtype=np.float32)
+        if vectors.ndim == 2 and len(vectors):
+            faiss.normalize_L2(vectors)
+        return vectors
 
+    def embed_queries(self, queries):
+        """
+        Embed queries through a bounded LRU cache; only the misses go to the
+        model, in one batch.
+
+        Returns:
+            np.ndarray: (len(queries), d) unit vectors
+        """
+        queries = list(queries)
+        if not queries:
+            return np.empty((0, self.index.d if self.index is not None else 0), dtype=np.float32)
+        with self._query_lock:
+            cached = {}
+            for q in queries:
+                if q in self._query_cache:
+                    self._query_cache.move_to_end(q)
+                    cached[q] = self._query_cache[q]
+            misses = list(dict.fromkeys(q for q in queries if q not in cached))
+            self.query_cache_hits += sum(q in cached for q in queries)
+            self.query_cache_misses += len(misses)
+        if misses:
+            for q, vector in zip(misses, self.embed_texts(misses)):
+                cached[q] = vector
+            with self._query_lock:
+                for q in misses:
+                    self._query_cache[q] = cached[q]
+                    self._query_cache.move_to_end(q)
+                while len(self._query_cache) > QUERY_CACHE_SIZE:
+                    self._query_cache.popitem(last=False)
+        return np.stack([cached[q] for q in queries])
+
+    @tracing.traced("build_index", profile=True)
     def build_index(self, chunks):
         """
         Builds the FAISS vector index from document chunks.
         
         Args:
-            chunks (List[Document]): List of LangChain Document objects
+            chunks (ChunkStore): Chunk store (a list of Documents is converted)
         """
         if not chunks or not self.embeddings:
             logger.warning("No chunks or embedding model unavailable.")
             return False
 
+        chunks = ChunkStore.from_chunks(chunks)
         try:
-            with st.spinner(f"Indexing {len(chunks)} semantic vectors..."):
-                self.vector_store = FAISS.from_documents(chunks, self.embeddings)
+            with events.stage("index", f"Indexing {len(chunks)} semantic vectors..."):
+                # Sessions indexing the same chunks at the same time share one embedding pass
+                # (the flat index is only read afterwards, so engines can share it)
+                key = ("build_index", EMBEDDING_MODEL_NAME, chunks.fingerprint())
+                self.index = flights.do(key, self._embed_index, chunks)
+                self.chunks = chunks
                 logger.info("Vector store built successfully.")
                 return True
         except Exception as e:
             logger.error(f"Error building vector store: {e}")
-            st.error(f"Failed to build semantic index: {e}")
+            events.emit(events.ERROR, f"Failed to build semantic index: {e}", stage="index")
+            return False
+
+    def _embed_index(self, chunks):
+        index = None
+        for start in range(0, len(chunks), EMBED_BATCH_SIZE):
+            batch = range(start, min(start + EMBED_BATCH_SIZE, len(chunks)))
+            vectors = self.embed_texts(chunks.texts(batch))
+            if index is None:
+                index = faiss.IndexFlatIP(vectors.shape[1])
+            index.add(vectors)
+            events.emit(events.PROGRESS, f"Embedded {batch.stop}/{len(chunks)} chunks", stage="index",
+                        fraction=batch.stop / len(chunks))
+        return index
+
+    def save(self, path):
+        """Persist the chunk store and the index vectors (float32, plus any VECTOR_DTYPE quantised copy)."""
+        if self.index is None:
+            return False
+        self.chunks.save(path)
+        write_vectors(os.path.join(path, VECTORS_FILE), self.vectors())
+        return True
+
+    def publish(self, path, mmap=VECTOR_MMAP):
+        """
+        Save into `path` atomically (written next to it, then renamed, so
+        readers never see a partial index). If another process published the
+        same index first, its copy is kept.
+
+        Args:
+            mmap (bool): Afterwards search the saved file through a memory map
+                instead of this engine's in-memory index
+
+        Returns:
+            bool: True if the index exists at `path`, False if it could not be written
+        """
+        if self.index is None:
+            return False
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            self.save(tmp_path)
+        except (OSError, ValueError) as e:
+            logger.error(f"Failed to save search index to {path}: {e}")
+            shutil.rmtree(tmp_path, ignore_errors=True)
             return False
+        try:
+            os.rename(tmp_path, path)
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        if mmap and not isinstance(self.index, MappedFlatIndex):
+            self.index = MappedFlatIndex(os.path.join(path, VECTORS_FILE))
+        return True
+
+    @classmethod
+    def load(cls, path, embeddings=None, mmap=VECTOR_MMAP):
+        """
+        Load an engine written by save().
+
+        Args:
+            mmap (bool): Map the vectors read-only (shared page cache across
+                processes) instead of reading them into a FAISS index
+        """
+        engine = cls(embeddings=embeddings)
+        engine.chunks = ChunkStore.load(path)
+        vectors_path = os.path.join(path, VECTORS_FILE)
+        if not os.path.exists(vectors_path):
+            # Saved before vectors were stored for mapping
+            engine.index = faiss.read_index(os.path.join(path, INDEX_FILE))
+        elif mmap:
+            engine.index = MappedFlatIndex(vectors_path)
+        else:
+            mapped = MappedFlatIndex(vectors_path)
+            engine.index = faiss.IndexFlatIP(mapped.d)
+            engine.index.add(mapped.reconstruct_n(0, mapped.ntotal))
+        return engine
+
+    def vectors(self, start=0, stop=None):
+        """Stored unit vectors of chunk ids [start, stop) as a float32 matrix."""
+        if self.index is None:
+            return np.empty((0, 0), dtype=np.float32)
+        stop = self.index.ntotal if stop is None else min(stop, self.index.ntotal)
+        if stop <= start:
+            return np.empty((0, self.index.d), dtype=np.float32)
+        return self.index.reconstruct_n(start, stop - start)
+
+    def _search_vectors(self, query_vectors, k, chunk_range=None):
+        """FAISS search for a batch of query vectors; returns (ids, scores) matrices, -1 = no hit."""
+        if isinstance(self.index, MappedFlatIndex):
+            scores, ids = self.index.search(query_vectors, k, chunk_range)
+        elif chunk_range is None:
+            scores, ids = self.index.search(query_vectors, min(k, self.index.ntotal))
+        else:
+            start, stop = chunk_range
+            params = faiss.SearchParameters(sel=faiss.IDSelectorRange(start, stop))
+            scores, ids = self.index.search(query_vectors, min(k, stop - start), params=params)
+        return ids, scores
+
+    @tracing.traced("search")
+    def search_ids(self, query, k=4, chunk_range=None):
+        """
+        Args:
+            query (str): Query text
+            k (int): Number of results
+            chunk_range (tuple): Optional (start, stop) chunk ids to restrict the search to,
+                e.g. ChunkStore.section_range() for chapter-scoped search
+
+        Returns:
+            tuple: (chunk ids, cosine scores) as NumPy arrays, best first
+        """
+        if self.index is None or (chunk_range is not None and chunk_range[1] <= chunk_range[0]):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ids, scores = self._search_vectors(self.embed_queries([query]), k, chunk_range)
+        keep = ids[0] >= 0
+        return ids[0][keep], scores[0][keep]
+
+    @tracing.traced("search_batch")
+    def search_batch(self, queries, k=4, chunk_range=None):
+        """
+        Search many queries at once: one embedding batch and one FAISS call.
+        Meant for multi-query expansion, concept maps and evaluation runs.
 
-    def search(self, query, k=4):
+        Args:
+            queries (List[str]): Query texts
+            k (int): Results per query
+            chunk_range (tuple): Optional (start, stop) chunk ids to restrict the search to
+
+        Returns:
+            List[List[Document]]: Top k chunks for each query, in query order
+        """
+        queries = list(queries)
+        if self.index is None or not queries or (chunk_range is not None and chunk_range[1] <= chunk_range[0]):
+            return [[] for _ in queries]
+        try:
+            ids, _ = self._search_vectors(self.embed_queries(queries), k, chunk_range)
+            return [[self.chunks.document(int(i)) for i in row if i >= 0] for row in ids]
+        except Exception as e:
+            logger.error(f"Batch search failed: {e}")
+            return [[] for _ in queries]
+
+    def search(self, query, k=4, section=None):
         """
         Semantic search for the query.
         
         Args:
             query (str): User question/query
             k (int): Number of results to return
+            section (int): Optional section index to search within (includes sub-sections)
             
         Returns:
             List[Document]: Top k most relevant chunks with metadata
         """
-        if not self.vector_store:
+        if self.index is None:
             return []
             
         try:
-            # Performs cosine similarity search
-            results = self.vector_store.similarity_search(query, k=k)
-            return results
+            # Inner product of unit vectors == cosine similarity
+            chunk_range = self.chunks.section_range(section) if section is not None else None
+            ids, _ = self.search_ids(query, k=k, chunk_range=chunk_range)
+            return [self.chunks.document(int(i)) for i in ids]
         except Exception as e:
             logger.error(f"Search failed: {e}")
             return []
@@ -87,5 +327,13 @@ class SemanticSearchEngine:
     def get_related_concepts(self, query, k=10):
         """
         Finds broadly related content for concept mapping (wider search).
+
+        Args:
+            query (str or List[str]): One concept, or several searched as one batch
+
+        Returns:
+            List[Document] for one concept, List[List[Document]] for several
         """
-        return self.search(query, k=k)
+        if isinstance(query, str):
+            return self.search(query, k=k)
+        return self.search_batch(query, k=k)
@@ -1,8 +1,14 @@
+import os
 import PyPDF2
-from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
-import streamlit as st
 import logging
+from src.core import events, tracing
+from src.core.cache import DocumentCache, sha256_bytes
+from src.core.chunks import ChunkStore
+from src.core.splitter import TextSplitter
+from src.core.structure import detect_sections, page_segments
+from src.core.dedupe import strip_repeated_lines, near_duplicates
+from src.core.singleflight import flights
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,15 +19,30 @@ def extract_text_from_pdf(uploaded_file):
     Extract text from a PDF file with page metadata.
     
     Args:
-        uploaded_file: Streamlit UploadedFile object
+        uploaded_file: Streamlit UploadedFile or any binary file object with a .name
         
     Returns:
         tuple: (List[Document], page_count)
     """
+    documents, page_count, _ = _read_pdf(uploaded_file, detect_structure=False)
+    return documents, page_count
+
+def extract_pdf_with_structure(uploaded_file):
+    """
+    Extract page text and the heading hierarchy (chapters/sections).
+
+    Returns:
+        tuple: (List[Document], page_count, List[Section])
+    """
+    return _read_pdf(uploaded_file, detect_structure=True)
+
+@tracing.traced("extract_pdf", profile=True)
+def _read_pdf(uploaded_file, detect_structure):
     try:
         pdf_reader = PyPDF2.PdfReader(uploaded_file)
         documents = []
         page_count = len(pdf_reader.pages)
+        events.emit(events.START, f"Reading {page_count} pages...", stage="extract")
         
         for i, page in enumerate(pdf_reader.pages):
             page_text = page.extract_text()
@@ -35,21 +56,30 @@ def extract_text_from_pdf(uploaded_file):
             
             if i % 10 == 0:
                 logger.debug(f"Processed {i}/{page_count} pages")
+                events.emit(events.PROGRESS, f"Reading page {i + 1}/{page_count}", stage="extract",
+                            fraction=(i + 1) / page_count)
                 
-        return documents, page_count
+        # Running headers/footers would otherwise be embedded with every chunk (and look like headings)
+        documents, _ = strip_repeated_lines(documents)
+        sections = detect_sections(pdf_reader, documents) if detect_structure else []
+        events.emit(events.END, stage="extract")
+        return documents, page_count, sections
     except Exception as e:
         logger.error(f"Error reading PDF: {e}")
-        st.error(f"Error reading PDF: {e}")
-        return [], 0
+        events.emit(events.END, stage="extract")
+        events.emit(events.ERROR, f"Error reading PDF: {e}", stage="extract")
+        return [], 0, []
 
-def chunk_documents(documents, chunk_size=1000, chunk_overlap=150):
+@tracing.traced("chunk_documents", profile=True)
+def chunk_documents(documents, chunk_size=1000, chunk_overlap=150, length_unit="chars"):
     """
     Split documents into smaller chunks while preserving metadata.
     
     Args:
         documents (List[Document]): List of LangChain Documents
-        chunk_size (int): Character size of each chunk
-        chunk_overlap (int): Overlap between chunks
+        chunk_size (int): Size of each chunk, in `length_unit`
+        chunk_overlap (int): Overlap between chunks, in `length_unit`
+        length_unit (str): "chars" or "tokens"
         
     Returns:
         List[Document]: List of chunked documents
@@ -57,13 +87,96 @@ def chunk_documents(documents, chunk_size=1000, chunk_overlap=150):
     if not documents:
         return []
         
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        length_function=len,
-        add_start_index=True,
-    )
-    
+    text_splitter = TextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_unit=length_unit)
     chunks = text_splitter.split_documents(documents)
     logger.info(f"Split {len(documents)} pages into {len(chunks)} chunks")
     return chunks
+
+@tracing.traced("load_document")
+def load_document(uploaded_file, chunk_size=1000, chunk_overlap=150, length_unit="chars", cache=None):
+    """
+    Extract and chunk a PDF, reusing cached page text and chunk boundaries
+    when the same file (by SHA-256) was processed before.
+
+    Args:
+        uploaded_file: Streamlit UploadedFile or binary file object
+        chunk_size (int): Size of each chunk, in `length_unit`
+        chunk_overlap (int): Overlap between chunks, in `length_unit`
+        length_unit (str): "chars" or "tokens"
+        cache (DocumentCache): Cache to use (default: on-disk cache)
+
+    Returns:
+        tuple: (ChunkStore, page_count, sha256). The store is empty on failure.
+    """
+    cache = cache or DocumentCache()
+    digest = sha256_bytes(uploaded_file.read())
+    uploaded_file.seek(0)
+    params = (chunk_size, chunk_overlap, length_unit)
+    # Concurrent uploads of the same file (other sessions or worker processes) wait for one extraction
+    key = ("load_document", os.path.abspath(cache.cache_dir), digest) + params
+    return flights.do(key, _load_document, uploaded_file, digest, params, cache, cross_process=True)
+
+def _load_document(uploaded_file, digest, params, cache):
+    chunk_size, chunk_overlap, length_unit = params
+    cached_pages = cache.load_pages(digest)
+    cached_chunks = cache.load_chunks(digest, *params) if cached_pages else None
+    if cached_chunks is not None:
+        logger.info(f"Loaded {len(cached_chunks)} cached chunks for {digest[:12]}")
+        return cached_chunks, cached_pages[1], digest
+
+    if cached_pages is not None:
+        documents, page_count, sections = cached_pages
+    else:
+        documents, page_count, sections = extract_pdf_with_structure(uploaded_file)
+        if not documents:
+            return ChunkStore.from_chunks([], doc_id=digest), page_count, digest
+        cache.save_pages(digest, documents, page_count, sections)
+
+    text_splitter = TextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, length_unit=length_unit)
+    with tracing.span("split_pages", profile=True, pages=len(documents)):
+        spans, section_ids = split_pages(documents, text_splitter, sections)
+    store = ChunkStore.from_spans(documents, spans, doc_id=digest, section_ids=section_ids, sections=sections)
+    logger.info(f"Split {len(documents)} pages into {len(store)} chunks ({len(sections)} sections)")
+    store = drop_near_duplicates(store)
+    cache.save_chunks(digest, store, *params)
+    return store, page_count, digest
+
+def drop_near_duplicates(store):
+    """
+    Remove chunks that nearly repeat an earlier one (MinHash/LSH), e.g.
+    exercise boilerplate or repeated tables, before they are embedded.
+
+    Returns:
+        ChunkStore: The store without the duplicates (the same store if there are none)
+    """
+    with tracing.span("dedupe", chunks=len(store)):
+        keep = near_duplicates(list(store.texts()))
+    skipped = len(store) - int(keep.sum())
+    if not skipped:
+        return store
+    logger.info(f"Dropped {skipped}/{len(store)} near-duplicate chunks")
+    events.emit(events.INFO, f"Skipped {skipped} near-duplicate chunks ({skipped} fewer embeddings)",
+                stage="dedupe", skipped=skipped, total=len(store))
+    return store.select(keep.nonzero()[0])
+
+def split_pages(documents, text_splitter, sections=None):
+    """
+    Split pages into chunk spans without crossing section boundaries.
+
+    Returns:
+        tuple: (spans per page, section index per chunk (-1 = none))
+    """
+    spans = []
+    section_ids = []
+    page_start = 0
+    for doc in documents:
+        text = doc.page_content
+        page_end = page_start + len(text)
+        page_spans = []
+        for seg_start, seg_end, section in page_segments(sections or [], page_start, page_end):
+            for start, end in text_splitter.split_spans(text[seg_start:seg_end]):
+                page_spans.append((seg_start + start, seg_start + end))
+                section_ids.append(section)
+        spans.append(page_spans)
+        page_start = page_end
+    return spans, section_ids
@@ -0,0 +1,306 @@
+"""
+Token-bucket rate limiting with fair queuing for LLM calls.
+
+Every backend credential (provider identity) has global requests/minute and
+tokens/minute buckets; every user has their own buckets sized by role (see
+LLM_RATE_LIMITS). Calls that can't go right away wait in a queue per user,
+and users are served round-robin, so one user sending many requests can't
+starve everyone else on a shared API key.
+
+Waiting callers emit "llm_queue" events with their position and an ETA so
+the UI can show progress instead of a frozen spinner.
+"""
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict, deque
+from src.config import LLM_RATE_LIMITS, LLM_QUEUE_TIMEOUT
+from src.core import events, tracing
+
+logger = logging.getLogger(__name__)
+
+# Longest a waiter sleeps before re-checking the buckets
+POLL_SECONDS = 1.0
+WAIT_WINDOW = 500
+
+class TokenBucket:
+    """Refills continuously at per_minute / 60 per second, up to one minute's worth."""
+
+    def __init__(self, per_minute):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` can be taken (requests larger than the bucket only need a full bucket)."""
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        return 0.0 if self.level >= needed else (needed - self.level) / self.rate
+
+    def take(self, amount):
+        # Oversized requests leave the bucket in debt, which delays the next ones
+        self.level -= amount
+
+    def adjust(self, delta):
+        """Correct an earlier take() by delta (positive = used more than reserved)."""
+        self.level = min(self.capacity, self.level - delta)
+
+def _buckets(limits):
+    if not limits:
+        return []
+    return [(TokenBucket(limits["rpm"]), "requests"), (TokenBucket(limits["tpm"]), "tokens")]
+
+class Ticket:
+    """One queued call."""
+    __slots__ = ("identity", "user", "tokens", "enqueued", "granted", "buckets")
+
+    def __init__(self, identity, user, tokens):
+        self.identity = identity
+        self.user = user
+        self.tokens = tokens
+        self.enqueued = time.monotonic()
+        self.granted = False
+        self.buckets = []
+
+class RateLimiter:
+    def __init__(self, limits=None):
+        """
+        Args:
+            limits (dict): {"global": {"rpm", "tpm"}, <role>: {"rpm", "tpm"} or None (unlimited),
+                "default": limits for other roles}; defaults to LLM_RATE_LIMITS
+        """
+        self.limits = limits or LLM_RATE_LIMITS
+        self._cond = threading.Condition()
+        self._global = {}
+        self._users = {}
+        # identity -> user -> waiting tickets; dict order is the round-robin order
+        self._queues = {}
+        self._waits = deque(maxlen=WAIT_WINDOW)
+        self.timeouts = 0
+
+    def _global_buckets(self, identity):
+        if identity is None:
+            return []
+        if identity not in self._global:
+            self._global[identity] = _buckets(self.limits.get("global"))
+        return self._global[identity]
+
+    def _user_buckets(self, user, role):
+        if user is None:
+            return []
+        if user not in self._users:
+            self._users[user] = _buckets(self.limits.get(role, self.limits.get("default")))
+        return self._users[user]
+
+    @staticmethod
+    def _wait(buckets, ticket, now):
+        return max((b.wait_time(1 if kind == "requests" else ticket.tokens, now) for b, kind in buckets), default=0.0)
+
+    def _grant(self, identity):
+        """
+        Hand out capacity to waiting tickets, users in round-robin order.
+        Call with the condition held.
+
+        Returns:
+            float: Seconds until the next ticket could be granted
+        """
+        queues = self._queues.get(identity)
+        if not queues:
+            return POLL_SECONDS
+        now = time.monotonic()
+        global_buckets = self._global_buckets(identity)
+        next_wake = POLL_SECONDS
+        any_granted = False
+        granted = True
+        while granted and queues:
+            granted = False
+            for user in list(queues):
+                ticket = queues[user][0]
+                # A user over their own limit is skipped so the next user gets the global capacity
+                user_wait = self._wait(ticket.buckets, ticket, now)
+                if user_wait > 0:
+                    next_wake = min(next_wake, user_wait)
+                    continue
+                global_wait = self._wait(global_buckets, ticket, now)
+                if global_wait > 0:
+                    next_wake = min(next_wake, global_wait)
+                    break
+                for bucket, kind in ticket.buckets + global_buckets:
+                    bucket.take(1 if kind == "requests" else ticket.tokens)
+                ticket.granted = True
+                self._waits.append(now - ticket.enqueued)
+                queues[user].popleft()
+                if queues[user]:
+                    # Served: this user's next call goes to the back of the round
+                    queues.move_to_end(user)
+                else:
+                    del queues[user]
+                granted = any_granted = True
+                break
+        if any_granted:
+            self._cond.notify_all()
+        return next_wake
+
+    def _enqueue(self, identity, user, role, tokens):
+        ticket = Ticket(identity, user, tokens)
+        ticket.buckets = self._user_buckets(user, role)
+        queues = self._queues.setdefault(identity, OrderedDict())
+        queues.setdefault(user, deque()).append(ticket)
+        return ticket
+
+    def _dequeue(self, ticket):
+        queues = self._queues.get(ticket.identity, {})
+        waiting = queues.get(ticket.user)
+        if waiting and ticket in waiting:
+            waiting.remove(ticket)
+            if not waiting:
+                del queues[ticket.user]
+
+    def _abandon(self, ticket):
+        """Withdraw the ticket of a caller that stopped waiting (timeout, cancellation or any other exception)."""
+        with self._cond:
+            self._dequeue(ticket)
+            granted = ticket.granted
+        if granted:
+            # Granted just as the caller gave up: hand back the reserved tokens
+            self.settle(ticket, 0)
+
+    def _position(self, ticket):
+        """(tickets ahead of this one, ETA seconds) from queue order and the global request rate."""
+        queues = self._queues.get(ticket.identity, {})
+        waiting = queues.get(ticket.user, ())
+        mine = list(waiting).index(ticket) if ticket in waiting else 0
+        # Round-robin: every other user with waiters gets a turn per round
+        ahead = sum(min(len(q), mine + 1) for u, q in queues.items() if u != ticket.user) + mine
+        global_buckets = self._global_buckets(ticket.identity)
+        rate = min((b.rate for b, kind in global_buckets if kind == "requests"), default=None)
+        eta = ahead / rate if rate else 0.0
+        return ahead, max(eta, self._wait(ticket.buckets, ticket, time.monotonic()))
+
+    def acquire(self, identity, user=None, role=None, tokens=0, timeout=LLM_QUEUE_TIMEOUT):
+        """
+        Wait for capacity for one call.
+
+        Args:
+            identity (str): Backend credential the global limits apply to (None = per-user limits only,
+                e.g. once per routed call, with each backend attempt admitted on the global limits)
+            user (str): User id for the per-user limits (None = global limits only)
+            role (str): User role, selects the per-user limits
+            tokens (int): Tokens reserved for the call (prompt + expected response)
+            timeout (float): Give up after this many seconds
+
+        Returns:
+            Ticket, or None if the call had to wait longer than timeout
+        """
+        deadline = time.monotonic() + timeout
+        waiting = admitted = False
+        with self._cond:
+            ticket = self._enqueue(identity, user, role, tokens)
+        try:
+            while True:
+                with self._cond:
+                    wake = self._grant(identity)
+                    if ticket.granted:
+                        admitted = True
+                        return ticket
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        return None
+                    ahead, eta = self._position(ticket)
+                waiting = self._report(ticket, ahead, eta, waiting)
+                with self._cond:
+                    if not ticket.granted:
+                        self._cond.wait(min(wake, remaining, POLL_SECONDS))
+        finally:
+            # A ticket left in the queue would hold up every later caller for this backend
+            if not admitted:
+                self._abandon(ticket)
+            if waiting:
+                events.emit(events.END, stage="llm_queue")
+
+    async def aacquire(self, identity, user=None, role=None, tokens=0, timeout=LLM_QUEUE_TIMEOUT):
+        """Async acquire(): waits without blocking the event loop."""
+        deadline = time.monotonic() + timeout
+        waiting = admitted = False
+        with self._cond:
+            ticket = self._enqueue(identity, user, role, tokens)
+        try:
+            while True:
+                with self._cond:
+                    wake = self._grant(identity)
+                    if ticket.granted:
+                        admitted = True
+                        return ticket
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.timeouts += 1
+                        return None
+                    ahead, eta = self._position(ticket)
+                waiting = self._report(ticket, ahead, eta, waiting)
+                await asyncio.sleep(min(wake, remaining, POLL_SECONDS))
+        finally:
+            if not admitted:
+                self._abandon(ticket)
+            if waiting:
+                events.emit(events.END, stage="llm_queue")
+
+    def _report(self, ticket, ahead, eta, started):
+        waited = time.monotonic() - ticket.enqueued
+        message = f"Waiting for the language model: {ahead} request(s) ahead, about {eta:.0f}s"
+        if not started:
+            events.emit(events.START, message, stage="llm_queue")
+        events.emit(events.PROGRESS, message, stage="llm_queue", fraction=waited / (waited + eta) if eta else 1.0,
+                    ahead=ahead, eta_seconds=eta)
+        return True
+
+    def settle(self, ticket, tokens):
+        """Replace the ticket's token reservation with the tokens the call actually used."""
+        if ticket is None:
+            return
+        delta = tokens - ticket.tokens
+        with self._cond:
+            for bucket, kind in ticket.buckets + self._global_buckets(ticket.identity):
+                if kind == "tokens":
+                    bucket.adjust(delta)
+
+    def status(self):
+        """
+        Returns:
+            dict: queue_depth (waiting calls), waiting_users, mean/p95 wait seconds of recent calls, timeouts
+        """
+        with self._cond:
+            depth = sum(len(q) for queues in self._queues.values() for q in queues.values())
+            users = len({u for queues in self._queues.values() for u in queues})
+            waits = sorted(self._waits)
+            timeouts = self.timeouts
+        return {
+            "queue_depth": depth, "waiting_users": users, "timeouts": timeouts,
+            "mean_wait_seconds": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "p95_wait_seconds": round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 3) if waits else 0.0,
+        }
+
+    def prometheus_lines(self):
+        status = self.status()
+        return [
+            "# HELP book_analyzer_llm_queue_depth LLM calls waiting for rate limit capacity.",
+            "# TYPE book_analyzer_llm_queue_depth gauge",
+            f"book_analyzer_llm_queue_depth {status['queue_depth']}",
+            "# HELP book_analyzer_llm_queue_wait_seconds Recent wait for rate limit capacity.",
+            "# TYPE book_analyzer_llm_queue_wait_seconds gauge",
+            f'book_analyzer_llm_queue_wait_seconds{{stat="mean"}} {status["mean_wait_seconds"]}',
+            f'book_analyzer_llm_queue_wait_seconds{{stat="p95"}} {status["p95_wait_seconds"]}',
+            "# HELP book_analyzer_llm_queue_timeouts_total LLM calls that gave up waiting.",
+            "# TYPE book_analyzer_llm_queue_timeouts_total counter",
+            f"book_analyzer_llm_queue_timeouts_total {status['timeouts']}",
+        ]
+
+# Process-wide limiter shared by every session's providers
+limiter = RateLimiter()
+tracing.register_collector(limiter.prometheus_lines)
@@ -0,0 +1,261 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from src.core.structure import NUMBER_WORDS
+
+logger = logging.getLogger(__name__)
+
+# Precomputed section digests, one JSON file per section content hash
+SECTION_CACHE_DIR = "./.cache/sections"
+# Concurrent LLM calls while precomputing
+SECTION_SUMMARY_CONCURRENCY = 4
+SECTION_CONTEXT_CHARS = 4000
+KEYWORD_COUNT = 8
+# Providers report failures as text starting with one of these
+LLM_ERROR_PREFIXES = ("⚠️", "Error connecting")
+
+STOPWORDS = set("""
+a about above after again against all also am an and any are as at be because been before being below
+between both but by can could did do does doing down during each few for from further had has have having
+he her here hers herself him himself his how i if in into is it its itself just me more most my myself no
+nor not now of off on once only or other our ours ourselves out over own same she should so some such than
+that the their theirs them themselves then there these they this those through to too under until up very
+was we were what when where which while who whom why will with would you your yours yourself yourselves
+chapter section page figure table
+""".split())
+
+WORD_RE = re.compile(r"[A-Za-z][A-Za-z\-]{3,}")
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+# Only numbers count as a reference: digits, roman numerals or number words ("chapter the..." is not one).
+# Roman numerals go up to 399 (so words like "mix" or "dim" don't count) and must be non-empty; a bare
+# "i" only counts before punctuation or the end, since "the part I liked" is a pronoun
+ROMAN_NUMERAL = r"(?!i\b(?!\s*(?:[^\w\s]|$)))c{0,3}(?:xc|xl|l?x{0,3})(?:ix|iv|v?i{0,3})(?<=[clxvi])"
+CHAPTER_REF_RE = re.compile(r"\b(chapter|part|section)\s+([0-9]+(?:\.[0-9]+)*|" + ROMAN_NUMERAL + "|"
+                            + "|".join(NUMBER_WORDS) + r")\b", re.IGNORECASE)
+
+def section_reference(question):
+    """
+    Section a question names explicitly, e.g. "chapter 5", "part iv" or "section 2.1".
+
+    Returns:
+        tuple: (kind, number) in lower case, or None
+
+    >>> section_reference("What happens in chapter 5?")
+    ('chapter', '5')
+    >>> section_reference("Summarize chapter five")
+    ('chapter', 'five')
+    >>> section_reference("What does Part IV say about money?")
+    ('part', 'iv')
+    >>> section_reference("Summarize part I.")
+    ('part', 'i')
+    >>> section_reference("In this chapter the author argues for free trade") is None
+    True
+    >>> section_reference("Which chapter the best examples are in?") is None
+    True
+    >>> section_reference("Which chapter is about markets?") is None
+    True
+    >>> section_reference("Explain the part I liked most") is None
+    True
+    >>> section_reference("Part mix of ideas, part memoir") is None
+    True
+    """
+    match = CHAPTER_REF_RE.search(question)
+    if not match or not match.group(2):
+        return None
+    return match.group(1).lower(), match.group(2).lower()
+
+def keywords(text, count=KEYWORD_COUNT):
+    words = [w.lower() for w in WORD_RE.findall(text)]
+    return [w for w, _ in Counter(w for w in words if w not in STOPWORDS).most_common(count)]
+
+def extractive_summary(text, sentence_count=3):
+    """Highest scoring sentences by word frequency, in their original order."""
+    sentences = [s.strip() for s in SENTENCE_RE.split(text) if len(s.strip()) > 30]
+    if not sentences:
+        return text[:300]
+    freq = Counter(w.lower() for w in WORD_RE.findall(text) if w.lower() not in STOPWORDS)
+
+    def score(sentence):
+        words = [w.lower() for w in WORD_RE.findall(sentence)]
+        return sum(freq[w] for w in words) / (len(words) or 1)
+
+    best = sorted(range(len(sentences)), key=lambda i: score(sentences[i]), reverse=True)[:sentence_count]
+    return " ".join(sentences[i] for i in sorted(best))
+
+class SectionSummaries:
+    """
+    Short summary + keywords for every detected section, computed in the
+    background after ingestion.
+
+    Results are cached on disk by a hash of the section's chunk texts, so when
+    a revised edition is uploaded only the sections whose text changed are
+    recomputed.
+    """
+
+    def __init__(self, chunks, llm_provider, cache_dir=SECTION_CACHE_DIR, max_workers=SECTION_SUMMARY_CONCURRENCY,
+                 summarizer=None):
+        """
+        Args:
+            chunks (ChunkStore): Chunk store with detected sections
+            llm_provider (LLMProvider): Provider used for abstractive summaries
+            summarizer (ExtractiveSummarizer): Optional offline summarizer used instead of the
+                word-frequency fallback
+        """
+        self.chunks = chunks
+        self.llm_provider = llm_provider
+        self.summarizer = summarizer
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.results = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def section_hash(self, section):
+        start, stop = self.chunks.section_range(section)
+        h = hashlib.sha256(self.chunks.sections[section].title.encode("utf-8"))
+        for text in self.chunks.texts(range(start, stop)):
+            h.update(b"\x00" + text.encode("utf-8"))
+        return h.hexdigest()
+
+    def _cache_path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def _load_cached(self, digest):
+        path = self._cache_path(digest)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _section_text(self, section):
+        start, stop = self.chunks.section_range(section)
+        return "\n\n".join(self.chunks.texts(range(start, stop)))
+
+    def _extractive(self, section, text):
+        if self.summarizer is not None and self.summarizer.available:
+            summary = self.summarizer.summary_text(3, self.chunks.section_range(section))
+            if summary:
+                return summary
+        return extractive_summary(text)
+
+    def _summarize(self, section, text):
+        from src.core.llm import SimulationProvider
+        title = self.chunks.sections[section].title
+        if isinstance(self.llm_provider, SimulationProvider):
+            return self._extractive(section, text)
+        prompt = f"""
+        Summarize the book section "{title}" in at most 4 sentences.
+        Use only the provided text.
+
+        Text:
+        {text[:SECTION_CONTEXT_CHARS]}
+
+        Summary:
+        """
+        summary = self.llm_provider.generate_text(prompt, feature="section_digest").strip()
+        if summary.startswith(LLM_ERROR_PREFIXES):
+            raise RuntimeError(summary)
+        return summary
+
+    def compute(self, section):
+        """Summary and keywords for one section (from cache if the text is unchanged)."""
+        digest = self.section_hash(section)
+        result = self._load_cached(digest)
+        if result is None:
+            text = self._section_text(section)
+            result = {"title": self.chunks.sections[section].title, "keywords": keywords(text), "hash": digest}
+            try:
+                result["summary"] = self._summarize(section, text)
+                os.makedirs(self.cache_dir, exist_ok=True)
+                with open(self._cache_path(digest), "w", encoding="utf-8") as f:
+                    json.dump(result, f, ensure_ascii=False)
+            except RuntimeError as e:
+                # Not cached, so the next upload retries the LLM
+                logger.warning(f"LLM section summary failed, using extractive fallback: {e}")
+                result["summary"] = self._extractive(section, text)
+        with self._lock:
+            self.results[section] = result
+        return result
+
+    def _run(self):
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for future in [pool.submit(self.compute, i) for i in range(len(self.chunks.sections))]:
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.warning(f"Section summary failed: {e}")
+        logger.info(f"Precomputed {len(self.results)}/{len(self.chunks.sections)} section summaries")
+
+    def start(self):
+        """Precompute all sections on a background thread."""
+        if self._thread is None and self.chunks.sections:
+            self._thread = threading.Thread(target=self._run, name="section-summaries", daemon=True)
+            self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def get(self, section):
+        """Precomputed result for a section, or None if not ready yet."""
+        with self._lock:
+            return self.results.get(section)
+
+    def progress(self):
+        with self._lock:
+            return len(self.results), len(self.chunks.sections)
+
+    def find_referenced_section(self, question):
+        """Section explicitly named in a question, e.g. "chapter 5" or "section 2.1"."""
+        reference = section_reference(question)
+        if reference is None:
+            return None
+        kind, number = reference
+        # "chapter five" also finds "Chapter 5" and vice versa
+        names = {number}
+        if number in NUMBER_WORDS:
+            names.add(str(NUMBER_WORDS.index(number) + 1))
+        elif number.isdigit() and 0 < int(number) <= len(NUMBER_WORDS):
+            names.add(NUMBER_WORDS[int(number) - 1])
+        alternatives = "|".join(re.escape(name) for name in names)
+        pattern = rf"\b{kind}\s+(?:{alternatives})\b"
+        if number[0].isdigit():
+            # Titles like "5 The Market" or "2.1 Prices" carry only the number
+            pattern += rf"|^{re.escape(number)}\b"
+        pattern = re.compile(pattern, re.IGNORECASE)
+        for i, section in enumerate(self.chunks.sections):
+            if pattern.search(section.title):
+                return i
+        return None
+
+    def best_matching_section(self, question, min_overlap=2):
+        """Ready section whose keywords overlap the question the most."""
+        words = {w.lower() for w in WORD_RE.findall(question)} - STOPWORDS
+        best, best_overlap = None, min_overlap - 1
+        with self._lock:
+            items = list(self.results.items())
+        for section, result in items:
+            overlap = len(words & set(result["keywords"]))
+            if overlap > best_overlap:
+                best, best_overlap = section, overlap
+        return best
+
+    def __getstate__(self):
+        # Background thread and lock are per process
+        state = self.__dict__.copy()
+        state["_lock"] = None
+        state["_thread"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
@@ -0,0 +1,172 @@
+"""
+Single-flight coalescing of identical concurrent work.
+
+When several sessions ask for the same thing at once (the same PDF uploaded
+by a whole class, the same summary prompt), the first caller for a key does
+the work and the others wait for its result instead of repeating it. Only
+work that is in flight is shared; nothing is cached once it finishes.
+
+Work whose result lands on disk (e.g. the document cache) can also take a
+file lock per key, so parallel processes wait for each other and then find
+the result already written.
+"""
+import os
+import asyncio
+import hashlib
+import logging
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from src.core import tracing
+
+logger = logging.getLogger(__name__)
+
+LOCK_DIR = "./.cache/locks"
+
+class _LeaderCancelled(Exception):
+    """The caller doing the work was cancelled; a waiting caller takes over."""
+
+class _NotShared(_LeaderCancelled):
+    """The leader's result only applies to the leader (see `share`); a waiting caller takes over."""
+
+def key_digest(*parts):
+    """Short stable hash of key parts (for long keys such as prompts)."""
+    return hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:32]
+
+@contextmanager
+def file_lock(name, lock_dir=LOCK_DIR):
+    """Exclusive advisory lock on <lock_dir>/<name>.lock (a no-op where fcntl is unavailable)."""
+    try:
+        import fcntl
+    except ImportError:
+        yield
+        return
+    os.makedirs(lock_dir, exist_ok=True)
+    with open(os.path.join(lock_dir, f"{name}.lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with equal keys, across threads and event loops.
+
+    Keys are tuples whose first element names the operation, e.g.
+    ("build_index", doc_fingerprint); that name labels the counters.
+    """
+
+    def __init__(self, lock_dir=LOCK_DIR):
+        self.lock_dir = lock_dir
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.stats = {}
+
+    def _join(self, key):
+        """(future, is_leader) for key."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            counts = self.stats.setdefault(key[0], {"leaders": 0, "coalesced": 0})
+            counts["leaders" if leader else "coalesced"] += 1
+        return future, leader
+
+    def _finish(self, key, future):
+        with self._lock:
+            if self._calls.get(key) is future:
+                del self._calls[key]
+
+    @contextmanager
+    def _maybe_file_lock(self, key, cross_process):
+        if cross_process:
+            with file_lock(key_digest(*key), self.lock_dir):
+                yield
+        else:
+            yield
+
+    def do(self, key, fn, *args, cross_process=False, share=None, **kwargs):
+        """
+        Run fn(*args, **kwargs), or wait for the identical call already running.
+
+        Args:
+            key (tuple): Operation name followed by everything the result depends on
+            cross_process (bool): Also serialise on a per-key file lock
+            share (callable): Optional predicate on the result; when it is false,
+                waiting callers run fn themselves instead of receiving it
+
+        Returns:
+            fn's result (exceptions are re-raised in every waiting caller)
+        """
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return future.result()
+            except _LeaderCancelled:
+                continue
+        try:
+            with self._maybe_file_lock(key, cross_process):
+                result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            if share is None or share(result):
+                future.set_result(result)
+            else:
+                future.set_exception(_NotShared())
+            return result
+        finally:
+            self._finish(key, future)
+
+    async def ado(self, key, fn, *args, share=None, **kwargs):
+        """
+        Async do(): awaits fn(*args, **kwargs), or the identical call already
+        running (in any thread or event loop). Waiting callers can be cancelled
+        without affecting the call they wait on.
+        """
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+            try:
+                return await asyncio.shield(asyncio.wrap_future(future))
+            except _LeaderCancelled:
+                continue
+        try:
+            result = await fn(*args, **kwargs)
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            if share is None or share(result):
+                future.set_result(result)
+            else:
+                future.set_exception(_NotShared())
+            return result
+        finally:
+            self._finish(key, future)
+
+    def prometheus_lines(self):
+        with self._lock:
+            stats = {name: dict(counts) for name, counts in self.stats.items()}
+        lines = ["# HELP book_analyzer_coalesced_total Calls that waited on identical in-flight work.",
+                 "# TYPE book_analyzer_coalesced_total counter"]
+        lines += [f'book_analyzer_coalesced_total{{operation="{name}"}} {counts["coalesced"]}'
+                  for name, counts in sorted(stats.items())]
+        lines += ["# HELP book_analyzer_singleflight_leaders_total Calls that did the work themselves.",
+                  "# TYPE book_analyzer_singleflight_leaders_total counter"]
+        lines += [f'book_analyzer_singleflight_leaders_total{{operation="{name}"}} {counts["leaders"]}'
+                  for name, counts in sorted(stats.items())]
+        return lines
+
+# Process-wide instance shared by every session
+flights = SingleFlight()
+tracing.register_collector(flights.prometheus_lines)
@@ -0,0 +1,133 @@
+import re
+import logging
+from bisect import bisect_left, bisect_right
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+# Break candidates in priority order: paragraph, line, word
+SEPARATOR_PATTERNS = [re.compile(r"\n\s*\n"), re.compile(r"\n"), re.compile(r"\s+")]
+NON_SPACE = re.compile(r"\S")
+
+TIKTOKEN_ENCODING = "cl100k_base"
+CHARS_PER_TOKEN = 4  # Estimate used when tiktoken is unavailable
+
+class TextSplitter:
+    """
+    Single-pass splitter for page text.
+
+    Each page is scanned once per separator level to collect break positions;
+    chunks are then cut by walking forward and picking the best break before
+    the size limit (binary search), so nothing is re-split recursively.
+    Every chunk is an exact slice of its page, which lets ChunkStore point
+    into the page buffer instead of copying chunk texts.
+    """
+
+    def __init__(self, chunk_size=1000, chunk_overlap=150, length_unit="chars"):
+        """
+        Args:
+            chunk_size (int): Maximum chunk length in `length_unit`
+            chunk_overlap (int): Overlap between consecutive chunks in `length_unit`
+            length_unit (str): "chars" or "tokens" (tiktoken cl100k_base)
+        """
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        if length_unit not in ("chars", "tokens"):
+            raise ValueError(f"Unknown length unit: {length_unit}")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.length_unit = length_unit
+        self._encoding = None
+
+    def _token_starts(self, text):
+        """Character offset where each token starts (tokens mode)."""
+        if self._encoding is None:
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding(TIKTOKEN_ENCODING)
+            except Exception as e:
+                logger.warning(f"tiktoken unavailable ({e}); estimating {CHARS_PER_TOKEN} chars per token")
+                self._encoding = False
+        if self._encoding is False:
+            return list(range(0, len(text), CHARS_PER_TOKEN))
+        _, offsets = self._encoding.decode_with_offsets(self._encoding.encode(text, disallowed_special=()))
+        return offsets
+
+    def split_spans(self, text):
+        """
+        Split one page into chunks.
+
+        Returns:
+            List[tuple]: (start, end) character spans, whitespace-trimmed
+        """
+        n = len(text)
+        breaks = [[m.end() for m in pattern.finditer(text)] for pattern in SEPARATOR_PATTERNS]
+        token_starts = self._token_starts(text) if self.length_unit == "tokens" else None
+
+        def advance(position, amount):
+            """Character position `amount` units after `position`."""
+            if token_starts is None:
+                return min(position + amount, n)
+            token = bisect_left(token_starts, position) + amount
+            return token_starts[token] if token < len(token_starts) else n
+
+        def retreat(position, amount):
+            """Character position `amount` units before `position`."""
+            if token_starts is None:
+                return max(position - amount, 0)
+            token = bisect_left(token_starts, position) - amount
+            return token_starts[max(token, 0)]
+
+        spans = []
+        match = NON_SPACE.search(text)
+        start = match.start() if match else n
+        while start < n:
+            limit = advance(start, self.chunk_size)
+            if limit >= n:
+                end = n
+            else:
+                # Prefer the strongest separator that still keeps at least half a chunk
+                floor = advance(start, self.chunk_size // 2)
+                end = limit
+                for positions in breaks:
+                    i = bisect_right(positions, limit) - 1
+                    if i >= 0 and positions[i] > floor:
+                        end = positions[i]
+                        break
+
+            trimmed_end = end
+            while trimmed_end > start and text[trimmed_end - 1].isspace():
+                trimmed_end -= 1
+            if trimmed_end > start:
+                spans.append((start, trimmed_end))
+            if end >= n:
+                break
+
+            # Next chunk starts `chunk_overlap` before the end, snapped to a word start
+            next_start = retreat(end, self.chunk_overlap)
+            words = breaks[-1]
+            i = bisect_left(words, next_start)
+            if i < len(words) and words[i] < end:
+                next_start = words[i]
+            elif i > 0 and words[i - 1] > start:
+                # No word starts inside the overlap window; back up to the previous one
+                next_start = words[i - 1]
+            if next_start <= start:
+                next_start = end
+            match = NON_SPACE.search(text, next_start)
+            start = match.start() if match else n
+        return spans
+
+    def split_documents(self, documents):
+        """
+        Returns:
+            List[Document]: Chunks with the page metadata plus 'start_index'
+        """
+        chunks = []
+        for doc in documents:
+            text = doc.page_content
+            for start, end in self.split_spans(text):
+                metadata = dict(doc.metadata)
+                metadata["start_index"] = start
+                chunks.append(Document(page_content=text[start:end], metadata=metadata))
+        return chunks
@@ -0,0 +1,231 @@
+import re
+import logging
+import statistics
+
+logger = logging.getLogger(__name__)
+
+NUMBER_WORDS = ["one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten", "eleven",
+                "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen", "twenty"]
+
+# Regex fallback: (pattern, level). Matched against single stripped lines.
+HEADING_PATTERNS = [
+    (re.compile(r"^(chapter|part|book)\s+([0-9]+|[ivxlcdm]+|" + "|".join(NUMBER_WORDS) + r")\b[\s.:\-–—]*.{0,80}$",
+                re.IGNORECASE), 1),
+    (re.compile(r"^(section\s+)?\d+\.\d+(\.\d+)?\s+[A-Z][^\n]{2,80}$"), 2),
+]
+MAX_HEADING_CHARS = 100
+# Font fallback: a line is a heading if its size is this much larger than the body text
+FONT_HEADING_RATIO = 1.3
+FONT_CHAPTER_RATIO = 1.6
+
+class Section:
+    """
+    A node of the document's heading hierarchy.
+
+    Offsets refer to the concatenated page text (the ChunkStore buffer);
+    a section runs until the next section of the same or a higher level.
+    """
+    __slots__ = ("title", "level", "page", "offset", "end", "end_page", "parent")
+
+    def __init__(self, title, level, page, offset, end=None, end_page=None, parent=-1):
+        self.title = title
+        self.level = level
+        self.page = page
+        self.offset = offset
+        self.end = end
+        self.end_page = end_page
+        self.parent = parent
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def __repr__(self):
+        return f"Section({self.title!r}, level={self.level}, pages {self.page}-{self.end_page})"
+
+def page_offsets(pages):
+    """Page number -> offset of that page in the concatenated text."""
+    offsets = {}
+    position = 0
+    for d in pages:
+        offsets[d.metadata["page"]] = position
+        position += len(d.page_content)
+    return offsets, position
+
+def _outline_headings(pdf_reader):
+    """(title, level, page_index) from the PDF bookmarks."""
+    outline = getattr(pdf_reader, "outline", None)
+    if outline is None:
+        outline = getattr(pdf_reader, "outlines", None)
+    get_page = getattr(pdf_reader, "get_destination_page_number", None) or \
+        getattr(pdf_reader, "getDestinationPageNumber")
+
+    headings = []
+
+    def walk(items, level):
+        for item in items:
+            if isinstance(item, list):
+                walk(item, level + 1)
+                continue
+            try:
+                headings.append((str(item.title).strip(), level, get_page(item)))
+            except Exception:
+                continue
+
+    walk(outline or [], 1)
+    return [h for h in headings if h[0] and h[2] is not None]
+
+def _regex_headings(pages):
+    """(title, level, page number, offset within page) from heading-like lines."""
+    headings = []
+    for d in pages:
+        text = d.page_content
+        position = 0
+        for line in text.splitlines(keepends=True):
+            stripped = line.strip()
+            if stripped and len(stripped) <= MAX_HEADING_CHARS:
+                for pattern, level in HEADING_PATTERNS:
+                    if pattern.match(stripped):
+                        headings.append((stripped, level, d.metadata["page"], position + line.index(stripped[0])))
+                        break
+            position += len(line)
+    return headings
+
+def _font_headings(pdf_reader, pages):
+    """(title, level, page number, offset within page) from lines set in a larger font."""
+    text_by_page = {d.metadata["page"]: d.page_content for d in pages}
+    runs = []
+
+    for i, page in enumerate(pdf_reader.pages):
+        number = i + 1
+        if number not in text_by_page:
+            continue
+
+        def visitor(text, cm, tm, font_dict, font_size, number=number):
+            scale = abs(tm[3]) if tm and tm[3] else 1.0
+            if text and text.strip():
+                runs.append((number, text.strip(), font_size * scale))
+
+        try:
+            page.extract_text(visitor_text=visitor)
+        except Exception:
+            continue
+
+    if not runs:
+        return []
+    body_size = statistics.median(size for _, _, size in runs)
+    headings = []
+    for number, text, size in runs:
+        if size < body_size * FONT_HEADING_RATIO or len(text) > MAX_HEADING_CHARS:
+            continue
+        offset = text_by_page[number].find(text)
+        if offset >= 0:
+            level = 1 if size >= body_size * FONT_CHAPTER_RATIO else 2
+            headings.append((text, level, number, offset))
+    return headings
+
+def build_sections(headings, pages):
+    """
+    Turn (title, level, page number, offset within page) headings into a
+    flat, document-ordered section list with parent links and end offsets.
+    """
+    offsets, total = page_offsets(pages)
+    page_numbers = [d.metadata["page"] for d in pages]
+    positioned = sorted(
+        ((offsets[page] + offset, level, title, page) for title, level, page, offset in headings if page in offsets),
+        key=lambda h: (h[0], h[1]),
+    )
+
+    sections = []
+    stack = []
+    for position, level, title, page in positioned:
+        if sections and sections[-1].offset == position and sections[-1].level == level:
+            continue  # Duplicate heading at the same spot
+        while stack and sections[stack[-1]].level >= level:
+            stack.pop()
+        sections.append(Section(title, level, page, position, parent=stack[-1] if stack else -1))
+        stack.append(len(sections) - 1)
+
+    # A section ends where the next section of the same or higher level starts
+    for i, section in enumerate(sections):
+        section.end = total
+        for following in sections[i + 1:]:
+            if following.level <= section.level:
+                section.end = following.offset
+                break
+        last_pages = [p for p in page_numbers if offsets[p] < section.end]
+        section.end_page = last_pages[-1] if last_pages else section.page
+    return sections
+
+def detect_sections(pdf_reader, pages):
+    """
+    Detect the heading hierarchy of a PDF.
+    Tries the PDF outline (bookmarks) first, then heading-like lines, then font sizes.
+
+    Args:
+        pdf_reader (PyPDF2.PdfReader): Open reader
+        pages (List[Document]): Extracted pages (with 'page' metadata)
+
+    Returns:
+        List[Section]: Sections in document order (empty if nothing was found)
+    """
+    if not pages:
+        return []
+    page_numbers = [d.metadata["page"] for d in pages]
+
+    try:
+        outline = _outline_headings(pdf_reader)
+    except Exception as e:
+        logger.debug(f"Could not read PDF outline: {e}")
+        outline = []
+    if outline:
+        headings = []
+        for title, level, page_index in outline:
+            # Bookmarks can point at pages without text; use the next page that has some
+            later = [p for p in page_numbers if p >= page_index + 1]
+            if later:
+                headings.append((title, level, later[0], 0))
+        logger.info(f"Structure from PDF outline: {len(headings)} headings")
+        return build_sections(headings, pages)
+
+    headings = _regex_headings(pages)
+    if len(headings) < 2:
+        try:
+            headings = _font_headings(pdf_reader, pages) or headings
+        except Exception as e:
+            logger.debug(f"Font-based heading detection failed: {e}")
+    logger.info(f"Structure from text heuristics: {len(headings)} headings")
+    return build_sections(headings, pages)
+
+def chapter_of(sections, index):
+    """Index of the top-level ancestor of section `index`."""
+    while index >= 0 and sections[index].parent >= 0:
+        index = sections[index].parent
+    return index
+
+def page_segments(sections, page_start, page_end):
+    """
+    Split one page at section starts.
+
+    Returns:
+        List[tuple]: (start, end, section index) in page-relative offsets;
+        section index is the innermost section covering the segment or -1
+    """
+    starts = [(s.offset, i) for i, s in enumerate(sections) if page_start < s.offset < page_end]
+    # Innermost section already open at the page start
+    current = -1
+    for i, s in enumerate(sections):
+        if s.offset <= page_start:
+            current = i
+        else:
+            break
+    segments = []
+    position = page_start
+    for offset, i in starts:
+        segments.append((position - page_start, offset - page_start, current))
+        position, current = offset, i
+    segments.append((position - page_start, page_end - page_start, current))
+    return segments
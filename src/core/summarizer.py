@@ -0,0 +1,201 @@
+import re
+import logging
+import numpy as np
+from src.core.structure import chapter_of
+
+logger = logging.getLogger(__name__)
+
+# LexRank over chunk vectors: edges below this cosine similarity are dropped
+LEXRANK_THRESHOLD = 0.3
+LEXRANK_DAMPING = 0.85
+LEXRANK_ITERATIONS = 50
+# Largest group ranked with one dense similarity matrix (n x n float32)
+MAX_DENSE_CHUNKS = 3000
+# Top-ranked chunks per group whose sentences become candidates
+CANDIDATE_CHUNKS = 3
+# MMR trade-off between relevance (1.0) and novelty (0.0)
+MMR_LAMBDA = 0.7
+MIN_SENTENCE_CHARS = 40
+MAX_SENTENCE_CHARS = 400
+
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(])")
+
+def split_sentences(text):
+    """Sentences of a chunk that are long enough to stand on their own."""
+    sentences = []
+    for sentence in SENTENCE_RE.split(text):
+        sentence = " ".join(sentence.split())
+        if MIN_SENTENCE_CHARS <= len(sentence) <= MAX_SENTENCE_CHARS:
+            sentences.append(sentence)
+    return sentences
+
+def lexrank(vectors, threshold=LEXRANK_THRESHOLD, damping=LEXRANK_DAMPING, iterations=LEXRANK_ITERATIONS):
+    """
+    LexRank centrality of unit vectors.
+
+    Args:
+        vectors (np.ndarray): (n, d) L2-normalised rows
+
+    Returns:
+        np.ndarray: (n,) scores summing to 1
+    """
+    n = len(vectors)
+    if n == 0:
+        return np.empty(0, dtype=np.float32)
+    similarity = vectors @ vectors.T
+    adjacency = (similarity >= threshold).astype(np.float32)
+    # Row-normalise into a transition matrix; every row keeps its self-loop
+    adjacency /= adjacency.sum(axis=1, keepdims=True)
+    scores = np.full(n, 1.0 / n, dtype=np.float32)
+    for _ in range(iterations):
+        updated = (1 - damping) / n + damping * (adjacency.T @ scores)
+        if np.abs(updated - scores).sum() < 1e-6:
+            scores = updated
+            break
+        scores = updated
+    return scores / scores.sum()
+
+def mmr(vectors, relevance, count, diversity=MMR_LAMBDA):
+    """
+    Maximal Marginal Relevance selection.
+
+    Args:
+        vectors (np.ndarray): (n, d) L2-normalised candidate vectors
+        relevance (np.ndarray): (n,) relevance of each candidate
+        count (int): Number of candidates to pick
+
+    Returns:
+        List[int]: Picked candidate indices, in pick order
+    """
+    n = len(vectors)
+    if n == 0:
+        return []
+    similarity = vectors @ vectors.T
+    picked = [int(np.argmax(relevance))]
+    # Highest similarity of each candidate to anything picked so far
+    redundancy = similarity[picked[0]].copy()
+    while len(picked) < min(count, n):
+        scores = diversity * relevance - (1 - diversity) * redundancy
+        scores[picked] = -np.inf
+        best = int(np.argmax(scores))
+        picked.append(best)
+        np.maximum(redundancy, similarity[best], out=redundancy)
+    return picked
+
+class ExtractiveSummarizer:
+    """
+    Offline summaries built from the book's own sentences.
+
+    Chunks are ranked with LexRank over the vectors already stored in the
+    FAISS index, the sentences of the most central chunks are embedded and
+    picked with MMR so the summary does not repeat itself. Large books are
+    ranked per chapter (or per window of chunks) so every part is covered.
+    """
+
+    def __init__(self, chunks, semantic_engine):
+        """
+        Args:
+            chunks (ChunkStore): Shared chunk store
+            semantic_engine (SemanticSearchEngine): Engine whose index holds the chunk vectors
+        """
+        self.chunks = chunks
+        self.semantic_engine = semantic_engine
+
+    @property
+    def available(self):
+        return self.semantic_engine is not None and self.semantic_engine.index is not None
+
+    def _groups(self, start, stop):
+        """Chunk ranges ranked independently: chapters, else fixed windows."""
+        if (start, stop) == (0, len(self.chunks)):
+            chapters = [self.chunks.section_range(c) for c in self.chunks.chapters()]
+            chapters = [r for r in chapters if r[1] > r[0]]
+            if len(chapters) >= 2 and all(b - a <= MAX_DENSE_CHUNKS for a, b in chapters):
+                return chapters
+        return [(a, min(a + MAX_DENSE_CHUNKS, stop)) for a in range(start, stop, MAX_DENSE_CHUNKS)]
+
+    def _candidates(self, start, stop, budget):
+        """(sentence, chunk id, weight) from the most central chunks of a range."""
+        vectors = self.semantic_engine.vectors(start, stop)
+        scores = lexrank(vectors)
+        top = np.argsort(-scores)[:max(CANDIDATE_CHUNKS, 2 * budget)]
+        candidates = []
+        for i in sorted(top):
+            chunk_id = start + int(i)
+            for sentence in split_sentences(self.chunks.get_text(chunk_id)):
+                candidates.append((sentence, chunk_id, float(scores[i]) * len(scores)))
+        return candidates
+
+    def summarize(self, sentence_count=8, chunk_range=None):
+        """
+        Extract the most representative sentences.
+
+        Args:
+            sentence_count (int): Sentences in the summary
+            chunk_range (tuple): Optional (start, stop) chunk ids, e.g. ChunkStore.section_range()
+
+        Returns:
+            List[tuple]: (sentence, chunk id) in document order; empty if the index is not ready
+        """
+        if not self.available or not len(self.chunks):
+            return []
+        start, stop = chunk_range or (0, len(self.chunks))
+        if stop <= start:
+            return []
+
+        groups = self._groups(start, stop)
+        total = stop - start
+        candidates, budgets, bounds = [], [], []
+        for a, b in groups:
+            # Sentence budget proportional to group size, at least one each
+            budget = max(1, round(sentence_count * (b - a) / total))
+            first = len(candidates)
+            candidates.extend(self._candidates(a, b, budget))
+            if len(candidates) > first:
+                budgets.append(budget)
+                bounds.append((first, len(candidates)))
+        if not candidates:
+            return []
+
+        # One embedding batch for every candidate, then MMR within each group
+        vectors = self.semantic_engine.embed_texts(s for s, _, _ in candidates)
+        weights = np.array([w for _, _, w in candidates], dtype=np.float32)
+        picked = []
+        for (first, last), budget in zip(bounds, budgets):
+            group = vectors[first:last]
+            # Relevance: closeness to the group centroid, boosted by the chunk's centrality
+            centroid = group.mean(axis=0)
+            centroid /= np.linalg.norm(centroid) or 1.0
+            relevance = (group @ centroid) * np.sqrt(weights[first:last])
+            picked.extend(first + i for i in mmr(group, relevance, budget))
+        picked.sort(key=lambda i: (candidates[i][1], i))
+        return [(candidates[i][0], candidates[i][1]) for i in picked]
+
+    def summary_text(self, sentence_count=5, chunk_range=None):
+        """Plain-text summary (sentences joined), or "" if nothing could be extracted."""
+        return " ".join(s for s, _ in self.summarize(sentence_count, chunk_range))
+
+    def book_summary(self, sentence_count=12, key_terms=None):
+        """
+        Markdown summary of the whole book with page references; one block per
+        chapter when the structure is known.
+        """
+        sentences = self.summarize(sentence_count)
+        if not sentences:
+            return ""
+        lines = ["## 📘 Book Overview (Extractive)",
+                 "*Generated offline from the book's own sentences; add an API key for an abstractive summary.*", ""]
+        if key_terms:
+            lines += ["## 🔑 Key Themes"] + [f"- {term}" for term in key_terms] + [""]
+
+        lines.append("## 📖 Key Passages")
+        current = None
+        for sentence, chunk_id in sentences:
+            section = int(self.chunks.section_ids[chunk_id])
+            if self.chunks.sections and section >= 0:
+                chapter = self.chunks.sections[chapter_of(self.chunks.sections, section)].title
+                if chapter != current:
+                    lines += ["", f"### {chapter}"]
+                    current = chapter
+            lines.append(f"- {sentence} *(p. {int(self.chunks.pages[chunk_id])})*")
+        return "\n".join(lines)
@@ -0,0 +1,215 @@
+import math
+import logging
+from collections import Counter
+import numpy as np
+import faiss
+from src.core.sections import WORD_RE, STOPWORDS
+from src.core.summarizer import split_sentences
+
+logger = logging.getLogger(__name__)
+
+KMEANS_ITERATIONS = 20
+KMEANS_SEED = 1234
+# Fewer clusters for short books so each topic has enough chunks to describe it
+MIN_CHUNKS_PER_CLUSTER = 8
+DEFAULT_TOPIC_COUNT = 8
+# Central chunks per cluster whose sentences are candidates for the answer
+CENTRAL_CHUNKS = 2
+KEY_PHRASE_COUNT = 5
+
+QUESTION_TEMPLATES = [
+    "What is {phrase}, and why does it matter?",
+    "How does the book explain {phrase}?",
+    "What role does {phrase} play in {where}?",
+    "How is {phrase} related to {other}?",
+    "What are the key points about {phrase}?",
+]
+
+class Topic:
+    """One cluster of chunks: its central passages, key phrases and best sentence."""
+    __slots__ = ("centroid", "chunk_ids", "central_ids", "key_phrases", "sentence", "sentence_chunk")
+
+    def __init__(self, centroid, chunk_ids, central_ids):
+        """
+        Args:
+            centroid (np.ndarray): Unit-length mean direction of the cluster's chunk vectors
+            chunk_ids (np.ndarray): Chunks in the cluster, in document order
+            central_ids (np.ndarray): Chunks closest to the centroid, closest first
+        """
+        self.centroid = centroid
+        self.chunk_ids = chunk_ids
+        self.central_ids = central_ids
+        self.key_phrases = []
+        self.sentence = ""
+        self.sentence_chunk = int(central_ids[0]) if len(central_ids) else -1
+
+def _phrases(text):
+    """Unigrams and bigrams of non-stopword words."""
+    words = [w.lower() for w in WORD_RE.findall(text)]
+    grams = [w for w in words if w not in STOPWORDS]
+    grams += [f"{a} {b}" for a, b in zip(words, words[1:]) if a not in STOPWORDS and b not in STOPWORDS]
+    return grams
+
+class TopicModel:
+    """
+    Topics of a book from k-means over the chunk vectors in the FAISS index.
+
+    Each topic gets key phrases (frequent in the cluster, rare elsewhere) and a
+    representative sentence from the chunks nearest its centroid. Questions and
+    FAQ answers are built from these without an LLM call, each linked to the
+    chunk and page it came from; the central passages also serve as a compact,
+    topic-balanced context for LLM prompts.
+    """
+
+    def __init__(self, chunks, semantic_engine):
+        """
+        Args:
+            chunks (ChunkStore): Shared chunk store
+            semantic_engine (SemanticSearchEngine): Engine whose index holds the chunk vectors
+        """
+        self.chunks = chunks
+        self.semantic_engine = semantic_engine
+        self._topics = None
+
+    @property
+    def available(self):
+        return self.semantic_engine is not None and self.semantic_engine.index is not None
+
+    def topics(self, count=DEFAULT_TOPIC_COUNT):
+        """
+        Cluster the book (computed once, then reused).
+
+        Returns:
+            List[Topic]: Topics in order of their first chunk; empty if the index is not ready
+        """
+        if self._topics is not None:
+            return self._topics
+        if not self.available or not len(self.chunks):
+            return []
+        try:
+            self._topics = self._build(count)
+        except Exception as e:
+            logger.error(f"Topic clustering failed: {e}")
+            self._topics = []
+        return self._topics
+
+    def _build(self, count):
+        vectors = self.semantic_engine.vectors()
+        n, d = vectors.shape
+        k = max(1, min(count, n // MIN_CHUNKS_PER_CLUSTER))
+        if k > 1:
+            kmeans = faiss.Kmeans(d, k, niter=KMEANS_ITERATIONS, seed=KMEANS_SEED, spherical=True, verbose=False)
+            kmeans.train(vectors)
+            centroids = kmeans.centroids
+            _, assignment = kmeans.index.search(vectors, 1)
+            assignment = assignment[:, 0]
+        else:
+            centroids = vectors.mean(axis=0, keepdims=True)
+            assignment = np.zeros(n, dtype=np.int64)
+        faiss.normalize_L2(centroids)
+
+        topics = []
+        phrase_counts = []
+        for c in range(k):
+            ids = np.flatnonzero(assignment == c)
+            if not len(ids):
+                continue
+            closeness = vectors[ids] @ centroids[c]
+            central = ids[np.argsort(-closeness)[:CENTRAL_CHUNKS]]
+            topics.append(Topic(centroids[c], ids, central))
+            phrase_counts.append(Counter(p for text in self.chunks.texts(ids) for p in _phrases(text)))
+
+        # Key phrases: frequent in this topic, rare in the others (tf-idf over topics)
+        spread = Counter(p for counts in phrase_counts for p in counts)
+        for topic, counts in zip(topics, phrase_counts):
+            scored = sorted(counts.items(), key=lambda item: -item[1] * math.log(1 + len(topics) / spread[item[0]]))
+            phrases = []
+            for phrase, _ in scored:
+                # Skip single words already covered by a chosen bigram and vice versa
+                if any(phrase in p or p in phrase for p in phrases):
+                    continue
+                phrases.append(phrase)
+                if len(phrases) == KEY_PHRASE_COUNT:
+                    break
+            topic.key_phrases = phrases
+
+        self._pick_sentences(topics)
+        topics.sort(key=lambda t: int(t.chunk_ids[0]))
+        logger.info(f"Clustered {n} chunks into {len(topics)} topics")
+        return topics
+
+    def _pick_sentences(self, topics):
+        """Sentence of the central chunks closest to each topic centroid (one embedding batch)."""
+        candidates = []
+        for t, topic in enumerate(topics):
+            for chunk_id in topic.central_ids:
+                for sentence in split_sentences(self.chunks.get_text(int(chunk_id))):
+                    candidates.append((t, sentence, int(chunk_id)))
+        if not candidates:
+            return
+        vectors = self.semantic_engine.embed_texts(s for _, s, _ in candidates)
+        best = {}
+        for row, (t, sentence, chunk_id) in enumerate(candidates):
+            score = float(vectors[row] @ topics[t].centroid)
+            if t not in best or score > best[t][0]:
+                best[t] = (score, sentence, chunk_id)
+        for t, (_, sentence, chunk_id) in best.items():
+            topics[t].sentence = sentence
+            topics[t].sentence_chunk = chunk_id
+
+    def _where(self, chunk_id):
+        metadata = self.chunks.metadata(chunk_id)
+        return metadata.get("chapter") or metadata.get("section") or f"page {metadata['page']}"
+
+    def _topic_questions(self, count):
+        """(question, topic) for the largest topics."""
+        topics = sorted(self.topics(), key=lambda t: -len(t.chunk_ids))
+        questions = []
+        for i, topic in enumerate(topics[:count]):
+            if not topic.key_phrases:
+                continue
+            phrase = topic.key_phrases[0]
+            other = topic.key_phrases[1] if len(topic.key_phrases) > 1 else "the book's main argument"
+            template = QUESTION_TEMPLATES[i % len(QUESTION_TEMPLATES)]
+            question = template.format(phrase=phrase, other=other, where=self._where(topic.sentence_chunk))
+            questions.append((question[0].upper() + question[1:], topic))
+        return questions
+
+    def questions(self, count=5):
+        """
+        Key questions, one per topic (largest topics first).
+
+        Returns:
+            List[tuple]: (question, chunk id the question is grounded in)
+        """
+        return [(question, topic.sentence_chunk) for question, topic in self._topic_questions(count)]
+
+    def faqs(self, count=5):
+        """
+        FAQ candidates answered with each topic's representative sentence.
+
+        Returns:
+            List[tuple]: (question, answer with page citation)
+        """
+        faqs = []
+        for question, topic in self._topic_questions(count):
+            if topic.sentence:
+                page = int(self.chunks.pages[topic.sentence_chunk])
+                faqs.append((question, f"{topic.sentence} (p. {page})"))
+        return faqs
+
+    def context(self, budget=4000):
+        """
+        Topic-balanced context for LLM prompts: the most central passage of
+        every topic, trimmed so the whole context fits in `budget` characters.
+        """
+        topics = self.topics()
+        if not topics:
+            return ""
+        share = max(200, budget // len(topics))
+        parts = []
+        for topic in topics:
+            chunk_id = int(topic.central_ids[0])
+            text = self.chunks.get_text(chunk_id)[:share]
+            parts.append(f"[Page {int(self.chunks.pages[chunk_id])}; {', '.join(topic.key_phrases[:3])}]: {text}")
+        return "\n\n".join(parts)[:budget]
@@ -0,0 +1,297 @@
+"""
+Lightweight timing spans for the ingestion and query pipeline.
+
+Wrap a block in `span()` (or a function in `@traced`) and its wall time and
+resident memory before/after are recorded. Spans nest per thread/context, are
+kept in a bounded in-memory buffer and aggregated per name, and can be
+exported as a Chrome trace JSON file (chrome://tracing, Perfetto) or served
+as Prometheus text.
+
+Everything except the timers themselves is opt-in through the environment:
+
+    BOOK_ANALYZER_TRACE=trace.json        write the trace file at exit
+    BOOK_ANALYZER_METRICS_PORT=9108       serve /metrics on this port
+    BOOK_ANALYZER_PROFILE=cprofile        profile spans marked profile=True
+                                          (or "pyinstrument" if installed)
+"""
+import os
+import time
+import json
+import atexit
+import cProfile
+import logging
+import threading
+import functools
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+TRACE_ENV = "BOOK_ANALYZER_TRACE"
+METRICS_PORT_ENV = "BOOK_ANALYZER_METRICS_PORT"
+PROFILE_ENV = "BOOK_ANALYZER_PROFILE"
+PROFILE_DIR = "./.cache/profiles"
+# Finished spans kept for the trace file; aggregates are kept for every span
+MAX_SPANS = 10000
+
+_origin = time.perf_counter()
+_spans = deque(maxlen=MAX_SPANS)
+_stats = {}
+_lock = threading.Lock()
+_current = contextvars.ContextVar("trace_span", default=None)
+_metrics_server = None
+_collectors = []
+# One profiler at a time: nested/concurrent cProfile sessions are not allowed
+_profile_lock = threading.Lock()
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = 4096
+
+def rss_bytes():
+    """Current resident set size (peak RSS where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux reports KiB, macOS bytes
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    except Exception:
+        return 0
+
+def shared_rss_bytes():
+    """
+    Resident memory backed by files (e.g. memory-mapped index vectors), which
+    processes mapping the same file share; 0 where /proc is not available.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[2]) * _PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return 0
+
+class Span:
+    """One finished (or running) timed block."""
+    __slots__ = ("name", "start", "duration", "rss_start", "rss_end", "thread", "parent", "attrs")
+
+    def __init__(self, name, parent=None, attrs=None):
+        self.name = name
+        self.parent = parent
+        self.attrs = dict(attrs or {})
+        self.thread = threading.get_ident()
+        self.rss_start = rss_bytes()
+        self.rss_end = None
+        self.duration = None
+        self.start = time.perf_counter()
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.start
+        self.rss_end = rss_bytes()
+
+    def to_trace_event(self, pid):
+        args = dict(self.attrs)
+        args["rss_start_mb"] = round(self.rss_start / 1048576, 1)
+        args["rss_end_mb"] = round(self.rss_end / 1048576, 1)
+        if self.parent:
+            args["parent"] = self.parent
+        return {"name": self.name, "ph": "X", "pid": pid, "tid": self.thread,
+                "ts": round((self.start - _origin) * 1e6), "dur": round(self.duration * 1e6), "args": args}
+
+def _record(span):
+    with _lock:
+        _spans.append(span)
+        stats = _stats.setdefault(span.name, {"count": 0, "seconds": 0.0, "max_seconds": 0.0, "max_rss": 0})
+        stats["count"] += 1
+        stats["seconds"] += span.duration
+        stats["max_seconds"] = max(stats["max_seconds"], span.duration)
+        stats["max_rss"] = max(stats["max_rss"], span.rss_end)
+
+@contextmanager
+def _profiler(name):
+    """Run the block under cProfile/pyinstrument if BOOK_ANALYZER_PROFILE asks for it."""
+    mode = os.environ.get(PROFILE_ENV, "").lower()
+    if mode not in ("cprofile", "pyinstrument") or not _profile_lock.acquire(blocking=False):
+        yield
+        return
+    try:
+        yield from _run_profiler(name, mode)
+    finally:
+        _profile_lock.release()
+
+def _run_profiler(name, mode):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}")
+    if mode == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            logger.warning("pyinstrument is not installed; falling back to cProfile")
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(path + ".html", "w", encoding="utf-8") as f:
+                    f.write(profiler.output_html())
+            return
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path + ".prof")
+
+@contextmanager
+def span(name, profile=False, **attrs):
+    """
+    Time a block of work.
+
+    Args:
+        name (str): Span name, e.g. "build_index"
+        profile (bool): Also profile the block when BOOK_ANALYZER_PROFILE is set
+        **attrs: Extra fields for the trace file; the yielded dict can add more
+
+    Yields:
+        dict: The span's attributes
+    """
+    parent = _current.get()
+    current = Span(name, parent=parent.name if parent else None, attrs=attrs)
+    token = _current.set(current)
+    try:
+        if profile:
+            with _profiler(name):
+                yield current.attrs
+        else:
+            yield current.attrs
+    finally:
+        _current.reset(token)
+        current.finish()
+        _record(current)
+
+def traced(name=None, profile=False, **attrs):
+    """Decorator form of span(); the name defaults to the function's qualified name."""
+    def decorate(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, profile=profile, **attrs):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def summary():
+    """
+    Returns:
+        dict: span name -> {"count", "seconds", "max_seconds", "max_rss"}
+    """
+    with _lock:
+        return {name: dict(stats) for name, stats in _stats.items()}
+
+def reset():
+    """Forget recorded spans and aggregates (e.g. between documents in a batch worker)."""
+    with _lock:
+        _spans.clear()
+        _stats.clear()
+
+def export_json(path):
+    """Write the recorded spans as a Chrome trace file."""
+    pid = os.getpid()
+    with _lock:
+        trace_events = [s.to_trace_event(pid) for s in _spans]
+        stats = {name: dict(values) for name, values in _stats.items()}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": trace_events, "displayTimeUnit": "ms", "summary": stats}, f)
+    return path
+
+def register_collector(collector):
+    """Add a callable returning extra Prometheus text lines for /metrics (e.g. LLM telemetry)."""
+    with _lock:
+        if collector not in _collectors:
+            _collectors.append(collector)
+
+def prometheus_text():
+    """Aggregated span timings, current RSS and registered collectors in the Prometheus text format."""
+    lines = [
+        "# HELP book_analyzer_span_seconds Time spent in traced pipeline stages.",
+        "# TYPE book_analyzer_span_seconds summary",
+    ]
+    stats = summary()
+    for name, values in sorted(stats.items()):
+        lines.append(f'book_analyzer_span_seconds_count{{span="{name}"}} {values["count"]}')
+        lines.append(f'book_analyzer_span_seconds_sum{{span="{name}"}} {values["seconds"]:.6f}')
+    lines += ["# HELP book_analyzer_span_max_seconds Slowest run of each stage.",
+              "# TYPE book_analyzer_span_max_seconds gauge"]
+    lines += [f'book_analyzer_span_max_seconds{{span="{name}"}} {values["max_seconds"]:.6f}'
+              for name, values in sorted(stats.items())]
+    lines += ["# HELP book_analyzer_span_max_rss_bytes Highest RSS seen at the end of each stage.",
+              "# TYPE book_analyzer_span_max_rss_bytes gauge"]
+    lines += [f'book_analyzer_span_max_rss_bytes{{span="{name}"}} {values["max_rss"]}'
+              for name, values in sorted(stats.items())]
+    lines += ["# HELP book_analyzer_rss_bytes Resident memory of the process.",
+              "# TYPE book_analyzer_rss_bytes gauge",
+              f"book_analyzer_rss_bytes {rss_bytes()}",
+              "# HELP book_analyzer_rss_shared_bytes Resident memory shared with other processes through files.",
+              "# TYPE book_analyzer_rss_shared_bytes gauge",
+              f"book_analyzer_rss_shared_bytes {shared_rss_bytes()}"]
+    with _lock:
+        collectors = list(_collectors)
+    for collector in collectors:
+        try:
+            lines += collector()
+        except Exception as e:
+            logger.warning(f"Metrics collector failed: {e}")
+    return "\n".join(lines) + "\n"
+
+def start_metrics_server(port):
+    """Serve prometheus_text() on http://0.0.0.0:<port>/metrics from a daemon thread (once per process)."""
+    global _metrics_server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = prometheus_text().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _lock:
+        if _metrics_server is not None:
+            return _metrics_server
+        try:
+            _metrics_server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+        except OSError as e:
+            logger.warning(f"Could not start metrics endpoint on port {port}: {e}")
+            return None
+    threading.Thread(target=_metrics_server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"Serving pipeline metrics on :{port}/metrics")
+    return _metrics_server
+
+def configure_from_env():
+    """Start the metrics endpoint and/or register the trace file export as the environment asks."""
+    port = os.environ.get(METRICS_PORT_ENV)
+    if port:
+        try:
+            start_metrics_server(int(port))
+        except ValueError:
+            logger.warning(f"Ignoring invalid {METRICS_PORT_ENV}={port!r}")
+    path = os.environ.get(TRACE_ENV)
+    if path:
+        atexit.register(export_json, path)
@@ -0,0 +1,162 @@
+"""
+Memory-mapped vector storage for saved search indices.
+
+Chunk vectors are written as a float32 .npy matrix and opened read-only with
+np.load(mmap_mode="r"). Pages come from the OS page cache, which every
+process mapping the same file shares, so several Streamlit, API or worker
+processes serving a library keep one copy of each book's vectors in memory
+instead of one per process (and per session).
+
+MappedFlatIndex covers the part of the FAISS index interface the search
+engine uses (d, ntotal, search, reconstruct_n) with an inner-product scan in
+blocks; a book's vectors are small enough that an approximate on-disk index
+would not pay for its training step.
+
+With VECTOR_DTYPE "float16" or "int8", a quantised copy of the vectors is
+written next to the float32 file and the scan reads that instead (2x / 4x
+fewer bytes to keep in memory). The best RESCORE_FACTOR * k candidates are
+then re-scored exactly from the float32 rows, so only those rows of the full
+file are ever paged in. int8 codes use one symmetric scale per dimension
+(like FAISS's 8-bit scalar quantiser) and convert to float32 cheaply; float16
+conversion is slow in NumPy, so it saves memory at a CPU cost.
+"""
+import os
+import logging
+import numpy as np
+from src.config import VECTOR_DTYPE
+
+logger = logging.getLogger(__name__)
+
+VECTORS_FILE = "vectors.npy"
+QUANTIZED_DTYPES = ("float16", "int8")
+# Rows scored at a time (bounds the temporary memory per query batch)
+SCAN_BLOCK = 16384
+# Candidates per requested result that quantised scans re-score at full precision
+RESCORE_FACTOR = 4
+
+def codes_path(path, dtype):
+    """File holding the quantised copy of the vectors at `path`."""
+    return f"{os.path.splitext(path)[0]}.{dtype}.npy"
+
+def scale_path(path):
+    return f"{os.path.splitext(path)[0]}.int8-scale.npy"
+
+def quantize_int8(vectors):
+    """
+    Symmetric per-dimension int8 quantisation.
+
+    Returns:
+        tuple: (int8 codes, float32 scale per dimension); vectors ~= codes * scale
+    """
+    scale = np.abs(vectors).max(axis=0) / 127.0
+    scale[scale == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scale), -127, 127).astype(np.int8)
+    return codes, scale.astype(np.float32)
+
+def write_vectors(path, vectors, dtype=VECTOR_DTYPE):
+    """
+    Write unit vectors as a float32 matrix that MappedFlatIndex can map, plus
+    the quantised copy for dtype "float16" or "int8".
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    np.save(path, vectors)
+    if dtype == "float16":
+        np.save(codes_path(path, dtype), vectors.astype(np.float16))
+    elif dtype == "int8":
+        codes, scale = quantize_int8(vectors)
+        np.save(codes_path(path, dtype), codes)
+        np.save(scale_path(path), scale)
+    elif dtype != "float32":
+        raise ValueError(f"Unknown vector dtype: {dtype}")
+
+class MappedFlatIndex:
+    """Inner-product search over read-only memory-mapped vector files."""
+
+    def __init__(self, path, dtype=VECTOR_DTYPE):
+        """
+        Args:
+            path (str): .npy file written by write_vectors()
+            dtype (str): Scan the "float16"/"int8" copy if it was written
+                (and re-score at full precision), or "float32" to scan the full vectors
+        """
+        self.path = path
+        self._vectors = np.load(path, mmap_mode="r")
+        self.ntotal, self.d = self._vectors.shape
+        self._codes = self._scale = None
+        self.dtype = "float32"
+        if dtype in QUANTIZED_DTYPES and os.path.exists(codes_path(path, dtype)):
+            self._codes = np.load(codes_path(path, dtype), mmap_mode="r")
+            self._scale = np.load(scale_path(path)) if dtype == "int8" else None
+            self.dtype = dtype
+
+    def __getstate__(self):
+        # Other processes map the same files instead of receiving a copy
+        return {"path": self.path, "dtype": self.dtype}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"], state.get("dtype", "float32"))
+
+    @property
+    def file_bytes(self):
+        return self._vectors.nbytes
+
+    @property
+    def scan_bytes(self):
+        """Bytes a full scan reads (what has to stay in the page cache for fast queries)."""
+        return (self._codes if self._codes is not None else self._vectors).nbytes
+
+    def reconstruct_n(self, start, n):
+        """Vectors of ids [start, start + n) as a float32 matrix."""
+        return np.asarray(self._vectors[start:start + n], dtype=np.float32)
+
+    def _scan(self, queries, matrix, k, start, stop):
+        """Top-k (scores, ids) of queries against matrix rows [start, stop), best first."""
+        best_scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        best_ids = np.full((len(queries), k), -1, dtype=np.int64)
+        convert = matrix.dtype != np.float32
+        buffer = np.empty((min(SCAN_BLOCK, stop - start), self.d), dtype=np.float32) if convert else None
+        for block_start in range(start, stop, SCAN_BLOCK):
+            block_stop = min(block_start + SCAN_BLOCK, stop)
+            block = matrix[block_start:block_stop]
+            if convert:
+                block = buffer[:block_stop - block_start]
+                np.copyto(block, matrix[block_start:block_stop])
+            scores = queries @ block.T
+            ids = np.broadcast_to(np.arange(block_start, block_stop, dtype=np.int64), scores.shape)
+            scores = np.concatenate([best_scores, scores], axis=1)
+            ids = np.concatenate([best_ids, ids], axis=1)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            best_scores = np.take_along_axis(scores, top, axis=1)
+            best_ids = np.take_along_axis(ids, top, axis=1)
+        order = np.argsort(-best_scores, axis=1, kind="stable")
+        return np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_ids, order, axis=1)
+
+    def search(self, queries, k, chunk_range=None, rescore=True):
+        """
+        Args:
+            queries (np.ndarray): (nq, d) float32 query vectors
+            k (int): Results per query
+            chunk_range (tuple): Optional (start, stop) ids to restrict the search to
+            rescore (bool): Re-score quantised candidates with the float32 vectors
+
+        Returns:
+            tuple: (scores, ids) matrices of shape (nq, k), best first, like faiss.Index.search
+        """
+        queries = np.ascontiguousarray(queries, dtype=np.float32)
+        start, stop = chunk_range if chunk_range is not None else (0, self.ntotal)
+        start, stop = max(start, 0), min(stop, self.ntotal)
+        k = max(0, min(k, stop - start))
+        if k == 0 or self._codes is None:
+            return self._scan(queries, self._vectors, k, start, stop)
+
+        # int8: fold the per-dimension scale into the queries instead of dequantising the codes
+        scaled = queries * self._scale if self._scale is not None else queries
+        if not rescore:
+            return self._scan(scaled, self._codes, k, start, stop)
+        _, candidates = self._scan(scaled, self._codes, min(k * RESCORE_FACTOR, stop - start), start, stop)
+        # Sorted row order keeps the reads from the float32 file sequential
+        rows = np.unique(candidates)
+        exact = queries @ np.asarray(self._vectors[rows], dtype=np.float32).T
+        scores = np.take_along_axis(exact, np.searchsorted(rows, candidates), axis=1)
+        top = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+        return np.take_along_axis(scores, top, axis=1), np.take_along_axis(candidates, top, axis=1)
@@ -3,10 +3,16 @@ import time
 from datetime import datetime
 from src.config import *
 from src.ui.styles import get_custom_css
-from src.core.processor import extract_text_from_pdf, chunk_documents
+from src.ui.progress import streamlit_progress
+from src.core.processor import load_document
 from src.core.analyzer import AnalysisEngine
+from src.core.nlp import SemanticSearchEngine
+from src.core.cache import DocumentCache, sha256_bytes
+from src.core.jobs import JobQueue, QUEUED, DONE, FAILED
 from src.core.analytics import AnalyticsEngine
-from src.utils.exporters import create_txt_report, create_json_report, create_html_report
+from src.utils.exporters import REPORT_FORMATS, build_report, report_content_hash
+from src.core import llm_metrics, tracing
+from src.core.ratelimit import limiter
 
 def render_sidebar():
     with st.sidebar:
@@ -25,8 +31,14 @@ def render_sidebar():
         st.markdown("---")
         
         # Settings
-        chunk_size = st.slider("Chunk Size (Tokens)", 500, 3000, 1000, 
-                             help="Smaller chunks = more details. Larger chunks = better context.")
+        length_unit = st.radio("Chunk Length Unit", options=["chars", "tokens"], horizontal=True,
+                               format_func={"chars": "Characters", "tokens": "Tokens"}.get)
+        if length_unit == "tokens":
+            chunk_size = st.slider("Chunk Size (Tokens)", 100, 800, DEFAULT_CHUNK_TOKENS,
+                                 help="Smaller chunks = more details. Larger chunks = better context.")
+        else:
+            chunk_size = st.slider("Chunk Size (Characters)", 500, 3000, DEFAULT_CHUNK_SIZE,
+                                 help="Smaller chunks = more details. Larger chunks = better context.")
         
         sensitivity = st.select_slider("Analysis Depth", options=["Brief", "Standard", "Deep"], value="Standard")
         
@@ -90,9 +102,39 @@ def render_sidebar():
             else:
                 st.write("No active profile.")
                 
+        if is_admin(user):
+            render_llm_usage()
+
         st.markdown("</div>", unsafe_allow_html=True)
         
-        return chunk_size, sensitivity, api_key, user_goal
+        return (chunk_size, length_unit), sensitivity, api_key, user_goal
+
+def is_admin(user):
+    return user.get('role') == 'Admin' or user.get('email', '').lower() in ADMIN_EMAILS
+
+def render_llm_usage():
+    """Admin view of LLM calls in this server process: latency, tokens, errors and cost per feature."""
+    with st.expander("🛠️ LLM Usage (Admin)"):
+        usage = llm_metrics.summary()
+        if not usage:
+            st.caption("No LLM calls yet.")
+            return
+        rows = [{
+            "Feature": feature, "Calls": s["calls"], "Error rate": f"{s['error_rate']:.0%}",
+            "p50 (s)": s["p50_seconds"], "p95 (s)": s["p95_seconds"],
+            "Prompt tok": s["prompt_tokens"], "Output tok": s["response_tokens"], "Cost ($)": round(s["cost_usd"], 4),
+        } for feature, s in sorted(usage.items())]
+        st.dataframe(rows, hide_index=True, use_container_width=True)
+        st.caption(f"Total estimated cost: ${sum(s['cost_usd'] for s in usage.values()):.4f}")
+        queue = limiter.status()
+        st.caption(f"Rate limit queue: {queue['queue_depth']} waiting ({queue['waiting_users']} users), "
+                   f"mean wait {queue['mean_wait_seconds']:.1f}s, p95 {queue['p95_wait_seconds']:.1f}s, "
+                   f"{queue['timeouts']} timed out")
+        rss, shared = tracing.rss_bytes(), tracing.shared_rss_bytes()
+        st.caption(f"Server process memory: {rss / 2**20:.0f} MB resident, {shared / 2**20:.0f} MB of it "
+                   f"shared file pages (memory-mapped indices), {(rss - shared) / 2**20:.0f} MB private")
+        st.download_button("⬇️ Download calls (CSV)", data=llm_metrics.to_csv(), file_name="llm_calls.csv",
+                           mime="text/csv")
 
 def render_hero_section():
     st.markdown(get_custom_css(), unsafe_allow_html=True)
@@ -103,6 +145,8 @@ def render_analysis_tab(analyzer, chunks, user_goal="General Reading"):
     st.subheader("📊 Analysis Dashboard")
     
     col1, col2, col3 = st.columns(3)
+    local = st.checkbox("⚡ Fast local questions & FAQs (no LLM call)", value=False,
+                        help="Built from topic clusters of the book's own passages, with page references.")
     
     with col1:
         if st.button("📝 Generate Executive Summary", use_container_width=True, type="primary"):
@@ -112,13 +156,15 @@ def render_analysis_tab(analyzer, chunks, user_goal="General Reading"):
     with col2:
         if st.button("❓ Identify Key Questions", use_container_width=True):
             with st.spinner("Extracting key topics..."):
-                st.session_state.analysis_results['questions'] = analyzer.generate_questions()
+                st.session_state.analysis_results['questions'] = analyzer.generate_questions(local=local)
                 
     with col3:
         if st.button("💡 Generate Smart FAQs", use_container_width=True):
             with st.spinner("Synthesizing Q&A pairs..."):
-                st.session_state.analysis_results['faqs'] = analyzer.generate_faqs()
+                st.session_state.analysis_results['faqs'] = analyzer.generate_faqs(local=local)
                 
+    render_chapter_navigator(analyzer, user_goal)
+
     # Display Results
     if st.session_state.analysis_results['summary']:
         st.markdown("<div class='analysis-card'>", unsafe_allow_html=True)
@@ -141,10 +187,39 @@ def render_analysis_tab(analyzer, chunks, user_goal="General Reading"):
         st.markdown("</div>", unsafe_allow_html=True)
 
 
-def render_analytics_tab(chunks):
+def section_label(section):
+    indent = "\u2003" * (section.level - 1)
+    return f"{indent}{section.title} (pp. {section.page}–{section.end_page})"
+
+def render_chapter_navigator(analyzer, user_goal):
+    sections = analyzer.chunks.sections
+    if not sections:
+        return
+    with st.expander(f"📑 Chapters & Sections ({len(sections)} detected)"):
+        choice = st.selectbox("Section", options=range(len(sections)),
+                              format_func=lambda i: section_label(sections[i]), key="nav_section")
+        done, total = analyzer.section_summaries.progress()
+        if done < total:
+            st.caption(f"⏳ Precomputing section digests: {done}/{total}")
+        digest = analyzer.section_summaries.get(choice)
+        if digest:
+            st.markdown(f"**Quick digest:** {digest['summary']}")
+            st.caption("Keywords: " + ", ".join(digest['keywords']))
+
+        summaries = st.session_state.setdefault('section_summaries', {})
+        if st.button("📝 Summarize this section", use_container_width=True):
+            with st.spinner(f"Summarizing {sections[choice].title}..."):
+                summaries[choice] = analyzer.generate_section_summary(choice, user_goal=user_goal)
+        if choice in summaries:
+            st.markdown(summaries[choice])
+
+def render_analytics_tab(chunks, analyzer=None):
     st.subheader("📈 Deep Insights")
     
     analytics = AnalyticsEngine(chunks)
+    if analytics.missing_nltk_data:
+        st.warning(f"NLTK data not installed ({', '.join(analytics.missing_nltk_data)}). "
+                   f"Run `python -m nltk.downloader {' '.join(analytics.missing_nltk_data)}` on the server.")
     
     # 1. Complexity Score
     col1, col2 = st.columns([1, 2])
@@ -162,6 +237,25 @@ def render_analytics_tab(chunks):
     with col4:
         st.plotly_chart(analytics.generate_word_distribution(), use_container_width=True)
 
+    # 3. Concept Map
+    if analyzer is not None and analyzer.index_ready:
+        render_concept_map(analyzer.concepts)
+
+def render_concept_map(concepts):
+    with st.spinner("Mapping key concepts..."):
+        fig = concepts.figure()
+    if fig is None:
+        st.info("Not enough recurring terms to draw a concept map.")
+        return
+    st.plotly_chart(fig, use_container_width=True)
+
+    term = st.selectbox("🔎 Explore a concept", concepts.terms(), index=None, placeholder="Pick a term")
+    if term:
+        for doc in concepts.related_passages(term):
+            where = doc.metadata.get('section') or f"Page {doc.metadata.get('page', '?')}"
+            st.markdown(f"**{where}** (p. {doc.metadata.get('page', '?')})")
+            st.caption(doc.page_content[:400] + ("..." if len(doc.page_content) > 400 else ""))
+
 def render_chat_tab(analyzer):
     st.subheader("💬 AI Assistant")
     
@@ -184,56 +278,110 @@ def render_chat_tab(analyzer):
         with col2:
             submit_button = st.form_submit_button("Send 🚀", use_container_width=True)
             
+        sections = analyzer.chunks.sections
+        scope = None
+        if sections:
+            scope = st.selectbox("Search in", options=[None] + list(range(len(sections))),
+                                 format_func=lambda i: "📚 Whole book" if i is None else section_label(sections[i]))
+            
         if submit_button and user_input:
             with st.spinner("Thinking..."):
-                answer = analyzer.answer_question(user_input)
+                answer = analyzer.answer_question(user_input, section=scope)
                 st.session_state.chat_history.append((user_input, answer))
                 st.rerun()
 
+EXPORT_LABELS = {
+    "txt": "📄 TXT Report",
+    "json": "💾 JSON Data",
+    "html": "🌐 HTML Report",
+}
+
+def get_export_bytes(fmt, summary, questions, faqs, chunks, history):
+    """Build an export on demand, cached by a hash of the analysis results."""
+    content_hash = report_content_hash(summary, questions, faqs, chunks, history)
+    cache = st.session_state.setdefault('export_cache', {})
+    key = (fmt, content_hash)
+    if key not in cache:
+        # Drop exports built from older results
+        for stale in [k for k in cache if k[1] != content_hash]:
+            del cache[stale]
+        cache[key] = build_report(fmt, summary, questions, faqs, chunks, history)
+    return cache[key]
+
 def render_export_tab(chunks):
     st.subheader("📥 Export Center")
     if not st.session_state.analysis_results['summary']:
         st.warning("⚠️ Please generate an analysis (Summary, Questions, etc.) before exporting.")
         return
 
-    col1, col2, col3 = st.columns(3)
-    
     # Pack data
     summary = st.session_state.analysis_results['summary']
     questions = st.session_state.analysis_results.get('questions') or []
     faqs = st.session_state.analysis_results.get('faqs') or []
     history = st.session_state.chat_history
-    
-    with col1:
-        st.download_button(
-            "📄 Download TXT Report",
-            data=create_txt_report(summary, questions, faqs, chunks, history),
-            file_name=f"analysis_report_{int(time.time())}.txt",
-            mime="text/plain",
-            use_container_width=True
-        )
-        
-    with col2:
-        st.download_button(
-            "💾 Download JSON Data",
-            data=create_json_report(summary, questions, faqs, chunks, history),
-            file_name=f"analysis_data_{int(time.time())}.json",
-            mime="application/json",
-            use_container_width=True
-        )
-        
-    with col3:
+
+    fmt = st.radio("Format", options=list(EXPORT_LABELS), format_func=EXPORT_LABELS.get, horizontal=True)
+    _, mime, ext = REPORT_FORMATS[fmt]
+
+    # Only the requested format is built, and only once per set of results
+    if st.button(f"⚙️ Prepare {EXPORT_LABELS[fmt]}", use_container_width=True):
+        with st.spinner("Building export..."):
+            st.session_state.export_ready = fmt
+            get_export_bytes(fmt, summary, questions, faqs, chunks, history)
+
+    if st.session_state.get('export_ready') == fmt:
         st.download_button(
-            "🌐 Download HTML Report",
-            data=create_html_report(summary, questions, faqs, chunks, history),
-            file_name=f"analysis_report_{int(time.time())}.html",
-            mime="text/html",
+            f"Download {EXPORT_LABELS[fmt]}",
+            data=get_export_bytes(fmt, summary, questions, faqs, chunks, history),
+            file_name=f"analysis_report_{int(time.time())}.{ext}",
+            mime=mime,
             use_container_width=True
         )
 
 def main():
     st.set_page_config(page_title=APP_NAME, page_icon=APP_ICON, layout=LAYOUT_MODE)
     
+    # Core engines report progress/errors through events; show them on this page
+    with streamlit_progress():
+        render_main_page()
+
+@st.cache_resource(show_spinner=False)
+def job_queue():
+    return JobQueue()
+
+def ingest_with_worker(uploaded_file, chunk_size, chunk_overlap, length_unit):
+    """
+    Hand the upload to the ingestion workers and poll until its index is ready.
+
+    Returns:
+        SemanticSearchEngine loaded from the document cache, or None while the
+        job is still running (the page reruns itself) or after it failed
+    """
+    queue = job_queue()
+    data = uploaded_file.getvalue()
+    digest = sha256_bytes(data)
+    params = (chunk_size, chunk_overlap, length_unit)
+    if not queue.cache.has_index(digest, *params):
+        jobs = st.session_state.setdefault('ingest_jobs', {})
+        key = (digest,) + params
+        if key not in jobs:
+            jobs[key] = queue.submit(data, uploaded_file.name, digest, *params)
+        job = queue.get(jobs[key])
+        if job is None or job["status"] == FAILED:
+            jobs.pop(key, None)
+            st.error(f"Failed to process the document: {job['error'] if job else 'job lost'}")
+            return None
+        if job["status"] != DONE:
+            if job["status"] == QUEUED and job.get("position"):
+                text = f"⏳ Queued: {job['position']} document(s) ahead of yours"
+            else:
+                text = f"🔄 {job['message'] or 'Processing document...'}"
+            st.progress(min(max(job["progress"] or 0.0, 0.0), 1.0), text=text)
+            time.sleep(INGEST_POLL_SECONDS)
+            st.rerun()
+    return SemanticSearchEngine.load(queue.cache.index_dir(digest, *params))
+
+def render_main_page():
     # State Init
     if 'analysis_results' not in st.session_state:
         st.session_state.analysis_results = {'summary': None, 'questions': None, 'faqs': None}
@@ -246,7 +394,8 @@ def main():
         
 
     # Render UI
-    chunk_size_setting, sensitivity, api_key, user_goal = render_sidebar()
+    (chunk_size_setting, length_unit), sensitivity, api_key, user_goal = render_sidebar()
+    chunk_overlap = DEFAULT_CHUNK_TOKEN_OVERLAP if length_unit == "tokens" else DEFAULT_CHUNK_OVERLAP
     render_hero_section()
     
     uploaded_file = st.file_uploader("📂 Upload your PDF Document", type="pdf")
@@ -256,14 +405,33 @@ def main():
         # If we have chunks but analyzer doesn't match current API key state, we might need to update it.
         # For simplicity, we create the analyzer if chunks exist but analyzer is None, OR if we just processed.
         
+        if st.session_state.processed_chunks is None and INGEST_MODE == "worker":
+            engine = ingest_with_worker(uploaded_file, chunk_size_setting, chunk_overlap, length_unit)
+            if engine is None:
+                return
+            st.session_state.processed_chunks = engine.chunks
+            st.session_state.analyzer = AnalysisEngine(engine.chunks, api_key=api_key, semantic_engine=engine,
+                                                       user=st.session_state.get('user'))
+            st.success(f"✅ Document processed: {len(engine.chunks)} analysis chunks.")
+
         if st.session_state.processed_chunks is None:
             with st.spinner("🔄 Processing document..."):
-                documents, pages = extract_text_from_pdf(uploaded_file)
-                if documents:
-                    chunks = chunk_documents(documents, chunk_size=chunk_size_setting)
+                params = (chunk_size_setting, chunk_overlap, length_unit)
+                chunks, pages, digest = load_document(uploaded_file, *params)
+                if chunks:
+                    cache = DocumentCache()
+                    engine = None
+                    if cache.has_index(digest, *params):
+                        # Indexed before by some session or process: map its saved vectors
+                        engine = SemanticSearchEngine.load(cache.index_dir(digest, *params))
+                        chunks = engine.chunks
                     st.session_state.processed_chunks = chunks
                     # Initialize Analyzer with API Key
-                    st.session_state.analyzer = AnalysisEngine(chunks, api_key=api_key)
+                    st.session_state.analyzer = AnalysisEngine(chunks, api_key=api_key, semantic_engine=engine,
+                                                               user=st.session_state.get('user'))
+                    if engine is None and st.session_state.analyzer.index_ready:
+                        # Later sessions and other server processes map this copy instead of re-embedding
+                        st.session_state.analyzer.semantic_engine.publish(cache.index_dir(digest, *params))
                     st.success(f"✅ Document processed: {pages} pages, {len(chunks)} analysis chunks.")
                 else:
                     st.error("Failed to extract text.")
@@ -271,7 +439,8 @@ def main():
         
         # Recovery: If chunks exist but analyzer is lost (e.g. after code reload), re-init
         if st.session_state.processed_chunks is not None and st.session_state.analyzer is None:
-             st.session_state.analyzer = AnalysisEngine(st.session_state.processed_chunks, api_key=api_key)
+             st.session_state.analyzer = AnalysisEngine(st.session_state.processed_chunks, api_key=api_key,
+                                                        user=st.session_state.get('user'))
         
         # Ensure analyzer is updated if API key is added later
         if st.session_state.analyzer and api_key and isinstance(st.session_state.analyzer.llm_provider, type(None)): # Checking type strictly is hard, let's just re-init if user pushes a button? 
@@ -288,7 +457,7 @@ def main():
             render_analysis_tab(st.session_state.analyzer, st.session_state.processed_chunks, user_goal)
             
         with tab2:
-            render_analytics_tab(st.session_state.processed_chunks)
+            render_analytics_tab(st.session_state.processed_chunks, st.session_state.analyzer)
             
         with tab3:
             render_chat_tab(st.session_state.analyzer)
@@ -300,6 +469,8 @@ def main():
         if st.session_state.processed_chunks is not None:
              st.session_state.analysis_results = {'summary': None, 'questions': None, 'faqs': None}
              st.session_state.chat_history = []
+             st.session_state.export_cache = {}
+             st.session_state.section_summaries = {}
              st.session_state.analyzer = None
              st.session_state.processed_chunks = None
              st.rerun()
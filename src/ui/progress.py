@@ -0,0 +1,36 @@
+import streamlit as st
+from src.core import events
+
+class StreamlitProgress:
+    """
+    Renders core engine events in the current Streamlit page.
+    STARTed stages show a status line until their END arrives.
+    """
+
+    def __init__(self):
+        self._active = {}
+
+    def __call__(self, event):
+        if event.kind == events.START:
+            placeholder = st.empty()
+            placeholder.info(f"⏳ {event.message}")
+            self._active[event.stage] = placeholder
+        elif event.kind == events.END:
+            placeholder = self._active.pop(event.stage, None)
+            if placeholder is not None:
+                placeholder.empty()
+        elif event.kind == events.PROGRESS:
+            placeholder = self._active.get(event.stage)
+            fraction = event.data.get("fraction")
+            if placeholder is not None and fraction is not None:
+                placeholder.progress(min(max(fraction, 0.0), 1.0), text=event.message)
+        elif event.kind == events.ERROR:
+            st.error(event.message)
+        elif event.kind == events.WARNING:
+            st.warning(event.message)
+        elif event.kind == events.INFO:
+            st.caption(f"ℹ️ {event.message}")
+
+def streamlit_progress():
+    """Context manager that routes core events to this session's page."""
+    return events.subscribed(StreamlitProgress())
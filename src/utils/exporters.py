@@ -1,44 +1,57 @@
-
 import json
+import hashlib
 from datetime import datetime
 import io
 
-def create_txt_report(summary, questions, faqs, chunks, chat_history):
-    """Create text document"""
-    document = "=" * 80 + "\n"
-    document += " " * 25 + "COMPREHENSIVE BOOK ANALYSIS\n"
-    document += "=" * 80 + "\n\n"
-    
-    document += "EXECUTIVE SUMMARY\n" + "=" * 25 + "\n\n"
-    document += f"{summary}\n\n"
-    
-    document += "IMPORTANT QUESTIONS\n" + "=" * 25 + "\n\n"
+HTML_STYLE = """
+            body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; margin: 40px; line-height: 1.6; color: #333; }
+            .header { text-align: center; background: linear-gradient(135deg, #2c3e50, #3498db); color: white; padding: 40px; border-radius: 12px; margin-bottom: 30px; box-shadow: 0 4px 15px rgba(0,0,0,0.1); }
+            .section { margin: 30px 0; padding: 25px; border-left: 5px solid #3498db; background: #f8f9fa; border-radius: 8px; }
+            h1 { margin: 0; font-weight: 300; letter-spacing: 1px; }
+            h2 { color: #2c3e50; margin-top: 0; }
+            .p-meta { color: rgba(255,255,255,0.8); font-size: 0.9rem; }
+            .question-item { font-weight: 600; color: #2c3e50; margin-bottom: 8px; }
+            .faq-item { margin-bottom: 20px; }
+            .faq-q { font-weight: bold; color: #d35400; }
+            .faq-a { margin-top: 5px; color: #555; }
+            .chat-user { background: #e3f2fd; padding: 12px; margin: 8px 0 8px 40px; border-radius: 12px 12px 2px 12px; }
+            .chat-ai { background: #f5f5f5; padding: 12px; margin: 8px 40px 8px 0; border-radius: 12px 12px 12px 2px; border-left: 4px solid #16a085; }
+"""
+
+def iter_txt_report(summary, questions, faqs, chunks, chat_history):
+    """Yield the text report piece by piece."""
+    yield "=" * 80 + "\n"
+    yield " " * 25 + "COMPREHENSIVE BOOK ANALYSIS\n"
+    yield "=" * 80 + "\n\n"
+
+    yield "EXECUTIVE SUMMARY\n" + "=" * 25 + "\n\n"
+    yield f"{summary}\n\n"
+
+    yield "IMPORTANT QUESTIONS\n" + "=" * 25 + "\n\n"
     if questions:
         for i, question in enumerate(questions, 1):
-            document += f"{i:02d}. {question}\n"
-    document += "\n"
-    
-    document += "FREQUENTLY ASKED QUESTIONS\n" + "=" * 35 + "\n\n"
+            yield f"{i:02d}. {question}\n"
+    yield "\n"
+
+    yield "FREQUENTLY ASKED QUESTIONS\n" + "=" * 35 + "\n\n"
     if faqs:
         for i, (q, a) in enumerate(faqs, 1):
-            document += f"Q{i:02d}: {q}\n"
-            document += f"A{i:02d}: {a}\n\n"
-    
+            yield f"Q{i:02d}: {q}\n"
+            yield f"A{i:02d}: {a}\n\n"
+
     if chat_history:
-        document += "CHAT HISTORY\n" + "=" * 20 + "\n\n"
+        yield "CHAT HISTORY\n" + "=" * 20 + "\n\n"
         for i, (q, a) in enumerate(chat_history, 1):
-            document += f"You: {q}\n"
-            document += f"AI: {a}\n\n"
-    
-    document += "\n" + "=" * 80 + "\n"
-    document += f"Generated on: {datetime.now().strftime('%Y-%m-%d at %H:%M:%S')}\n"
-    document += f"Content Sections Analyzed: {len(chunks)}\n"
-    document += "=" * 80
-    
-    return document.encode('utf-8')
+            yield f"You: {q}\n"
+            yield f"AI: {a}\n\n"
 
-def create_json_report(summary, questions, faqs, chunks, chat_history):
-    """Create JSON document"""
+    yield "\n" + "=" * 80 + "\n"
+    yield f"Generated on: {datetime.now().strftime('%Y-%m-%d at %H:%M:%S')}\n"
+    yield f"Content Sections Analyzed: {len(chunks)}\n"
+    yield "=" * 80
+
+def iter_json_report(summary, questions, faqs, chunks, chat_history):
+    """Yield the JSON report as encoder chunks instead of one big string."""
     report_data = {
         "metadata": {
             "generated_date": datetime.now().isoformat(),
@@ -50,73 +63,63 @@ def create_json_report(summary, questions, faqs, chunks, chat_history):
         "faqs": [{"question": q, "answer": a} for q, a in faqs],
         "chat_history": [{"question": q, "answer": a} for q, a in chat_history]
     }
-    return json.dumps(report_data, indent=2, ensure_ascii=False).encode('utf-8')
+    encoder = json.JSONEncoder(indent=2, ensure_ascii=False)
+    yield from encoder.iterencode(report_data)
 
-def create_html_report(summary, questions, faqs, chunks, chat_history):
-    """Create HTML document"""
-    html_content = f"""
+def iter_html_report(summary, questions, faqs, chunks, chat_history):
+    """Yield the HTML report piece by piece."""
+    yield f"""
     <!DOCTYPE html>
     <html>
     <head>
         <title>Book Analysis Report</title>
-        <style>
-            body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; margin: 40px; line-height: 1.6; color: #333; }}
-            .header {{ text-align: center; background: linear-gradient(135deg, #2c3e50, #3498db); color: white; padding: 40px; border-radius: 12px; margin-bottom: 30px; box-shadow: 0 4px 15px rgba(0,0,0,0.1); }}
-            .section {{ margin: 30px 0; padding: 25px; border-left: 5px solid #3498db; background: #f8f9fa; border-radius: 8px; }}
-            h1 {{ margin: 0; font-weight: 300; letter-spacing: 1px; }}
-            h2 {{ color: #2c3e50; margin-top: 0; }}
-            .p-meta {{ color: rgba(255,255,255,0.8); font-size: 0.9rem; }}
-            .question-item {{ font-weight: 600; color: #2c3e50; margin-bottom: 8px; }}
-            .faq-item {{ margin-bottom: 20px; }}
-            .faq-q {{ font-weight: bold; color: #d35400; }}
-            .faq-a {{ margin-top: 5px; color: #555; }}
-            .chat-user {{ background: #e3f2fd; padding: 12px; margin: 8px 0 8px 40px; border-radius: 12px 12px 2px 12px; }}
-            .chat-ai {{ background: #f5f5f5; padding: 12px; margin: 8px 40px 8px 0; border-radius: 12px 12px 12px 2px; border-left: 4px solid #16a085; }}
-        </style>
+        <style>{HTML_STYLE}        </style>
     </head>
     <body>
         <div class="header">
             <h1>Comprehensive Book Analysis</h1>
             <p class="p-meta">Generated on {datetime.now().strftime('%Y-%m-%d at %H:%M:%S')}</p>
         </div>
-        
+
         <div class="section">
             <h2>Executive Summary</h2>
-            <div style="white-space: pre-wrap;">{summary}</div>
+            <div style="white-space: pre-wrap;">"""
+    yield str(summary)
+    yield """</div>
         </div>
-        
+
         <div class="section">
             <h2>Key Questions</h2>
             <ol>
     """
-    
+
     if questions:
         for question in questions:
-            html_content += f'<li class="question-item">{question}</li>'
-    
-    html_content += """
+            yield f'<li class="question-item">{question}</li>'
+
+    yield """
             </ol>
         </div>
-        
+
         <div class="section">
             <h2>Frequently Asked Questions</h2>
     """
-    
+
     if faqs:
         for q, a in faqs:
-            html_content += f'<div class="faq-item"><div class="faq-q">{q}</div><div class="faq-a">{a}</div></div>'
-    
+            yield f'<div class="faq-item"><div class="faq-q">{q}</div><div class="faq-a">{a}</div></div>'
+
     if chat_history:
-        html_content += """
+        yield """
         </div>
         <div class="section">
             <h2>Chat History</h2>
         """
         for q, a in chat_history:
-            html_content += f'<div class="chat-user"><strong>You:</strong> {q}</div>'
-            html_content += f'<div class="chat-ai"><strong>AI:</strong> {a}</div>'
-    
-    html_content += """
+            yield f'<div class="chat-user"><strong>You:</strong> {q}</div>'
+            yield f'<div class="chat-ai"><strong>AI:</strong> {a}</div>'
+
+    yield """
         </div>
         <div style="text-align: center; margin-top: 50px; color: #aaa; font-size: 0.8rem;">
             Generated by AI Book Analyzer Pro
@@ -124,4 +127,61 @@ def create_html_report(summary, questions, faqs, chunks, chat_history):
     </body>
     </html>
     """
-    return html_content.encode('utf-8')
+
+# Format -> (chunk generator, mime type, file extension)
+REPORT_FORMATS = {
+    "txt": (iter_txt_report, "text/plain", "txt"),
+    "json": (iter_json_report, "application/json", "json"),
+    "html": (iter_html_report, "text/html", "html"),
+}
+
+def write_report(fmt, stream, summary, questions, faqs, chunks, chat_history):
+    """
+    Stream a report into a binary file-like object.
+
+    Args:
+        fmt (str): One of REPORT_FORMATS
+        stream: Writable binary stream (io.BytesIO, open file, ...)
+
+    Returns:
+        int: Number of bytes written
+    """
+    generator = REPORT_FORMATS[fmt][0]
+    written = 0
+    for piece in generator(summary, questions, faqs, chunks, chat_history):
+        written += stream.write(piece.encode('utf-8'))
+    return written
+
+def build_report(fmt, summary, questions, faqs, chunks, chat_history):
+    """Build a report into an in-memory buffer and return its bytes."""
+    buffer = io.BytesIO()
+    write_report(fmt, buffer, summary, questions, faqs, chunks, chat_history)
+    return buffer.getvalue()
+
+def report_content_hash(summary, questions, faqs, chunks, chat_history):
+    """
+    Stable hash of everything that ends up in a report.
+    Used to cache built exports until the analysis results change.
+    """
+    h = hashlib.sha256()
+    h.update(str(summary).encode('utf-8'))
+    for question in questions or []:
+        h.update(b"\x00q" + str(question).encode('utf-8'))
+    for q, a in faqs or []:
+        h.update(b"\x00f" + str(q).encode('utf-8') + b"\x00" + str(a).encode('utf-8'))
+    for q, a in chat_history or []:
+        h.update(b"\x00c" + str(q).encode('utf-8') + b"\x00" + str(a).encode('utf-8'))
+    h.update(f"\x00n{len(chunks)}".encode('utf-8'))
+    return h.hexdigest()
+
+def create_txt_report(summary, questions, faqs, chunks, chat_history):
+    """Create text document"""
+    return build_report("txt", summary, questions, faqs, chunks, chat_history)
+
+def create_json_report(summary, questions, faqs, chunks, chat_history):
+    """Create JSON document"""
+    return build_report("json", summary, questions, faqs, chunks, chat_history)
+
+def create_html_report(summary, questions, faqs, chunks, chat_history):
+    """Create HTML document"""
+    return build_report("html", summary, questions, faqs, chunks, chat_history)
@@ -0,0 +1,38 @@
+import functools
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Resources TextBlob needs for sentence/word tokenisation and tagging
+REQUIRED_NLTK_DATA = {
+    "punkt": "tokenizers/punkt",
+    "punkt_tab": "tokenizers/punkt_tab",
+    "averaged_perceptron_tagger": "taggers/averaged_perceptron_tagger",
+}
+
+@functools.lru_cache(maxsize=1)
+def missing_nltk_data():
+    """
+    Check the local NLTK data path for the required resources.
+    Never downloads anything; the result is cached for the process.
+
+    Returns:
+        List[str]: Names of resources that are not installed
+    """
+    try:
+        import nltk
+    except ImportError:
+        return list(REQUIRED_NLTK_DATA)
+
+    missing = []
+    for name, resource in REQUIRED_NLTK_DATA.items():
+        try:
+            nltk.data.find(resource)
+        except LookupError:
+            missing.append(name)
+    if missing:
+        logger.warning(
+            f"Missing NLTK data: {', '.join(missing)}. "
+            f"Install once with: python -m nltk.downloader {' '.join(missing)}"
+        )
+    return missing
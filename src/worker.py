@@ -0,0 +1,166 @@
+"""
+Ingestion worker service.
+
+Usage:
+    python -m src.worker [--processes N] [--poll 1.0]
+
+Each worker process loads the embedding model once, then claims jobs from
+the SQLite job queue (src/core/jobs.py), extracts, chunks and indexes the
+PDF, and saves the index into the document cache, where the web app picks
+it up. Start more processes (or more copies of this command) to scale out
+on one machine; a job whose worker dies is handed to another after
+jobs.STALE_SECONDS.
+"""
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Seconds between heartbeats while a job runs
+HEARTBEAT_SECONDS = 15
+# Minimum seconds between progress writes to the queue
+PROGRESS_INTERVAL = 0.5
+# Share of the progress bar per stage (extraction/chunking, then embedding)
+STAGE_SPANS = {"extract": (0.0, 0.3), "index": (0.3, 1.0)}
+
+class JobProgress:
+    """Event subscriber that forwards stage progress of one job to the queue."""
+
+    def __init__(self, queue, job_id):
+        self.queue = queue
+        self.job_id = job_id
+        self._last = 0.0
+
+    def __call__(self, event):
+        from src.core import events
+        span = STAGE_SPANS.get(event.stage)
+        if span is None or event.kind not in (events.START, events.PROGRESS):
+            return
+        now = time.monotonic()
+        if event.kind == events.PROGRESS and now - self._last < PROGRESS_INTERVAL:
+            return
+        self._last = now
+        fraction = event.data.get("fraction", 0.0) if event.kind == events.PROGRESS else 0.0
+        self.queue.update(self.job_id, progress=span[0] + (span[1] - span[0]) * fraction,
+                          message=event.message or None)
+
+def _heartbeat(queue, job_id, stop):
+    while not stop.wait(HEARTBEAT_SECONDS):
+        queue.update(job_id)
+
+def ingest_pdf(pdf_file, chunk_size, chunk_overlap, length_unit, cache, embeddings=None):
+    """
+    Extract, chunk and index a PDF and save the index into the document cache
+    (a no-op for the index if it is already there).
+
+    Returns:
+        tuple: (page_count, chunk_count, sha256)
+    """
+    from src.core.nlp import SemanticSearchEngine
+    from src.core.processor import load_document
+
+    params = (chunk_size, chunk_overlap, length_unit)
+    chunks, page_count, digest = load_document(pdf_file, *params, cache=cache)
+    if not chunks:
+        raise ValueError("No text could be extracted")
+    if cache.has_index(digest, *params):
+        return page_count, len(chunks), digest
+    engine = SemanticSearchEngine(embeddings=embeddings)
+    if not engine.build_index(chunks):
+        raise RuntimeError("Failed to build semantic index")
+    if not engine.publish(cache.index_dir(digest, *params), mmap=False):
+        raise RuntimeError("Failed to save semantic index")
+    return page_count, len(chunks), digest
+
+def process_job(queue, job, embeddings):
+    """
+    Run one queued job.
+
+    Returns:
+        tuple: (page_count, chunk_count)
+    """
+    from src.core import events
+
+    with events.subscribed(JobProgress(queue, job["id"])):
+        with open(job["pdf_path"], "rb") as f:
+            pages, chunks, _ = ingest_pdf(f, job["chunk_size"], job["chunk_overlap"], job["length_unit"],
+                                          queue.cache, embeddings)
+    return pages, chunks
+
+def run_worker(db_path=None, poll=1.0, stop=None):
+    """Claim and process jobs until `stop` is set (or forever)."""
+    from src.core.jobs import JobQueue, JOBS_DB
+    from src.core.nlp import shared_embeddings
+
+    stop = stop or threading.Event()
+    queue = JobQueue(db_path or JOBS_DB)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    embeddings = shared_embeddings()
+    if embeddings is None:
+        logger.error("Embedding model unavailable; worker exiting")
+        return 1
+    logger.info(f"Ingestion worker {worker_id} ready")
+
+    while not stop.is_set():
+        job = queue.claim(worker_id)
+        if job is None:
+            stop.wait(poll)
+            continue
+        logger.info(f"{worker_id}: processing {job['name']} ({job['id']}, attempt {job['attempts']})")
+        beat_stop = threading.Event()
+        threading.Thread(target=_heartbeat, args=(queue, job["id"], beat_stop), daemon=True).start()
+        started = time.perf_counter()
+        try:
+            pages, chunks = process_job(queue, job, embeddings)
+        except Exception as e:
+            queue.fail(job["id"], e)
+        else:
+            queue.complete(job["id"], pages, chunks)
+            logger.info(f"{worker_id}: {job['name']} done, {pages} pages, {chunks} chunks "
+                        f"in {time.perf_counter() - started:.1f}s")
+        finally:
+            beat_stop.set()
+    return 0
+
+def _worker_main(db_path, poll):
+    logging.basicConfig(level=logging.INFO)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        run_worker(db_path, poll, stop)
+    except KeyboardInterrupt:
+        pass
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m src.worker", description="AI Book Analyzer ingestion workers")
+    parser.add_argument("-p", "--processes", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Number of worker processes")
+    parser.add_argument("--db", default=None, help="Job queue database (default: .cache/jobs.db)")
+    parser.add_argument("--poll", type=float, default=1.0, help="Seconds between queue checks when idle")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    if args.processes == 1:
+        _worker_main(args.db, args.poll)
+        return 0
+    processes = [multiprocessing.Process(target=_worker_main, args=(args.db, args.poll), name=f"ingest-{i}")
+                 for i in range(args.processes)]
+    for p in processes:
+        p.start()
+    try:
+        for p in processes:
+            p.join()
+    except KeyboardInterrupt:
+        for p in processes:
+            p.terminate()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())